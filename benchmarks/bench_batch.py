@@ -0,0 +1,82 @@
+# Compares running many small programs with one `python3 sbml.py` process
+# each against running all of them in a single batch-mode invocation.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+PROGRAM = '''{{
+    n = {n};
+    total = 0;
+    while (n > 0) {{ total = total + n; n = n - 1; }}
+    print(total);
+}}
+'''
+
+
+def write_programs(directory, count):
+    filenames = []
+    for n in range(count):
+        filename = os.path.join(directory, f'program{n}.sbml')
+        with open(filename, 'w') as file_handler:
+            file_handler.write(PROGRAM.format(n=n))
+        filenames.append(filename)
+    return filenames
+
+
+def run(command):
+    start = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f'{command} exited with {process.returncode}')
+    return time.perf_counter() - start, process.stdout
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--programs', type=int, default=200)
+    argument_parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    argument_parser.add_argument('--backend', default='tree')
+    arguments = argument_parser.parse_args()
+
+    options = ['--backend', arguments.backend]
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = write_programs(directory, arguments.programs)
+
+        separate = 0
+        separate_outputs = []
+        for filename in filenames:
+            elapsed, output = run(
+                [sys.executable, SBML_PATH, *options, filename]
+            )
+            separate += elapsed
+            separate_outputs.append(output)
+
+        batch, output = run([
+            sys.executable, SBML_PATH, *options,
+            '--jobs', str(arguments.jobs), *filenames
+        ])
+
+    expected = ''.join(
+        f'==> {filename} <==\n{output}'
+        for filename, output in zip(filenames, separate_outputs)
+    )
+    if output != expected:
+        print('batch output differs from the separate runs')
+        sys.exit(1)
+
+    print(f'{arguments.programs} programs')
+    print(f'one process each {separate:8.2f} s')
+    print(f'batch, {arguments.jobs:>2} jobs   {batch:8.2f} s')
+
+
+if '__main__' == __name__:
+    main()
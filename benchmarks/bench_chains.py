@@ -0,0 +1,55 @@
+# Runs programs with very long operator chains, the kind machine written
+# programs contain, on every backend and reports how long each one takes.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+
+def chain_program(terms):
+    return '{ ' + ' '.join([
+        'x = ' + ' + '.join(['1'] * terms) + '; print(x);',
+        'y = ' + ' * '.join(['1'] * terms) + '; print(y);',
+        'b = ' + ' andalso '.join(['True'] * terms) + '; print(b);',
+        's = ' + ' + '.join(['"a"'] * terms) + '; print(s[0]);',
+    ]) + ' }'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--terms', type=int, default=50000)
+    arguments = argument_parser.parse_args()
+
+    expected = f'{arguments.terms}\n1\nTrue\na\n'
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, 'chains.sbml')
+        with open(program, 'w') as file_handler:
+            file_handler.write(chain_program(arguments.terms))
+
+        failed = False
+        for backend in BACKENDS:
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, SBML_PATH, '--backend', backend, program],
+                capture_output=True, text=True
+            )
+            elapsed = time.perf_counter() - start
+            status = 'ok' if process.stdout == expected else 'FAILED'
+            failed = failed or status != 'ok'
+            print(f'{backend:<8} {elapsed:8.2f} s  {status}')
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,76 @@
+# Runs one program against many starting symbol tables through the embedding
+# API, once compiling it for every run and once compiling it a single time,
+# and reports the time per run of each.
+
+
+import argparse
+import os
+import sys
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+import sbml
+import sbml_output
+
+
+# A scoring rule of the size a service would evaluate per request
+SOURCE = '{ ' + ' '.join([
+    'score = 0; i = 0;',
+    'while (i < len) {',
+    '  if (i mod 3 == 0 andalso i in flags) { score = score + weight * i; }',
+    '  else { score = score - 1; }',
+    '  i = i + 1;',
+    '}',
+    'result = (score, score > limit);',
+] * 8) + ' }'
+
+
+def environment(number):
+    return {
+        'len': 20, 'flags': [3, 6, 9, 12], 'weight': number % 7,
+        'limit': 100,
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--runs', type=int, default=2000)
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=sbml.BACKENDS,
+        default=['tree', 'closure', 'vm', 'python']
+    )
+    arguments = argument_parser.parse_args()
+    output = sbml_output.NullOutput()
+
+    for backend in arguments.backends:
+        start = time.perf_counter()
+        for number in range(arguments.runs):
+            sbml.compile(SOURCE, backend).run(environment(number), output)
+        every_run = time.perf_counter() - start
+
+        start = time.perf_counter()
+        program = sbml.compile(SOURCE, backend)
+        results = [
+            program.run(environment(number), output)['result']
+            for number in range(arguments.runs)
+        ]
+        once = time.perf_counter() - start
+
+        expected = [
+            sbml.compile(SOURCE, 'tree').run(environment(number))['result']
+            for number in range(10)
+        ]
+        ok = results[:10] == expected
+        print(
+            f'{backend:<8} '
+            f'compile every run {every_run / arguments.runs * 1e6:9.1f} us  '
+            f'compile once {once / arguments.runs * 1e6:9.1f} us  '
+            f'{"ok" if ok else "FAILED"}'
+        )
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,100 @@
+# Compares the lexing throughput of the hand-written scanner with the PLY
+# lexer built from the same rules, in MB/s, on a generated program.  The
+# token streams of both are compared first so that a faster scanner cannot
+# silently be a wrong one.
+
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+
+import sbml_lexer
+
+
+STATEMENTS = [
+    'x{n} = {n} + y * (z - {n}.5) div 3 mod 7;',
+    'name{n} = "string literal {n} with \\"escapes\\"";',
+    "other{n} = 'single quoted {n}';",
+    'l{n} = [1, 2.0e3, True, False, "s"] :: [];',
+    'if (a{n} <= b andalso not c orelse d <> e) {{ print(#1 (t, u)); }}',
+    'while (i{n} >= 0) {{ i{n} = i{n} - 1; // comment {n}\n}}',
+    'b{n} = x in [x] == (y < z) ** 2;',
+]
+
+
+def generate_program(size, seed=0):
+    random_generator = random.Random(seed)
+    lines = ['{']
+    length = 2
+    n = 0
+    while length < size:
+        line = '    ' + random_generator.choice(STATEMENTS).format(n=n)
+        lines.append(line)
+        length += len(line) + 1
+        n += 1
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def ply_tokens(lexer, data):
+    lexer.input(data)
+    lexer.lineno = 1
+    tokens = []
+    token = lexer.token()
+    while token is not None:
+        tokens.append(token)
+        token = lexer.token()
+    return tokens
+
+
+def scanner_tokens(data):
+    return list(sbml_lexer.tokenize(data))
+
+
+def signature(tokens):
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in tokens]
+
+
+def throughput(function, data, repetitions):
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function(data)
+        samples.append(time.perf_counter() - start)
+    megabytes = len(data.encode()) / 1e6
+    return megabytes / statistics.median(samples), megabytes / min(samples)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--size', type=int, default=2_000_000,
+                                 help='size of the generated program in bytes')
+    argument_parser.add_argument('--repetitions', type=int, default=5)
+    arguments = argument_parser.parse_args()
+
+    data = generate_program(arguments.size)
+    ply_lexer = sbml_lexer.build_ply_lexer()
+    if signature(ply_tokens(ply_lexer, data)) != \
+       signature(scanner_tokens(data)):
+        print('scanner and PLY lexer disagree')
+        sys.exit(1)
+
+    print(f'program size: {len(data) / 1e6:.2f} MB')
+    for label, function in (
+        ('ply', lambda source: ply_tokens(ply_lexer, source)),
+        ('scanner', scanner_tokens),
+    ):
+        median, best = throughput(function, data, arguments.repetitions)
+        print(f'{label:<8} median {median:7.2f} MB/s  best {best:7.2f} MB/s')
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,78 @@
+# Runs the programs of the benchmark corpus with and without limits that
+# they stay well within, and reports how much slower checking the limits
+# makes each backend.
+
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+CORPUS_DIR_NAME = os.path.join(BENCHMARK_DIR_NAME, 'corpus')
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+import sbml
+import sbml_limits
+import sbml_output
+
+
+LIMITS = sbml_limits.Limits(
+    max_steps=10 ** 9, max_integer_bits=10 ** 6, max_length=10 ** 8
+)
+
+
+def best_times(programs, repetitions):
+    # Runs of the programs alternate, so that a busy machine slows all of
+    # them alike
+    best = [None] * len(programs)
+    outputs = [None] * len(programs)
+    for _ in range(repetitions):
+        for index, program in enumerate(programs):
+            output = sbml_output.CollectingOutput()
+            start = time.perf_counter()
+            program.run({}, output)
+            elapsed = time.perf_counter() - start
+            if best[index] is None or elapsed < best[index]:
+                best[index] = elapsed
+            outputs[index] = output.getvalue()
+    return best, outputs
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--repetitions', type=int, default=10)
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=sbml.BACKENDS,
+        default=['closure', 'vm', 'python']
+    )
+    arguments = argument_parser.parse_args()
+
+    failed = False
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR_NAME, '*.sbml'))):
+        with open(path, 'r') as file_handler:
+            source = file_handler.read()
+        for backend in arguments.backends:
+            (unlimited, limited), (expected, output) = best_times(
+                [
+                    sbml.compile(source, backend),
+                    sbml.compile(source, backend, limits=LIMITS),
+                ],
+                arguments.repetitions
+            )
+            ok = output == expected
+            failed = failed or not ok
+            print(
+                f'{os.path.basename(path):<24} {backend:<8} '
+                f'{unlimited * 1e3:8.2f} ms {limited * 1e3:8.2f} ms '
+                f'{limited / unlimited - 1:>+7.1%}  '
+                f'{"ok" if ok else "FAILED"}'
+            )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
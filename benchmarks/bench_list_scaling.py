@@ -0,0 +1,77 @@
+# Builds lists of growing size with cons (acc = i :: acc) and with append
+# (acc = acc + [i]) in a while loop, and reports how long each size takes and
+# the time per element, which stays flat when building a list is linear.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+IDIOMS = {
+    'cons': 'acc = i :: acc;',
+    'append': 'acc = acc + [i];',
+}
+
+
+def build_program(idiom, size):
+    return '{ ' + ' '.join([
+        'acc = []; i = 0;',
+        f'while (i < {size}) {{ {IDIOMS[idiom]} i = i + 1; }}',
+        'print(acc[0]); print(acc[i - 1]);',
+    ]) + ' }'
+
+
+def expected_output(idiom, size):
+    if idiom == 'cons':
+        return f'{size - 1}\n0\n'
+    return f'0\n{size - 1}\n'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000]
+    )
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=BACKENDS,
+        default=['closure', 'vm', 'python']
+    )
+    arguments = argument_parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for idiom in IDIOMS:
+            for backend in arguments.backends:
+                for size in arguments.sizes:
+                    program = os.path.join(directory, f'{idiom}.sbml')
+                    with open(program, 'w') as file_handler:
+                        file_handler.write(build_program(idiom, size))
+                    start = time.perf_counter()
+                    process = subprocess.run(
+                        [sys.executable, SBML_PATH, '--backend', backend,
+                         program],
+                        capture_output=True, text=True
+                    )
+                    elapsed = time.perf_counter() - start
+                    ok = process.stdout == expected_output(idiom, size)
+                    failed = failed or not ok
+                    print(
+                        f'{idiom:<7} {backend:<8} {size:>8} '
+                        f'{elapsed:8.2f} s {elapsed / size * 1e6:8.2f} us'
+                        f'  {"ok" if ok else "FAILED"}'
+                    )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,72 @@
+# Builds a list of a given size and tests membership against it as many
+# times as it has items, and reports how long each size takes and the time
+# per test, which stays flat when a test no longer scans the whole list.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+
+def build_program(size):
+    # Every other value tested is in the list
+    return '{ ' + ' '.join([
+        'l = []; i = 0;',
+        f'while (i < {size}) {{ l = (2 * i) :: l; i = i + 1; }}',
+        'n = 0; i = 0;',
+        f'while (i < {size}) {{ if (i in l) {{ n = n + 1; }} i = i + 1; }}',
+        'print(n);',
+    ]) + ' }'
+
+
+def expected_output(size):
+    return f'{(size + 1) // 2}\n'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=BACKENDS,
+        default=['closure', 'vm', 'python']
+    )
+    arguments = argument_parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in arguments.backends:
+            for size in arguments.sizes:
+                program = os.path.join(directory, 'membership.sbml')
+                with open(program, 'w') as file_handler:
+                    file_handler.write(build_program(size))
+                start = time.perf_counter()
+                process = subprocess.run(
+                    [sys.executable, SBML_PATH, '--backend', backend,
+                     '--membership-stats', program],
+                    capture_output=True, text=True
+                )
+                elapsed = time.perf_counter() - start
+                ok = process.stdout == expected_output(size)
+                failed = failed or not ok
+                print(
+                    f'{backend:<8} {size:>8} {elapsed:8.2f} s '
+                    f'{elapsed / size * 1e6:8.2f} us  '
+                    f'{"ok" if ok else "FAILED"}  {process.stderr.strip()}'
+                )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,87 @@
+# Measures how much memory the AST of a large generated program takes, in
+# bytes per node, by tracing the allocations made while parsing it and still
+# alive afterwards.
+
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+
+import sbml_parser
+from sbml_ast_nodes import Node
+from sbml_errors import SyntaxError
+from stress_parser import generate_block
+
+
+def generate_program(parser, statements, seed=0):
+    # Joins generated blocks, skipping those with syntax errors
+    random_generator = random.Random(seed)
+    blocks = []
+    size = 0
+    while size < statements:
+        block = generate_block(random_generator, 3)
+        try:
+            parser.parse(block)
+        except SyntaxError:
+            continue
+        blocks.append(block)
+        size += block.count(';')
+    return '{ ' + ' '.join(blocks) + ' }'
+
+
+def count_nodes(ast):
+    # Walks whatever references the nodes hold, so it does not depend on how
+    # a node stores its children.
+    counts = {}
+    seen = set()
+    stack = [ast]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, Node):
+            name = type(value).__name__
+            counts[name] = counts.get(name, 0) + 1
+        if isinstance(value, (Node, list, tuple, dict)):
+            stack.extend(gc.get_referents(value))
+    return counts
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--statements', type=int, default=50000)
+    arguments = argument_parser.parse_args()
+
+    parser = sbml_parser.Parser()
+    source = generate_program(parser, arguments.statements)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    ast = parser.parse(source)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    counts = count_nodes(ast)
+    nodes = sum(counts.values())
+
+    print(f'program size: {len(source) / 1e6:.2f} MB')
+    for name, count in sorted(counts.items()):
+        print(f'{name:<16} {count:>9}')
+    print(f'{"nodes":<16} {nodes:>9}')
+    print(f'AST size: {size / 1e6:.2f} MB, {size / nodes:.1f} bytes per node')
+
+
+if '__main__' == __name__:
+    main()
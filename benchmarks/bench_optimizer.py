@@ -0,0 +1,73 @@
+# Runs a loop full of constant expressions and dead branches with and without
+# the optimizer on every backend, and reports how many nodes each pass
+# eliminated and how long each run takes.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+
+def constant_program(iterations):
+    return '{ ' + ' '.join([
+        'i = 0; total = 0;',
+        f'while (i < {iterations}) {{',
+        '    total = total + (60 * 60 * 24) div (2 ** 3) - -1;',
+        '    l = [1, 2, (3, 4), [5, 6]];',
+        '    if (1 < 2 andalso not False) { total = total + #1 (1, 2); }',
+        '    if ("a" > "b") { total = 0; } else { total = total - 1; }',
+        '    while (False) { total = 0; }',
+        '    i = i + 1;',
+        '}',
+        'print(total);',
+    ]) + ' }'
+
+
+def run(arguments, program):
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, SBML_PATH, *arguments, program],
+        capture_output=True, text=True
+    )
+    return time.perf_counter() - start, process
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--iterations', type=int, default=20000)
+    arguments = argument_parser.parse_args()
+
+    expected = f'{arguments.iterations * 10801}\n'
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, 'constants.sbml')
+        with open(program, 'w') as file_handler:
+            file_handler.write(constant_program(arguments.iterations))
+
+        failed = False
+        for backend in BACKENDS:
+            plain, process = run(['--backend', backend], program)
+            failed = failed or process.stdout != expected
+            optimized, process = run(
+                ['--backend', backend, '-O', '--optimizer-stats'], program
+            )
+            failed = failed or process.stdout != expected
+            status = 'ok' if not failed else 'FAILED'
+            print(
+                f'{backend:<8} {plain:6.2f} s  -O {optimized:6.2f} s  '
+                f'{status}  ' + process.stderr.strip().replace('\n', '; ')
+            )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
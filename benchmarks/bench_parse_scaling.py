@@ -0,0 +1,50 @@
+# Times parsing of ever larger blocks and list literals, to show that parse
+# time grows linearly with the number of statements or items.
+
+
+import argparse
+import os
+import sys
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+
+import sbml_parser
+
+
+SHAPES = {
+    'block': lambda n: '{ ' + 'x = 1; ' * n + '}',
+    'list': lambda n: '{ x = [' + ', '.join(['1'] * n) + ']; }',
+    'tuple': lambda n: '{ x = (' + ', '.join(['1'] * n) + '); }',
+}
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--max-size', type=int, default=1_000_000)
+    argument_parser.add_argument('--shape', choices=SHAPES, action='append')
+    arguments = argument_parser.parse_args()
+
+    parser = sbml_parser.Parser()
+    sizes = []
+    size = 1000
+    while size <= arguments.max_size:
+        sizes.append(size)
+        size *= 10
+
+    print(f'{"shape":<8} {"size":>9} {"seconds":>9} {"us per item":>12}')
+    for shape in arguments.shape or SHAPES:
+        for size in sizes:
+            source = SHAPES[shape](size)
+            start = time.perf_counter()
+            parser.parse(source)
+            elapsed = time.perf_counter() - start
+            print(f'{shape:<8} {size:>9} {elapsed:>9.3f} '
+                  f'{elapsed / size * 1e6:>12.2f}')
+
+
+if '__main__' == __name__:
+    main()
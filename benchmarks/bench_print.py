@@ -0,0 +1,78 @@
+# Runs a program printing many short lines with its output written to a
+# file, once for each output buffer size and once discarding the output, and
+# reports how long each run takes and the time per line printed.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+
+def build_program(lines):
+    return '{ ' + ' '.join([
+        'i = 0;',
+        f'while (i < {lines}) {{ print(i); i = i + 1; }}',
+    ]) + ' }'
+
+
+def expected_output(lines):
+    return ''.join(f'{i}\n' for i in range(lines))
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--lines', type=int, default=200000)
+    argument_parser.add_argument(
+        '--buffer-sizes', type=int, nargs='+', default=[0, 4096, 65536]
+    )
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=BACKENDS,
+        default=['closure', 'vm', 'python']
+    )
+    arguments = argument_parser.parse_args()
+    expected = expected_output(arguments.lines)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, 'print.sbml')
+        with open(program, 'w') as file_handler:
+            file_handler.write(build_program(arguments.lines))
+        output_path = os.path.join(directory, 'output.txt')
+        runs = [
+            (str(size), ['--output-buffer', str(size)])
+            for size in arguments.buffer_sizes
+        ] + [('discard', ['--discard-output'])]
+        for backend in arguments.backends:
+            for name, options in runs:
+                with open(output_path, 'w') as output:
+                    start = time.perf_counter()
+                    subprocess.run(
+                        [sys.executable, SBML_PATH, '--backend', backend,
+                         *options, program],
+                        stdout=output
+                    )
+                    elapsed = time.perf_counter() - start
+                with open(output_path, 'r') as output:
+                    printed = output.read()
+                ok = printed == ('' if name == 'discard' else expected)
+                failed = failed or not ok
+                print(
+                    f'{backend:<8} {name:>8} {elapsed:8.2f} s '
+                    f'{elapsed / arguments.lines * 1e6:8.2f} us'
+                    f'  {"ok" if ok else "FAILED"}'
+                )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,73 @@
+# Measures how long `python3 sbml.py tiny.sbml` takes until its first
+# statement has run, by timing the first line of output, and how long the
+# whole process takes.  Each run happens in an empty working directory,
+# which is checked afterwards to make sure the interpreter wrote nothing.
+
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+TINY_PROGRAM_PATH = os.path.join(BENCHMARK_DIR_NAME, 'tiny.sbml')
+
+
+def time_run(program, options, working_dir):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, SBML_PATH, *options, program],
+        stdout=subprocess.PIPE, cwd=working_dir
+    )
+    process.stdout.readline()
+    first_statement = time.perf_counter() - start
+    process.stdout.read()
+    process.wait()
+    total = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f'sbml.py exited with {process.returncode}')
+    return first_statement, total
+
+
+def summarize(label, samples):
+    return (
+        f'{label:<16} min {min(samples) * 1000:8.2f} ms  '
+        f'median {statistics.median(samples) * 1000:8.2f} ms  '
+        f'max {max(samples) * 1000:8.2f} ms'
+    )
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('program', nargs='?', default=TINY_PROGRAM_PATH)
+    argument_parser.add_argument('--runs', type=int, default=20)
+    argument_parser.add_argument('--warmup', type=int, default=2)
+    argument_parser.add_argument('--backend', default='tree')
+    arguments = argument_parser.parse_args()
+
+    program = os.path.abspath(arguments.program)
+    options = ['--backend', arguments.backend]
+    first_statements = []
+    totals = []
+    with tempfile.TemporaryDirectory() as working_dir:
+        for run in range(arguments.warmup + arguments.runs):
+            first_statement, total = time_run(program, options, working_dir)
+            if run >= arguments.warmup:
+                first_statements.append(first_statement)
+                totals.append(total)
+        written = os.listdir(working_dir)
+
+    print(summarize('first statement', first_statements))
+    print(summarize('total', totals))
+    if written:
+        print(f'files written to the working directory: {written}')
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,112 @@
+# Pipes generated programs of growing size into sbml.py --stream and reports
+# how long each takes, how fast it is read and the peak memory of the
+# interpreter, which stays flat as the program grows when only the statement
+# being read is held in memory.  The program is generated while it is piped,
+# so the default sizes of up to two gigabytes need no disk space.
+# --whole also runs the smaller programs from a file the usual way, whose
+# memory grows with the program.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+# Each statement assigns a long string, so that the program is large
+# without taking long to parse
+STATEMENT = 's = "' + 'x' * 8000 + '"; i = i + 1;\n'
+STATEMENTS_PER_CHUNK = 100
+CHUNK = STATEMENT * STATEMENTS_PER_CHUNK
+
+
+def chunk_count(size):
+    # Chunks making up a program of about size megabytes
+    return max(1, size * 1024 * 1024 // len(CHUNK))
+
+
+def write_program(file_handler, size):
+    file_handler.write('{ i = 0;\n')
+    for _ in range(chunk_count(size)):
+        file_handler.write(CHUNK)
+    file_handler.write('print(i); }\n')
+
+
+def expected_output(size):
+    return f'{chunk_count(size) * STATEMENTS_PER_CHUNK}\n'
+
+
+def run(command, size, program=None):
+    # Returns the output, the time taken and the peak memory in megabytes
+    start = time.perf_counter()
+    if program is None:
+        process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True
+        )
+        write_program(process.stdin, size)
+        process.stdin.close()
+    else:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    output = process.stdout.read()
+    # Waited for with wait4, which also gives the resources the process used
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    # Linux reports the peak resident set size in kilobytes
+    return output, elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[64, 512, 2048],
+        help='program sizes in megabytes'
+    )
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=BACKENDS, default=['closure']
+    )
+    argument_parser.add_argument(
+        '--whole', action='store_true',
+        help='also run programs of at most 64 megabytes without --stream'
+    )
+    arguments = argument_parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in arguments.backends:
+            for size in arguments.sizes:
+                modes = ['stream']
+                if arguments.whole and size <= 64:
+                    modes.append('whole')
+                for mode in modes:
+                    command = [sys.executable, SBML_PATH, '--backend', backend]
+                    program = None
+                    if mode == 'stream':
+                        command += ['--stream', '-']
+                    else:
+                        program = os.path.join(directory, 'program.sbml')
+                        with open(program, 'w') as file_handler:
+                            write_program(file_handler, size)
+                        command.append(program)
+                    output, elapsed, memory = run(command, size, program)
+                    ok = output == expected_output(size)
+                    failed = failed or not ok
+                    print(
+                        f'{mode:<7} {backend:<8} {size:>6} MB '
+                        f'{elapsed:8.2f} s {size / elapsed:7.1f} MB/s '
+                        f'{memory:8.1f} MB peak  {"ok" if ok else "FAILED"}'
+                    )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
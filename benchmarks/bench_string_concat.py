@@ -0,0 +1,78 @@
+# Builds strings of growing length by appending (s = s + piece) and by
+# prepending (s = piece + s) in a while loop, and reports how long each size
+# takes and the time per piece, which stays flat when building a string is
+# linear.  The largest default size builds a string of several megabytes.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+PIECE = 'line of report text'
+
+IDIOMS = {
+    'append': f's = s + "{PIECE}";',
+    'prepend': f's = "{PIECE}" + s;',
+}
+
+
+def build_program(idiom, size):
+    return '{ ' + ' '.join([
+        's = ""; i = 0;',
+        f'while (i < {size}) {{ {IDIOMS[idiom]} i = i + 1; }}',
+        'print(s[0]); print(s[i * 19 - 1]);',
+    ]) + ' }'
+
+
+def expected_output(size):
+    return f'{PIECE[0]}\n{PIECE[-1]}\n'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10000, 100000, 300000]
+    )
+    argument_parser.add_argument(
+        '--backends', nargs='+', choices=BACKENDS,
+        default=['closure', 'vm', 'python']
+    )
+    arguments = argument_parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for idiom in IDIOMS:
+            for backend in arguments.backends:
+                for size in arguments.sizes:
+                    program = os.path.join(directory, f'{idiom}.sbml')
+                    with open(program, 'w') as file_handler:
+                        file_handler.write(build_program(idiom, size))
+                    start = time.perf_counter()
+                    process = subprocess.run(
+                        [sys.executable, SBML_PATH, '--backend', backend,
+                         program],
+                        capture_output=True, text=True
+                    )
+                    elapsed = time.perf_counter() - start
+                    ok = process.stdout == expected_output(size)
+                    failed = failed or not ok
+                    print(
+                        f'{idiom:<7} {backend:<8} {size:>8} '
+                        f'{elapsed:8.2f} s {elapsed / size * 1e6:8.2f} us'
+                        f'  {"ok" if ok else "FAILED"}'
+                    )
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,238 @@
+# Times lexing, parsing and evaluation of the programs of the benchmark
+# corpus and of generated programs, each stage on its own, and stores the
+# results as JSON so that the results of two commits can be compared:
+#
+#   python bench_suite.py run --output before.json
+#   (check out the other commit)
+#   python bench_suite.py run --output after.json
+#   python bench_suite.py compare before.json after.json
+#
+# Every stage runs a few times as warmup before its timed repetitions, and
+# is summarized by the minimum, median, mean, standard deviation and maximum
+# of its timings.  Comparisons go by median unless told otherwise, and exit
+# with 1 when a stage is slower than the threshold allows.
+
+
+import argparse
+import collections
+import datetime
+import functools
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+CORPUS_DIR_NAME = os.path.join(BENCHMARK_DIR_NAME, 'corpus')
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+
+import sbml
+import sbml_lexer
+import sbml_output
+import sbml_parser
+from generate_program import generate_program
+
+
+RESULTS_VERSION = 1
+
+
+def lex(source):
+    collections.deque(sbml_lexer.tokenize(source), maxlen=0)
+
+
+def time_stage(function, warmup, repetitions):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'max': max(samples),
+        'samples': samples,
+    }
+
+
+def load_programs(arguments):
+    programs = {}
+    if not arguments.no_corpus:
+        for path in sorted(glob.glob(os.path.join(CORPUS_DIR_NAME, '*.sbml'))):
+            with open(path, 'r') as file_handler:
+                programs[os.path.basename(path)] = file_handler.read()
+    for statements in arguments.generated:
+        programs[f'generated-{statements}'] = generate_program(
+            statements, arguments.seed
+        )
+    return programs
+
+
+def benchmark_program(source, arguments):
+    # The stages of one program.  Evaluation runs the tree of the program as
+    # sbml.py parses it, so it is BlockNode.evaluate for the tree backend.
+    parser = sbml_parser.get_parser()
+    output = sbml_output.NullOutput()
+    stages = {
+        'lex': lambda: lex(source),
+        'parse': lambda: parser.parse(source),
+    }
+    for backend in arguments.backends:
+        run = sbml.compile_program(sbml.parse(source), backend)
+        name = 'evaluate' if backend == 'tree' else f'evaluate-{backend}'
+        stages[name] = functools.partial(run_program, run, output)
+    return {
+        name: summarize(time_stage(
+            function, arguments.warmup, arguments.repetitions
+        ))
+        for name, function in stages.items()
+    }
+
+
+def run_program(run, output):
+    run({}, output)
+
+
+def git_commit():
+    # The commit benchmarked, marked if the tree has changes of its own
+    def git(*command):
+        return subprocess.run(
+            ['git', *command], cwd=BENCHMARK_DIR_NAME, capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    try:
+        commit = git('rev-parse', 'HEAD')
+        if git('status', '--porcelain', '--untracked-files=no'):
+            commit += '-dirty'
+        return commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(arguments):
+    results = {
+        'version': RESULTS_VERSION,
+        'commit': git_commit(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'warmup': arguments.warmup,
+        'repetitions': arguments.repetitions,
+        'programs': {},
+    }
+    print(f'{"program":<24} {"stage":<18} {"median":>10} {"min":>10} '
+          f'{"stdev":>10}')
+    for name, source in load_programs(arguments).items():
+        stages = benchmark_program(source, arguments)
+        results['programs'][name] = {'size': len(source), 'stages': stages}
+        for stage, summary in stages.items():
+            print(f'{name:<24} {stage:<18} '
+                  f'{summary["median"] * 1e3:>8.2f}ms '
+                  f'{summary["min"] * 1e3:>8.2f}ms '
+                  f'{summary["stdev"] * 1e3:>8.2f}ms')
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file_handler:
+            json.dump(results, file_handler, indent=2)
+            file_handler.write('\n')
+
+
+def compare(arguments):
+    with open(arguments.before, 'r') as file_handler:
+        before = json.load(file_handler)
+    with open(arguments.after, 'r') as file_handler:
+        after = json.load(file_handler)
+    print(f'before: {before["commit"]}')
+    print(f'after:  {after["commit"]}')
+    print(f'{"program":<24} {"stage":<18} {"before":>10} {"after":>10} '
+          f'{"change":>8}')
+
+    slower = False
+    for name, program in after['programs'].items():
+        if name not in before['programs']:
+            continue
+        for stage, summary in program['stages'].items():
+            old = before['programs'][name]['stages'].get(stage)
+            if old is None:
+                continue
+            statistic = arguments.statistic
+            change = summary[statistic] / old[statistic] - 1
+            if change > arguments.threshold:
+                verdict = 'slower'
+                slower = True
+            elif change < -arguments.threshold:
+                verdict = 'faster'
+            else:
+                verdict = ''
+            print(f'{name:<24} {stage:<18} '
+                  f'{old[statistic] * 1e3:>8.2f}ms '
+                  f'{summary[statistic] * 1e3:>8.2f}ms '
+                  f'{change:>+8.1%} {verdict}')
+    if slower:
+        sys.exit(1)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    commands = argument_parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser(
+        'run', help='time the stages of every program'
+    )
+    run_parser.add_argument('--warmup', type=int, default=1)
+    run_parser.add_argument('--repetitions', type=int, default=5)
+    run_parser.add_argument(
+        '--generated', metavar='STATEMENTS', type=int, nargs='*',
+        default=[1000, 4000],
+        help='also time generated programs of these numbers of statements'
+    )
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument(
+        '--no-corpus', action='store_true',
+        help='only time the generated programs'
+    )
+    run_parser.add_argument(
+        '--backends', nargs='+', choices=sbml.BACKENDS, default=['tree'],
+        help='backends to time evaluation with (default: tree)'
+    )
+    run_parser.add_argument(
+        '--output', metavar='FILE', help='store the results as JSON'
+    )
+
+    compare_parser = commands.add_parser(
+        'compare', help='compare two stored results'
+    )
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='relative change reported as slower or faster '
+        '(default: %(default)s)'
+    )
+    compare_parser.add_argument(
+        '--statistic', choices=('median', 'min', 'mean'), default='median',
+        help='timing compared, min being the least affected by a busy '
+        'machine (default: %(default)s)'
+    )
+
+    arguments = argument_parser.parse_args()
+    if arguments.command == 'run':
+        run_suite(arguments)
+    else:
+        compare(arguments)
+
+
+if '__main__' == __name__:
+    main()
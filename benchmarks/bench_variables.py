@@ -0,0 +1,64 @@
+# Runs a while loop that does little but read and assign variables on every
+# backend and reports how long each one takes.
+
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+SBML_PATH = os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml', 'sbml.py')
+
+BACKENDS = ('tree', 'closure', 'vm', 'python')
+
+
+def loop_program(iterations):
+    return '{ ' + ' '.join([
+        'i = 0; total = 0; a = 1; b = 2; l = [0, 0, 0];',
+        f'while (i < {iterations}) {{',
+        '    total = total + a * b;',
+        '    a = b; b = a;',
+        '    l[1] = total;',
+        '    i = i + 1;',
+        '}',
+        'print(total);',
+    ]) + ' }'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--iterations', type=int, default=100000)
+    argument_parser.add_argument('--repeat', type=int, default=3)
+    arguments = argument_parser.parse_args()
+
+    # a and b are both 2 after the first iteration
+    expected = f'{4 * arguments.iterations - 2}\n'
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, 'variables.sbml')
+        with open(program, 'w') as file_handler:
+            file_handler.write(loop_program(arguments.iterations))
+
+        failed = False
+        for backend in BACKENDS:
+            best = None
+            for _ in range(arguments.repeat):
+                start = time.perf_counter()
+                process = subprocess.run(
+                    [sys.executable, SBML_PATH, '--backend', backend, program],
+                    capture_output=True, text=True
+                )
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            status = 'ok' if process.stdout == expected else 'FAILED'
+            failed = failed or status != 'ok'
+            print(f'{backend:<8} {best:8.2f} s  {status}')
+    if failed:
+        sys.exit(1)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,101 @@
+# Generates SBML programs of any number of statements that mix the workloads
+# of the benchmark corpus: numeric while loops, lists built with :: and +,
+# string concatenation, deep expressions, tuple indexing and printing.  Every
+# statement uses variables of its own, so any prefix of a program runs, and
+# the same size and seed always give the same program.
+
+
+import argparse
+import random
+
+
+def numeric_loop(n, random_generator):
+    bound = random_generator.randint(5, 30)
+    return (
+        f'i{n} = 0; s{n} = 0; while (i{n} < {bound}) {{ '
+        f's{n} = s{n} + i{n} * {n % 7 + 1} mod 11; i{n} = i{n} + 1; }}'
+    )
+
+
+def list_building(n, random_generator):
+    bound = random_generator.randint(5, 30)
+    return (
+        f'l{n} = []; m{n} = []; j{n} = 0; while (j{n} < {bound}) {{ '
+        f'l{n} = j{n} :: l{n}; m{n} = m{n} + [j{n}]; j{n} = j{n} + 1; }}'
+    )
+
+
+def string_concat(n, random_generator):
+    bound = random_generator.randint(5, 30)
+    return (
+        f's{n} = "{n}"; k{n} = 0; while (k{n} < {bound}) {{ '
+        f's{n} = s{n} + "ab"; k{n} = k{n} + 1; }}'
+    )
+
+
+def deep_expression(n, random_generator):
+    def expression(depth):
+        if depth == 0:
+            return str(random_generator.randint(1, 9))
+        operator = random_generator.choice(['+', '-', '*', 'mod'])
+        if operator == 'mod':
+            # A right operand that cannot be 0
+            return f'({expression(depth - 1)} mod {depth + 1})'
+        return f'({expression(depth - 1)} {operator} ' \
+            f'{expression(depth - 1)})'
+    return f'e{n} = {expression(random_generator.randint(3, 7))};'
+
+
+def tuple_indexing(n, random_generator):
+    return (
+        f't{n} = ({n}, "t", [{n}, {random_generator.randint(0, 99)}]); '
+        f'u{n} = #1 t{n} + (#3 t{n})[1];'
+    )
+
+
+def print_statement(n, random_generator):
+    return random_generator.choice([
+        f'print({n});',
+        f'print("value " + "{n}");',
+        f'print([{n}, {n} * 2]);',
+        f'print(({n}, "p"));',
+    ])
+
+
+WORKLOADS = {
+    'numeric-loop': numeric_loop,
+    'list-building': list_building,
+    'string-concat': string_concat,
+    'deep-expression': deep_expression,
+    'tuple-indexing': tuple_indexing,
+    'print': print_statement,
+}
+
+
+def generate_program(statements, seed=0, workloads=None):
+    random_generator = random.Random(seed)
+    makers = [WORKLOADS[name] for name in workloads or WORKLOADS]
+    lines = ['{']
+    for n in range(statements):
+        make = random_generator.choice(makers)
+        lines.append('    ' + make(n, random_generator))
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('statements', type=int)
+    argument_parser.add_argument('--seed', type=int, default=0)
+    argument_parser.add_argument(
+        '--workload', choices=WORKLOADS, action='append',
+        help='only generate statements of this workload, any number of times'
+    )
+    arguments = argument_parser.parse_args()
+    print(generate_program(
+        arguments.statements, arguments.seed, arguments.workload
+    ), end='')
+
+
+if '__main__' == __name__:
+    main()
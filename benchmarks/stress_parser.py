@@ -0,0 +1,160 @@
+# Parses thousands of generated programs from many threads at once, each
+# thread with a Parser of its own, and checks that every AST is identical to
+# the one a single thread produces for the same program.  Some programs have
+# syntax errors, which must be reported the same way in both cases.
+
+
+import argparse
+import concurrent.futures
+import os
+import random
+import sys
+import threading
+import time
+
+
+BENCHMARK_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR_NAME, os.pardir, 'sbml'))
+
+
+import sbml_parser
+from sbml_ast_nodes import Node
+from sbml_errors import SyntaxError
+
+
+BINARY_OPERATORS = [
+    '+', '-', '*', '/', 'div', 'mod', '**', '<', '<=', '==', '<>', '>=', '>',
+    'andalso', 'orelse', '::', 'in',
+]
+
+
+def generate_expression(random_generator, depth):
+    choice = random_generator.randrange(8 if depth > 0 else 4)
+    if choice == 0:
+        return str(random_generator.randrange(1000))
+    elif choice == 1:
+        return random_generator.choice(['x', 'y', 'items', 'name'])
+    elif choice == 2:
+        return random_generator.choice(['True', 'False', '1.5', '"text"'])
+    elif choice == 3:
+        return random_generator.choice(['[]', '()', "'s'"])
+    elif choice == 4:
+        return '(' + generate_expression(random_generator, depth - 1) + ')'
+    elif choice == 5:
+        items = [
+            generate_expression(random_generator, depth - 1)
+            for _ in range(random_generator.randrange(1, 4))
+        ]
+        return '[' + ', '.join(items) + ']'
+    elif choice == 6:
+        return random_generator.choice(['not ', '-']) + \
+            generate_expression(random_generator, depth - 1)
+    return ' '.join([
+        generate_expression(random_generator, depth - 1),
+        random_generator.choice(BINARY_OPERATORS),
+        generate_expression(random_generator, depth - 1),
+    ])
+
+
+def generate_statement(random_generator, depth):
+    choice = random_generator.randrange(6 if depth > 0 else 3)
+    expression = generate_expression(random_generator, 3)
+    if choice == 0:
+        return f'x = {expression};'
+    elif choice == 1:
+        return f'print({expression});'
+    elif choice == 2:
+        return f'items[{expression}] = {expression};'
+    elif choice == 3:
+        return f'if ({expression}) ' + generate_block(random_generator, depth - 1)
+    elif choice == 4:
+        return f'if ({expression}) ' + \
+            generate_block(random_generator, depth - 1) + ' else ' + \
+            generate_block(random_generator, depth - 1)
+    return f'while ({expression}) ' + generate_block(random_generator, depth - 1)
+
+
+def generate_block(random_generator, depth):
+    statements = [
+        generate_statement(random_generator, depth)
+        for _ in range(random_generator.randrange(4))
+    ]
+    return '{ ' + ' '.join(statements) + ' }'
+
+
+def generate_program(seed):
+    random_generator = random.Random(seed)
+    program = generate_block(random_generator, 3)
+    if random_generator.random() < 0.1:
+        # Drop a character somewhere to get a syntax error now and then
+        position = random_generator.randrange(len(program))
+        program = program[:position] + program[position + 1:]
+    return program
+
+
+def dump(value):
+    # A structural copy of an AST that can be compared with ==
+    if isinstance(value, Node):
+        return (type(value).__name__, tuple(
+            (name, dump(getattr(value, name))) for name in value.__slots__
+        ))
+    elif isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(dump(item) for item in value))
+    return (type(value).__name__, value)
+
+
+def parse(parser, source):
+    try:
+        return dump(parser.parse(source))
+    except SyntaxError:
+        return 'SyntaxError'
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--programs', type=int, default=5000)
+    argument_parser.add_argument('--threads', type=int, default=16)
+    argument_parser.add_argument('--seed', type=int, default=0)
+    arguments = argument_parser.parse_args()
+
+    sources = [
+        generate_program(arguments.seed + n) for n in range(arguments.programs)
+    ]
+    # Many short switches make interleaving inside a parse likely
+    sys.setswitchinterval(1e-6)
+
+    parser = sbml_parser.Parser()
+    start = time.perf_counter()
+    expected = [parse(parser, source) for source in sources]
+    single_threaded = time.perf_counter() - start
+
+    thread_parsers = threading.local()
+
+    def parse_in_thread(source):
+        if not hasattr(thread_parsers, 'parser'):
+            thread_parsers.parser = parser.clone()
+        return parse(thread_parsers.parser, source)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(arguments.threads) as executor:
+        results = list(executor.map(parse_in_thread, sources))
+    multi_threaded = time.perf_counter() - start
+
+    mismatches = [
+        n for n, (result, want) in enumerate(zip(results, expected))
+        if result != want
+    ]
+    errors = expected.count('SyntaxError')
+    print(f'{len(sources)} programs ({errors} with syntax errors), '
+          f'{arguments.threads} threads')
+    print(f'single threaded {single_threaded:.2f} s, '
+          f'multi threaded {multi_threaded:.2f} s')
+    if mismatches:
+        print(f'{len(mismatches)} ASTs differ, first for program '
+              f'{mismatches[0]}:\n{sources[mismatches[0]]}')
+        sys.exit(1)
+    print('all ASTs match')
+
+
+if '__main__' == __name__:
+    main()
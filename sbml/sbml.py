@@ -3,6 +3,8 @@
 # patchan
 
 
+import argparse
+import importlib
 import os
 import sys
 
@@ -12,31 +14,509 @@ if MODULE_DIR_NAME not in sys.path:
     sys.path.insert(0, MODULE_DIR_NAME)
 
 
+import sbml_ast_nodes
+import sbml_limits
+import sbml_list
+import sbml_optimizer
+import sbml_output
 import sbml_parser
-from sbml_errors import SemanticError
+import sbml_resolver
+from sbml_errors import LimitError, SemanticError, SyntaxError
 
 
-def main():
-    if len(sys.argv) != 2:
-        print('usage: python3 sbml.py <file>')
-        sys.exit(1)
+# Backends other than the tree walker are only imported when selected, so
+# they add nothing to the startup of programs that do not use them.
+BACKENDS = {
+    'tree': None,
+    'closure': 'sbml_compiler',
+    'vm': 'sbml_vm',
+    'python': 'sbml_transpiler',
+}
+
+
+def get_backend(name):
+    return importlib.import_module(BACKENDS[name])
+
+
+def parse(source, cache=None):
+    if cache is not None:
+        return cache.parse(source, parse)
+    return sbml_optimizer.flatten(sbml_parser.get_parser().parse(source))
+
+
+def compile_program(ast, backend, limits=None):
+    if BACKENDS[backend] is None:
+        return sbml_resolver.bind(
+            ast.evaluate, sbml_resolver.resolve(ast), limits
+        )
+    return get_backend(backend).compile_program(ast, limits)
+
+
+class Program:
+
+    # A program compiled once to be run any number of times, each time on a
+    # symbol table of its own.  Running a program changes nothing but its
+    # symbol table and its output, so runs can happen on several threads at
+    # once.
+    __slots__ = ('backend', '_run')
+
+    def __init__(self, run, backend):
+        self.backend = backend
+        self._run = run
+
+    def run(self, symbol_table=None, output=None):
+        # Returns a new symbol table holding the variables of the program
+        # once it ends, with its SBML lists and strings turned into Python
+        # ones, and leaves the symbol table given as it is.  The program
+        # prints to standard output unless given an output.
+        symbol_table = dict(symbol_table) if symbol_table is not None else {}
+        self._run(symbol_table, output)
+        memo = {}
+        return {
+            name: sbml_list.to_python(value, memo)
+            for name, value in symbol_table.items()
+        }
+
+
+def compile(source, backend='tree', optimize=False, passes=None,
+            limits=None):
+    # Parses and compiles a program, raising SyntaxError if it is not one.
+    # The optimizer passes run when optimize is set, all of them unless
+    # passes names some.  Runs of a program compiled with sbml_limits.Limits
+    # raise LimitError when they go over one.
+    ast = parse(source)
+    if optimize:
+        # Runs can start with any variable bound
+        ast, _ = sbml_optimizer.optimize(
+            ast, passes, sbml_optimizer.unknown_variables(ast), limits
+        )
+    return Program(compile_program(ast, backend, limits), backend)
 
-    filename = sys.argv[1]
-    parser = sbml_parser.get_parser()
+
+def load_program(filename, source, backend, parse_source, limits=None,
+                 options=''):
+    # Programs with limits are not cached, and neither are programs whose
+    # options are None, see cache_options
+    if backend == 'python' and limits is None and options is not None:
+        return get_backend('python').load_cached_program(
+            filename, source, parse_source, options
+        )
+    return compile_program(parse_source(source), backend, limits)
+
+
+def cache_options(arguments):
+    # How parse_source optimizes programs, which the cache is keyed by with
+    # their source, or None when programs are not to be loaded from the
+    # cache, as the optimizer does not run on them to print its stats
+    if not arguments.optimize:
+        return ''
+    if arguments.optimizer_stats:
+        return None
+    passes = sorted(
+        name for name in sbml_optimizer.PASSES
+        if name not in arguments.disable_pass
+    )
+    return 'optimize ' + ' '.join(passes)
+
+
+def make_cache(arguments):
+    if arguments.ast_cache is None:
+        return None
+    import sbml_cache
+    return sbml_cache.ASTCache(arguments.ast_cache, arguments.ast_cache_size)
+
+
+def make_parse_source(arguments, cache=None):
+    # Returns a function parsing a source, through cache if given one, and
+    # optimizing it with -O, given the symbol table it runs on if it has
+    # variables bound before it runs
+    limits = make_limits(arguments)
+    passes = [
+        name for name in sbml_optimizer.PASSES
+        if name not in arguments.disable_pass
+    ]
+
+    def parse_source(source, symbol_table=None):
+        ast = parse(source, cache)
+        if not arguments.optimize:
+            return ast
+        variables = None
+        if symbol_table is not None:
+            variables = sbml_optimizer.bound_variables(
+                symbol_table, sbml_resolver.resolve(ast)
+            )
+        ast, eliminated = sbml_optimizer.optimize(
+            ast, passes, variables, limits
+        )
+        if arguments.optimizer_stats:
+            counts = ', '.join(
+                f'{name} {count}' for name, count in eliminated.items()
+            )
+            print(f'nodes eliminated: {counts}', file=sys.stderr)
+            eliminated, total = sbml_optimizer.count_checks(ast)
+            percent = 100 * eliminated / total if total else 0
+            print(
+                f'checks eliminated: {eliminated} of {total} ({percent:.0f}%)',
+                file=sys.stderr
+            )
+        return ast
+    return parse_source
+
+
+def run_stream(filename, backend, parse_source, output, profile=None,
+               limits=None):
+    # Runs each statement of a program as soon as it is read, from standard
+    # input if the file name is -, keeping the variables in one symbol table
+    # and the limits in one budget
+    import sbml_stream
+    symbol_table = {}
+    budget = sbml_limits.new_budget(limits)
+
+    def run_statement(source, line):
+        # The statements before this one have run, so the variables bound
+        # are known
+        ast = parse_source(source, symbol_table)
+        sbml_stream.shift_lines(ast, line - 1)
+        if profile is not None:
+            ast = instrument(ast, profile)
+        program = compile_program(ast, backend, limits)
+        program(symbol_table, output, budget)
+
+    if filename == '-':
+        sbml_stream.run_stream(sys.stdin, run_statement)
+        return
     with open(filename, 'r') as file_handler:
-        try:
+        sbml_stream.run_stream(file_handler, run_statement)
+
+
+# Backends that can run the wrapped nodes of a profiled program
+PROFILED_BACKENDS = ('tree', 'closure')
+
+
+def instrument(ast, profile):
+    import sbml_profiler
+    return sbml_profiler.instrument(ast, profile)
+
+
+def make_profile(arguments):
+    if not arguments.profile:
+        return None
+    import sbml_profiler
+    return sbml_profiler.Profile()
+
+
+def write_profile(profile, arguments, source):
+    report = profile.format(
+        arguments.profile_format, arguments.profile_sort, source
+    )
+    if arguments.profile_output is None:
+        sys.stderr.write(report)
+        return
+    with open(arguments.profile_output, 'w') as file_handler:
+        file_handler.write(report)
+
+
+def make_limits(arguments):
+    if arguments.max_steps is None and arguments.max_integer_bits is None \
+       and arguments.max_length is None:
+        return None
+    return sbml_limits.Limits(
+        arguments.max_steps, arguments.max_integer_bits, arguments.max_length
+    )
+
+
+def make_output(arguments):
+    if arguments.discard_output:
+        return sbml_output.NullOutput()
+    return sbml_output.BufferedOutput(buffer_size=arguments.output_buffer)
+
+
+def read_manifest(manifest):
+    # One program per line, relative to the manifest; '#' starts a comment
+    directory = os.path.dirname(manifest)
+    with open(manifest, 'r') as file_handler:
+        lines = [line.split('#', 1)[0].strip() for line in file_handler]
+    return [os.path.join(directory, line) for line in lines if line]
+
+
+SYNTAX_ERROR = str(SyntaxError())
+SEMANTIC_ERROR = str(SemanticError())
+
+
+# State of a batch worker process, set up once by initialize_worker so that
+# every program the worker runs reuses the same parser and backend.
+_worker = None
+
+
+def initialize_worker(arguments):
+    global _worker
+    sbml_parser.get_parser()
+    if BACKENDS[arguments.backend] is not None:
+        get_backend(arguments.backend)
+    _worker = (
+        arguments.backend,
+        make_parse_source(arguments, make_cache(arguments)),
+        make_limits(arguments), cache_options(arguments)
+    )
+
+
+def run_in_worker(filename):
+    # Runs one program of a batch, returning what it printed and how it ended
+    backend, parse_source, limits, options = _worker
+    output = sbml_output.CollectingOutput()
+    try:
+        with open(filename, 'r') as file_handler:
+            file_content = file_handler.read()
+        program = load_program(
+            filename, file_content, backend, parse_source, limits, options
+        )
+        program({}, output)
+        result = 'OK'
+    except SyntaxError as e:
+        output.print(e)
+        result = str(e)
+    except SemanticError as e:
+        output.print(e)
+        result = str(e)
+    except LimitError as e:
+        output.print(e)
+        result = str(e)
+    except Exception as e:
+        result = f'{type(e).__name__}: {e}'
+    return filename, output.getvalue(), result
+
+
+def run_batch(filenames, arguments):
+    # Output is printed per program in input order, or as one JSON object per
+    # line in the order the programs finish.  Exits with 1 if any program
+    # failed with something other than a syntax or semantic error or going
+    # over a limit.
+    # Imported here as they take longer to import than a small program takes
+    # to run.
+    import concurrent.futures
+    import json
+
+    failed = False
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=arguments.jobs, initializer=initialize_worker,
+        initargs=(arguments,)
+    ) as executor:
+        futures = [
+            executor.submit(run_in_worker, filename) for filename in filenames
+        ]
+        if arguments.jsonl:
+            futures = concurrent.futures.as_completed(futures)
+        for future in futures:
+            filename, output, result = future.result()
+            reported = result in ('OK', SYNTAX_ERROR, SEMANTIC_ERROR) or \
+                result.startswith(LimitError.MESSAGE)
+            failed = failed or not reported
+            if arguments.jsonl:
+                print(json.dumps(
+                    {'file': filename, 'output': output, 'result': result}
+                ), flush=True)
+            else:
+                print(f'==> {filename} <==')
+                print(output, end='')
+                if not reported:
+                    print(result)
+    if failed:
+        sys.exit(1)
+
+
+def parse_arguments():
+    argument_parser = argparse.ArgumentParser(prog='python3 sbml.py')
+    argument_parser.add_argument('files', metavar='file', nargs='*')
+    argument_parser.add_argument(
+        '--backend', choices=BACKENDS, default='tree',
+        help='how to execute the program (default: %(default)s)'
+    )
+    argument_parser.add_argument(
+        '--disassemble', action='store_true',
+        help='print the bytecode of the program instead of running it'
+    )
+    argument_parser.add_argument(
+        '--ast-cache', metavar='DIR',
+        help='reuse parsed programs stored in DIR instead of parsing again'
+    )
+    argument_parser.add_argument(
+        '--ast-cache-size', metavar='BYTES', type=int,
+        default=64 * 1024 * 1024,
+        help='evict the least recently used entries beyond this size'
+    )
+    argument_parser.add_argument(
+        '--ast-cache-stats', action='store_true',
+        help='report how often the AST cache had the programs parsed'
+    )
+    argument_parser.add_argument(
+        '-O', '--optimize', action='store_true',
+        help='rewrite the program with the optimizer passes before running it'
+    )
+    argument_parser.add_argument(
+        '--disable-pass', metavar='PASS', action='append', default=[],
+        choices=sbml_optimizer.PASSES,
+        help='skip an optimizer pass: %(choices)s'
+    )
+    argument_parser.add_argument(
+        '--optimizer-stats', action='store_true',
+        help='report how many nodes each optimizer pass eliminated'
+    )
+    argument_parser.add_argument(
+        '--membership-stats', action='store_true',
+        help='report how often in used and rebuilt the indexes of lists'
+    )
+    argument_parser.add_argument(
+        '--quickening-stats', action='store_true',
+        help='report how often the expressions of the tree backend '
+        'specialized and used their specializations'
+    )
+    argument_parser.add_argument(
+        '--stream', action='store_true',
+        help='run each statement as soon as it is read, from standard input '
+        'if the file is -'
+    )
+    argument_parser.add_argument(
+        '--output-buffer', metavar='BYTES', type=int,
+        default=sbml_output.DEFAULT_BUFFER_SIZE,
+        help='write printed lines once this much is waiting, '
+        'or every line if 0 (default: %(default)s)'
+    )
+    argument_parser.add_argument(
+        '--discard-output', action='store_true',
+        help='throw away what the program prints, for timing it'
+    )
+    argument_parser.add_argument(
+        '--max-steps', metavar='N', type=int,
+        help='stop programs after N iterations of their while loops'
+    )
+    argument_parser.add_argument(
+        '--max-integer-bits', metavar='N', type=int,
+        help='stop programs building integers of more than N bits with ** '
+        'or *'
+    )
+    argument_parser.add_argument(
+        '--max-length', metavar='N', type=int,
+        help='stop programs building strings or lists of more than N items '
+        'with + or ::'
+    )
+    argument_parser.add_argument(
+        '--profile', action='store_true',
+        help='report the count and the time of the nodes run on each line, '
+        'with the tree or closure backend'
+    )
+    argument_parser.add_argument(
+        '--profile-format', choices=('text', 'json', 'collapsed'),
+        default='text',
+        help='a table, JSON or the collapsed stacks of flame graph tools '
+        '(default: %(default)s)'
+    )
+    argument_parser.add_argument(
+        '--profile-sort', choices=('self', 'cumulative', 'count', 'line'),
+        default='self', help='order of the profile (default: %(default)s)'
+    )
+    argument_parser.add_argument(
+        '--profile-output', metavar='FILE',
+        help='write the profile to FILE instead of standard error'
+    )
+    argument_parser.add_argument(
+        '--manifest', metavar='FILE',
+        help='also run the programs listed in FILE, one path per line'
+    )
+    argument_parser.add_argument(
+        '--jobs', metavar='N', type=int, default=os.cpu_count(),
+        help='number of worker processes in batch mode (default: %(default)s)'
+    )
+    argument_parser.add_argument(
+        '--jsonl', action='store_true',
+        help='in batch mode, print a JSON line per program as it finishes'
+    )
+    arguments = argument_parser.parse_args()
+    if arguments.manifest is not None:
+        arguments.files += read_manifest(arguments.manifest)
+    if not arguments.files:
+        argument_parser.error('no program to run')
+    if len(arguments.files) > 1 or arguments.manifest is not None or \
+       arguments.jsonl:
+        arguments.batch = True
+        if arguments.disassemble:
+            argument_parser.error('--disassemble takes a single file')
+        if arguments.stream:
+            argument_parser.error('--stream takes a single file')
+        if arguments.profile:
+            argument_parser.error('--profile takes a single file')
+    else:
+        arguments.batch = False
+    if arguments.profile and arguments.backend not in PROFILED_BACKENDS:
+        backends = ', '.join(PROFILED_BACKENDS)
+        argument_parser.error(f'--profile runs on the backends {backends}')
+    return arguments
+
+
+def main():
+    arguments = parse_arguments()
+    if arguments.batch:
+        run_batch(arguments.files, arguments)
+        return
+
+    filename, = arguments.files
+    cache = make_cache(arguments)
+    parse_source = make_parse_source(arguments, cache)
+    output = make_output(arguments)
+    profile = make_profile(arguments)
+    limits = make_limits(arguments)
+    file_content = None
+    try:
+        if arguments.stream:
+            run_stream(
+                filename, arguments.backend, parse_source, output, profile,
+                limits
+            )
+            return
+        with open(filename, 'r') as file_handler:
             file_content = file_handler.read()
-            symbol_table = {}
-            ast = parser.parse(file_content)
-            ast.evaluate(symbol_table)
-        except SyntaxError as e:
-            print(e)
-        except SemanticError as e:
-            print(e)
-        except RuntimeError as e:
-            # This scenario should never happen
-            print(e)
-            raise e
+        symbol_table = {}
+        if arguments.disassemble:
+            sbml_vm = get_backend('vm')
+            ast = parse_source(file_content)
+            print(sbml_vm.disassemble(sbml_vm.compile_program(ast, limits)))
+            return
+        if profile is not None:
+            program = compile_program(
+                instrument(parse_source(file_content), profile),
+                arguments.backend, limits
+            )
+        else:
+            program = load_program(
+                filename, file_content, arguments.backend, parse_source,
+                limits, cache_options(arguments)
+            )
+        program(symbol_table, output)
+    except SyntaxError as e:
+        output.print(e)
+    except SemanticError as e:
+        output.print(e)
+    except LimitError as e:
+        output.print(e)
+    except RuntimeError as e:
+        # This scenario should never happen
+        output.print(e)
+        raise e
+    finally:
+        output.flush()
+        if profile is not None:
+            write_profile(profile, arguments, file_content)
+        if arguments.membership_stats:
+            print(
+                f'membership index: {sbml_list.membership_stats}',
+                file=sys.stderr
+            )
+        if arguments.quickening_stats:
+            print(
+                f'quickening: {sbml_ast_nodes.quickening_stats}',
+                file=sys.stderr
+            )
+        if arguments.ast_cache_stats and cache is not None:
+            print(f'ast cache: {cache}', file=sys.stderr)
 
 
 if '__main__' == __name__:
@@ -1,189 +1,313 @@
-import os
-import sys
-
-
-MODULE_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
-if MODULE_DIR_NAME not in sys.path:
-    sys.path.insert(0, MODULE_DIR_NAME)
-
-
 import functools
 import operator
 from abc import ABC, abstractmethod
 from sbml_enums import Keyword, Operator
 from sbml_errors import SemanticError
-from sbml_utils import is_identifier, is_string, of_valid_types, Switch
+from sbml_limits import apply_limited
+from sbml_list import SbmlList
+from sbml_string import STRING_TYPES, SbmlString, concat, flatten
+from sbml_operations import (
+    UNCHECKED_BINARY_OPERATIONS, UNCHECKED_UNARY_OPERATIONS
+)
+from sbml_utils import (
+    UNBOUND, copy_value, is_mutable, of_valid_types, Switch
+)
 
 class Node(ABC):
 
-    def __init__(self, *args, **kwargs):
-        self.args = args
-        self.kwargs = kwargs
+    # Nodes keep their children in typed slots rather than in a __dict__,
+    # as many parsed programs are kept in memory at once.  Every node also
+    # has the line of the source it was parsed from, or None if unknown.
+    __slots__ = ()
 
     def __repr__(self):
-        return f'args is {self.args} and kwargs is {self.kwargs}'
+        fields = ', '.join(
+            f'{name}={getattr(self, name)!r}' for name in self.__slots__
+        )
+        return f'{type(self).__name__}({fields})'
 
     @abstractmethod
-    def evaluate(self, symbol_table):
+    def evaluate(self, frame):
+        # Evaluates the node on the frame of a run, see sbml_resolver
         pass
 
 
 class BlockNode(Node):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.statements = list(args)
+    __slots__ = ('statements', 'line')
 
-    def prepend_statement(self, statement):
-        self.statements.insert(0, statement)
-        return self
+    def __init__(self, statements=None, line=None):
+        self.statements = statements if statements is not None else []
+        self.line = line
 
     def append_statement(self, statement):
         self.statements.append(statement)
         return self
 
-    def evaluate(self, symbol_table):
+    def evaluate(self, frame):
         for line in self.statements:
-            evaluate_node(line, symbol_table)
+            evaluate_node(line, frame)
 
 
-class ExpressionNode(Node):
+class LiteralNode(Node):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def evaluate(self, symbol_table):
-        op = self.kwargs.get('operator')
-        if op is None:
-            if is_string(self.args[0]):
-                return self.args[0][1:-1]
-            return self.args[0]
-
-        args = evaluate_nodes(self.args, symbol_table)
-        with Switch(op) as case:
-            if case(Operator.ORELSE):
-                if of_valid_types(args, [[bool]]):
-                    return functools.reduce(operator.or_, args)
-                raise SemanticError
-            elif case(Operator.ANDALSO):
-                if of_valid_types(args, [[bool]]):
-                    return functools.reduce(operator.and_, args)
-                raise SemanticError
-            elif case(Operator.NOT):
-                if of_valid_types(args, [[bool]]): 
-                    return not args[0]
-                raise SemanticError
+    # The value of a literal token, strings without their quotes
+    __slots__ = ('value', 'line')
 
-            elif case(Operator.LESS_THAN):
-                if of_valid_types(args, [[int, float], [str]]):
-                    return functools.reduce(operator.lt, args)
-                raise SemanticError
-            elif case(Operator.LESS_EQUAL):
-                if of_valid_types(args, [[int, float], [str]]):
-                    return functools.reduce(operator.le, args)
-                raise SemanticError
-            elif case(Operator.GREATER_THAN):
-                if of_valid_types(args, [[int, float], [str]]):
-                    return functools.reduce(operator.gt, args)
-                raise SemanticError
-            elif case(Operator.GREATER_EQUAL):
-                if of_valid_types(args, [[int, float], [str]]):
-                    return functools.reduce(operator.ge, args)
-                raise SemanticError
-            elif case(Operator.EQUAL):
-                if of_valid_types(args, [[int, float], [str]]):
-                    return functools.reduce(operator.eq, args)
-                raise SemanticError
-            elif case(Operator.NOT_EQUAL):
-                if of_valid_types(args, [[int, float], [str]]):
-                    return functools.reduce(operator.ne, args)
-                raise SemanticError
+    def __init__(self, value, line=None):
+        self.value = value
+        self.line = line
 
-            elif case(Operator.CONS):
-                if of_valid_types([args[1]], [[list]]):
-                    args[1].insert(0, args[0])
-                    return args[1]
-                raise SemanticError
-            elif case(Operator.IN):
-                if of_valid_types([args[1]], [[list]]) or \
-                   of_valid_types(args, [[str]]):
-                    return args[0] in args[1]
-                raise SemanticError
-            
-            elif case(Operator.PLUS):
-                if of_valid_types(args, [[int, float], [str], [list]]):
-                    return functools.reduce(operator.add, args)
-                raise SemanticError
-            elif case(Operator.MINUS):
-                if of_valid_types(args, [[int, float]]):
-                    return functools.reduce(operator.sub, args)
-                raise SemanticError
-            elif case(Operator.TIMES):
-                if of_valid_types(args, [[int, float]]):
-                    return functools.reduce(operator.mul, args)
-                raise SemanticError
-            elif case(Operator.DIVIDE):
-                if of_valid_types(args, [[int, float]]) and 0 not in args[1:]:
-                    return functools.reduce(operator.truediv, args)
-                raise SemanticError
-            elif case(Operator.DIV):
-                if of_valid_types(args, [[int]]) and 0 not in args[1:]:
-                    return functools.reduce(operator.floordiv, args)
-                raise SemanticError
-            elif case(Operator.MOD):
-                if of_valid_types(args, [[int]]):
-                    return functools.reduce(operator.mod, args)
-                raise SemanticError
-            elif case(Operator.EXPONENT):
-                if of_valid_types(args, [[int, float]]):
-                    return functools.reduce(operator.pow, args)
-                raise SemanticError
+    def evaluate(self, frame):
+        return self.value
 
-            elif case(Operator.LBRACKET):
-                if of_valid_types([args[0]], [[list, str]]) and \
-                   of_valid_types([args[1]], [[int]]) and \
-                   0 <= args[1] < len(args[0]):
-                    return args[0][args[1]]
-                raise SemanticError
-            elif case(Operator.TUPLE_INDEX):
-                if of_valid_types([args[0]], [[int]]) and \
-                   of_valid_types([args[1]], [[tuple]]) and \
-                   0 < args[0] <= len(args[1]):
-                    return args[1][args[0] - 1]
-                raise SemanticError
 
-            raise RuntimeError('Case not handled')
+class ConstantNode(Node):
+
+    # A value computed before the program runs.  Values holding lists are
+    # copied on every evaluation, as the program may change what it gets.
+    __slots__ = ('value', 'mutable', 'line')
+
+    def __init__(self, value, line=None):
+        self.value = value
+        self.mutable = is_mutable(value)
+        self.line = line
+
+    def evaluate(self, frame):
+        if self.mutable:
+            return copy_value(self.value)
+        return self.value
+
+
+# Work items of ExpressionNode.evaluate
+_EVALUATE = 0
+_APPLY = 1
+_FOLD = 2
+
+
+# Checked binary expressions specialize themselves as they run, like the
+# specializing interpreter of CPython 3.11.  The type checks of an operator
+# only depend on the types of its operands, so once a node has seen operands
+# of the same types QUICKENING_WARMUP times in a row, it applies its operator
+# with the unchecked operation for as long as its operands have those exact
+# types.  Operands of other types take the generic path, with every check,
+# and a node that misses QUICKENING_MISSES times goes back to warming up, for
+# twice as long as before up to QUICKENING_MAX_WARMUP.
+QUICKENING_WARMUP = 8
+QUICKENING_MISSES = 16
+QUICKENING_MAX_WARMUP = 1024
+
+
+class QuickeningStats:
+
+    __slots__ = ('specializations', 'hits', 'misses', 'deoptimizations')
+
+    def __init__(self):
+        self.specializations = 0
+        self.hits = 0
+        self.misses = 0
+        self.deoptimizations = 0
+
+    def __repr__(self):
+        return f'specializations {self.specializations}, hits {self.hits}, ' \
+            f'misses {self.misses}, deoptimizations {self.deoptimizations}'
+
+
+quickening_stats = QuickeningStats()
+
+
+def _specialized_operation(op, left_type, right_type):
+    # The operation of a binary operator for operands of valid exact types
+    if op == Operator.PLUS.value:
+        return concat if left_type in STRING_TYPES else operator.add
+    return UNCHECKED_BINARY_OPERATIONS[op]
+
+
+class ExpressionNode(Node):
+
+    # Operands are nodes or plain values; unary operators have no right one.
+    # Nodes whose operand types are proven valid are not checked.  The other
+    # slots hold the quickening state of the node: the operand types it saw
+    # last while warming up, the operand types it is specialized for with
+    # its specialized operation, as one tuple so that threads running the
+    # node never see half of it, or None, the evaluations left to warm up or
+    # misses left to deoptimize, and the length of its next warmup.
+    __slots__ = ('operator', 'left', 'right', 'checked', 'line', 'types',
+                 'specialized', 'counter', 'warmup')
+
+    def __init__(self, operator, left, right=None, checked=True, line=None):
+        self.operator = operator
+        self.left = left
+        self.right = right
+        self.checked = checked
+        self.line = line
+        self.types = None
+        self.specialized = None
+        self.counter = QUICKENING_WARMUP
+        self.warmup = QUICKENING_WARMUP
+
+    @property
+    def operands(self):
+        if self.right is None:
+            return (self.left,)
+        return (self.left, self.right)
+
+    def evaluate(self, frame):
+        budget = frame[-2]
+        if type(self.left) not in _NESTED_TYPES and \
+           type(self.right) not in _NESTED_TYPES:
+            args = evaluate_nodes(self.operands, frame)
+            apply = self.apply if self.checked else apply_unchecked
+            if budget is not None:
+                return apply_limited(budget.limits, apply, self.operator, args)
+            return apply(self.operator, args)
+
+        # Operands that are expressions or chains themselves are evaluated
+        # with an explicit stack instead of by recursion, so that deeply
+        # nested expressions do not hit the recursion limit.
+        values = []
+        work = [(_APPLY, self)]
+        work.extend((_EVALUATE, arg) for arg in reversed(self.operands))
+        while work:
+            action, node = work.pop()
+            if action == _APPLY:
+                count = 1 if node.right is None else 2
+                args = values[-count:]
+                del values[-count:]
+                apply = node.apply if node.checked else apply_unchecked
+                if budget is not None:
+                    values.append(apply_limited(
+                        budget.limits, apply, node.operator, args
+                    ))
+                else:
+                    values.append(apply(node.operator, args))
+            elif action == _FOLD:
+                # The next operand of a chain, folded into its value
+                args = [values[-2], values[-1]]
+                del values[-1]
+                apply = apply_operator if node.checked else apply_unchecked
+                if budget is not None:
+                    values[-1] = apply_limited(
+                        budget.limits, apply, node.operator, args
+                    )
+                else:
+                    values[-1] = apply(node.operator, args)
+            elif type(node) is ExpressionNode:
+                work.append((_APPLY, node))
+                work.extend(
+                    (_EVALUATE, arg) for arg in reversed(node.operands)
+                )
+            elif type(node) is ChainNode:
+                for arg in reversed(node.operands[1:]):
+                    work.append((_FOLD, node))
+                    work.append((_EVALUATE, arg))
+                work.append((_EVALUATE, node.operands[0]))
+            else:
+                values.append(evaluate_node(node, frame))
+        return values[0]
+
+    def apply(self, op, args):
+        # Applies op, the operator of the node, to its evaluated operands as
+        # apply_operator does, specialized once warmed up
+        specialized = self.specialized
+        if specialized is not None:
+            left, right = args
+            left_type, right_type, operation = specialized
+            if type(left) is left_type and type(right) is right_type:
+                quickening_stats.hits += 1
+                return operation(left, right)
+            quickening_stats.misses += 1
+            self.counter -= 1
+            # Threads can take the counter below 0 together
+            if self.counter <= 0:
+                quickening_stats.deoptimizations += 1
+                self.specialized = None
+                self.types = None
+                self.warmup = min(2 * self.warmup, QUICKENING_MAX_WARMUP)
+                self.counter = self.warmup
+            return apply_operator(op, args)
+
+        value = apply_operator(op, args)
+        if len(args) == 2:
+            # The operands passed every check, so their types are valid
+            types = (type(args[0]), type(args[1]))
+            if types != self.types:
+                self.types = types
+                self.counter = self.warmup
+            self.counter -= 1
+            if self.counter <= 0:
+                self.counter = QUICKENING_MISSES
+                self.specialized = (
+                    *types, _specialized_operation(op.value, *types)
+                )
+                quickening_stats.specializations += 1
+        return value
+
+
+class ChainNode(Node):
+
+    # A left associative chain of one operator over any number of operands,
+    # evaluated as a left fold with the same checks as nested binary nodes
+    __slots__ = ('operator', 'operands', 'checked', 'line')
+
+    def __init__(self, operator, operands, checked=True, line=None):
+        self.operator = operator
+        self.operands = operands
+        self.checked = checked
+        self.line = line
+
+    def evaluate(self, frame):
+        apply = apply_operator if self.checked else apply_unchecked
+        budget = frame[-2]
+        value = evaluate_node(self.operands[0], frame)
+        for index in range(1, len(self.operands)):
+            operand = evaluate_node(self.operands[index], frame)
+            if budget is not None:
+                value = apply_limited(
+                    budget.limits, apply, self.operator, [value, operand]
+                )
+            else:
+                value = apply(self.operator, [value, operand])
+        return value
+
+
+# The operands ExpressionNode.evaluate evaluates with its stack
+_NESTED_TYPES = frozenset((ExpressionNode, ChainNode))
 
 
 class ConditionNode(Node):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    # An if statement has an orelse block only when it has an else branch
+    __slots__ = ('keyword', 'condition', 'body', 'orelse', 'line')
+
+    def __init__(self, keyword, condition, body, orelse=None, line=None):
+        self.keyword = keyword
+        self.condition = condition
+        self.body = body
+        self.orelse = orelse
+        self.line = line
 
-    def evaluate(self, symbol_table):
-        keyword = self.kwargs.get('keyword')
-        with Switch(keyword) as case:
+    def evaluate(self, frame):
+        with Switch(self.keyword) as case:
             if case(Keyword.IF):
-                condition = self.args[0].evaluate(symbol_table)
-                if of_valid_types([condition], [[bool]]):
-                    if condition: 
-                        return evaluate_node(self.args[1], symbol_table)
-                    return None
-                raise SemanticError
-            elif case(Keyword.IF + Keyword.ELSE):
-                condition = self.args[0].evaluate(symbol_table)
+                condition = self.condition.evaluate(frame)
                 if of_valid_types([condition], [[bool]]):
                     if condition:
-                        return evaluate_node(self.args[1], symbol_table)
-                    return evaluate_node(self.args[2], symbol_table)
+                        return evaluate_node(self.body, frame)
+                    elif self.orelse is not None:
+                        return evaluate_node(self.orelse, frame)
+                    return None
                 raise SemanticError
             elif case(Keyword.WHILE):
-                condition = evaluate_node(self.args[0], symbol_table)
+                budget = frame[-2]
+                condition = evaluate_node(self.condition, frame)
                 if of_valid_types([condition], [[bool]]):
                     while condition:
-                        evaluate_node(self.args[1], symbol_table)
+                        if budget is not None:
+                            budget.step()
+                        evaluate_node(self.body, frame)
 
-                        condition = evaluate_node(self.args[0], symbol_table)
+                        condition = evaluate_node(self.condition, frame)
                         if not of_valid_types([condition], [[bool]]):
                             break
                     else:
@@ -194,82 +318,232 @@ class ConditionNode(Node):
 
 class StatementNode(Node):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def evaluate(self, symbol_table):
-        keyword = self.kwargs.get('keyword')
-        with Switch(keyword) as case:
+    # A print has only a value; an assignment also has a target, which is a
+    # variable name unless the assignment has an index.  Assignments to a
+    # variable name have the slot of the variable once resolved.
+    __slots__ = ('keyword', 'value', 'target', 'index', 'slot', 'line')
+
+    def __init__(self, keyword, value, target=None, index=None, slot=None,
+                 line=None):
+        self.keyword = keyword
+        self.value = value
+        self.target = target
+        self.index = index
+        self.slot = slot
+        self.line = line
+
+    def evaluate(self, frame):
+        with Switch(self.keyword) as case:
             if case(Keyword.PRINT):
-                expression = evaluate_node(self.args[0], symbol_table)
-                print(expression)
+                expression = evaluate_node(self.value, frame)
+                frame[-1].print(expression)
                 return
             elif case(Operator.TAKES_VALUE):
-                if len(self.args) == 2:
-                    symbol = self.args[0]
-                    value = evaluate_node(self.args[1], symbol_table)
-                    symbol_table[symbol] = value
+                if self.index is None:
+                    value = evaluate_node(self.value, frame)
+                    frame[self.slot] = value
                     return
-                elif len(self.args) == 3:
-                    if is_identifier(self.args[0]):
-                        symbol = self.args[0]
-                        index = evaluate_node(self.args[1], symbol_table) 
-                        value = evaluate_node(self.args[2], symbol_table) 
-
-                        array = evaluate_node(VariableNode(symbol), symbol_table)
+                else:
+                    if self.slot is not None:
+                        index = evaluate_node(self.index, frame)
+                        value = evaluate_node(self.value, frame)
+
+                        array = frame[self.slot]
+                        if array is UNBOUND:
+                            raise SemanticError
                         array[index] = value
-                        symbol_table[symbol] = array;
                         return
                     else:
-                        self.args = evaluate_nodes(self.args, symbol_table)
-                        symbol, index, value = self.args
-
-                        symbol[index] = value
+                        target, index, value = evaluate_nodes(
+                            (self.target, self.index, self.value), frame
+                        )
+                        target[index] = value
                         return
             raise RuntimeError('Case not handled')
     
 
 class CollectionNode(Node):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.items = list(args) if args is not None else []
+    __slots__ = ('type', 'items', 'line')
 
-    def prepend_item(self, item):
-        self.items.insert(0, item)
-        return self
+    def __init__(self, type, items=None, line=None):
+        self.type = type
+        self.items = items if items is not None else []
+        self.line = line
 
     def append_item(self, item):
         self.items.append(item)
         return self
 
-    def evaluate(self, symbol_table):
-        collection_type = self.kwargs.get('type')
-        with Switch(collection_type) as case:
+    def evaluate(self, frame):
+        with Switch(self.type) as case:
             if case(tuple):
                 items = ()
                 for elem in self.items:
-                    items += (evaluate_node(elem, symbol_table),)
+                    items += (evaluate_node(elem, frame),)
                 return items
-            elif case(list):
-                return evaluate_nodes(self.items, symbol_table)
+            elif case(SbmlList):
+                return SbmlList.wrap(evaluate_nodes(self.items, frame))
             raise RuntimeError('Case not handled')
 
 
 class VariableNode(Node):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def evaluate(self, symbol_table):
-        if self.args[0] in symbol_table:
-            return symbol_table[self.args[0]]
-        raise SemanticError
-
-
-def evaluate_nodes(nodes, symbol_table):
-    return [evaluate_node(node, symbol_table) for node in nodes]
-
-
-def evaluate_node(node, symbol_table):
-    return node.evaluate(symbol_table) if isinstance(node, Node) else node
+    # The slot of the variable in the frame, once resolved
+    __slots__ = ('name', 'slot', 'line')
+
+    def __init__(self, name, slot=None, line=None):
+        self.name = name
+        self.slot = slot
+        self.line = line
+
+    def evaluate(self, frame):
+        value = frame[self.slot]
+        if value is UNBOUND:
+            raise SemanticError
+        return value
+
+
+class ProfiledNode(Node):
+
+    # Wraps a node to time its evaluations, see sbml_profiler
+    __slots__ = ('node', 'profile', 'run')
+
+    def __init__(self, node, profile):
+        self.node = node
+        self.profile = profile
+        self.run = profile.wrap(node, node.evaluate)
+
+    @property
+    def line(self):
+        return self.node.line
+
+    def evaluate(self, frame):
+        return self.run(frame)
+
+
+# The fields of each node class that hold its children, as nodes, plain
+# values or lists of them
+CHILD_FIELDS = {
+    BlockNode: ('statements',),
+    ChainNode: ('operands',),
+    CollectionNode: ('items',),
+    ExpressionNode: ('left', 'right'),
+    ConditionNode: ('condition', 'body', 'orelse'),
+    StatementNode: ('value', 'target', 'index'),
+    ProfiledNode: ('node',),
+}
+
+
+def evaluate_nodes(nodes, frame):
+    return [evaluate_node(node, frame) for node in nodes]
+
+
+def evaluate_node(node, frame):
+    return node.evaluate(frame) if isinstance(node, Node) else node
+
+
+def apply_operator(op, args):
+    with Switch(op) as case:
+        if case(Operator.ORELSE):
+            if of_valid_types(args, [[bool]]):
+                return functools.reduce(operator.or_, args)
+            raise SemanticError
+        elif case(Operator.ANDALSO):
+            if of_valid_types(args, [[bool]]):
+                return functools.reduce(operator.and_, args)
+            raise SemanticError
+        elif case(Operator.NOT):
+            if of_valid_types(args, [[bool]]): 
+                return not args[0]
+            raise SemanticError
+
+        elif case(Operator.LESS_THAN):
+            if of_valid_types(args, [[int, float], [str, SbmlString]]):
+                return functools.reduce(operator.lt, args)
+            raise SemanticError
+        elif case(Operator.LESS_EQUAL):
+            if of_valid_types(args, [[int, float], [str, SbmlString]]):
+                return functools.reduce(operator.le, args)
+            raise SemanticError
+        elif case(Operator.GREATER_THAN):
+            if of_valid_types(args, [[int, float], [str, SbmlString]]):
+                return functools.reduce(operator.gt, args)
+            raise SemanticError
+        elif case(Operator.GREATER_EQUAL):
+            if of_valid_types(args, [[int, float], [str, SbmlString]]):
+                return functools.reduce(operator.ge, args)
+            raise SemanticError
+        elif case(Operator.EQUAL):
+            if of_valid_types(args, [[int, float], [str, SbmlString]]):
+                return functools.reduce(operator.eq, args)
+            raise SemanticError
+        elif case(Operator.NOT_EQUAL):
+            if of_valid_types(args, [[int, float], [str, SbmlString]]):
+                return functools.reduce(operator.ne, args)
+            raise SemanticError
+
+        elif case(Operator.CONS):
+            if of_valid_types([args[1]], [[SbmlList]]):
+                args[1].prepend(args[0])
+                return args[1]
+            raise SemanticError
+        elif case(Operator.IN):
+            if of_valid_types([args[1]], [[SbmlList]]) or \
+               of_valid_types(args, [[str, SbmlString]]):
+                return flatten(args[0]) in args[1]
+            raise SemanticError
+        
+        elif case(Operator.PLUS):
+            if of_valid_types(args, [[str, SbmlString]]):
+                return concat(*args)
+            if of_valid_types(args, [[int, float], [SbmlList]]):
+                return functools.reduce(operator.add, args)
+            raise SemanticError
+        elif case(Operator.MINUS):
+            if of_valid_types(args, [[int, float]]):
+                return functools.reduce(operator.sub, args)
+            raise SemanticError
+        elif case(Operator.TIMES):
+            if of_valid_types(args, [[int, float]]):
+                return functools.reduce(operator.mul, args)
+            raise SemanticError
+        elif case(Operator.DIVIDE):
+            if of_valid_types(args, [[int, float]]) and 0 not in args[1:]:
+                return functools.reduce(operator.truediv, args)
+            raise SemanticError
+        elif case(Operator.DIV):
+            if of_valid_types(args, [[int]]) and 0 not in args[1:]:
+                return functools.reduce(operator.floordiv, args)
+            raise SemanticError
+        elif case(Operator.MOD):
+            if of_valid_types(args, [[int]]):
+                return functools.reduce(operator.mod, args)
+            raise SemanticError
+        elif case(Operator.EXPONENT):
+            if of_valid_types(args, [[int, float]]):
+                return functools.reduce(operator.pow, args)
+            raise SemanticError
+
+        elif case(Operator.LBRACKET):
+            if of_valid_types(
+                [args[0]], [[SbmlList, str, SbmlString]]
+            ) and of_valid_types([args[1]], [[int]]) and \
+               0 <= args[1] < len(args[0]):
+                return args[0][args[1]]
+            raise SemanticError
+        elif case(Operator.TUPLE_INDEX):
+            if of_valid_types([args[0]], [[int]]) and \
+               of_valid_types([args[1]], [[tuple]]) and \
+               0 < args[0] <= len(args[1]):
+                return args[1][args[0] - 1]
+            raise SemanticError
+
+        raise RuntimeError('Case not handled')
+
+
+def apply_unchecked(op, args):
+    # For operands of types the type inference pass proved to be valid
+    if len(args) == 1:
+        return UNCHECKED_UNARY_OPERATIONS[op.value](args[0])
+    return UNCHECKED_BINARY_OPERATIONS[op.value](*args)
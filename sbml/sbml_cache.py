@@ -0,0 +1,145 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+
+# A content addressed cache of parsed programs.  Entries are keyed by a hash
+# of the source text and of the modules that decide what the AST of a source
+# looks like, so editing the grammar or the node classes invalidates every
+# entry at once.  Entries are written atomically and the least recently used
+# ones are evicted when the cache grows past its size limit.
+
+ENTRY_SUFFIX = '.ast'
+
+GRAMMAR_MODULES = (
+    'sbml_lexer.py', 'sbml_parser.py', 'sbml_ast_nodes.py', 'sbml_enums.py',
+    'sbml_optimizer.py'
+)
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+_grammar_version = None
+
+
+def grammar_version():
+    global _grammar_version
+    if _grammar_version is None:
+        digest = hashlib.sha256()
+        digest.update(sys.version.encode())
+        module_dir_name = os.path.dirname(__file__)
+        for module in GRAMMAR_MODULES:
+            path = os.path.join(module_dir_name, module)
+            with open(path, 'rb') as file_handler:
+                digest.update(file_handler.read())
+        _grammar_version = digest.hexdigest()
+    return _grammar_version
+
+
+class ASTCache:
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f'hits {self.hits}, misses {self.misses}, ' \
+            f'stores {self.stores}, evictions {self.evictions}'
+
+    def key(self, source):
+        digest = hashlib.sha256(grammar_version().encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, source):
+        path = self.path(self.key(source))
+        try:
+            with open(path, 'rb') as file_handler:
+                ast = pickle.loads(zlib.decompress(file_handler.read()))
+            # The modification time doubles as the last use for eviction.
+            os.utime(path)
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError,
+                AttributeError, ImportError, IndexError, TypeError,
+                ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ast
+
+    def put(self, source, ast):
+        try:
+            data = zlib.compress(
+                pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)
+            )
+        except RecursionError:
+            # Too deep to serialize; the program is simply parsed every time.
+            return False
+        if len(data) > self.max_size:
+            return False
+
+        try:
+            descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix='.tmp'
+            )
+        except OSError:
+            return False
+        try:
+            with os.fdopen(descriptor, 'wb') as file_handler:
+                file_handler.write(data)
+            os.replace(temporary_path, self.path(self.key(source)))
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            return False
+
+        self.stores += 1
+        self.evict()
+        return True
+
+    def parse(self, source, parse):
+        ast = self.get(source)
+        if ast is None:
+            ast = parse(source)
+            self.put(source, ast)
+        return ast
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(self.directory) as directory_entries:
+                for entry in directory_entries:
+                    if not entry.name.endswith(ENTRY_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_size += stat.st_size
+        except OSError:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+            total_size -= size
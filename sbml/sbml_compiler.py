@@ -0,0 +1,372 @@
+from sbml_ast_nodes import (
+    Node, BlockNode, ChainNode, ConditionNode, ConstantNode, ExpressionNode,
+    StatementNode, CollectionNode, LiteralNode, ProfiledNode, VariableNode
+)
+from sbml_enums import Keyword, Operator
+from sbml_errors import LimitError, SemanticError
+from sbml_limits import SIZED_TYPES, is_limited, limit_operation
+from sbml_list import SbmlList
+from sbml_operations import (
+    BINARY_OPERATIONS, UNARY_OPERATIONS, UNCHECKED_BINARY_OPERATIONS,
+    UNCHECKED_UNARY_OPERATIONS
+)
+from sbml_resolver import bind, resolve
+from sbml_string import SbmlString
+from sbml_utils import UNBOUND, copy_value
+
+
+# Turns an AST into a tree of closures, one per node, so that the operator
+# and keyword of every node are resolved once at compile time instead of on
+# every evaluation.  Each closure takes the frame of a run, see sbml_resolver,
+# and behaves exactly like the evaluate method of the node it was compiled
+# from.  Programs compiled with limits, see sbml_limits, check them in the
+# closures of loops and of the operators that build values, and only those.
+
+
+# Expressions nesting operators deeper than this are evaluated with a stack
+# of values, as closures nested as deep would recurse as deep when they run
+MAX_CLOSURE_DEPTH = 100
+
+
+def compile_program(ast, limits=None):
+    names = resolve(ast)
+    return bind(compile_node(ast, limits), names, limits)
+
+
+def compile_node(node, limits=None):
+    if not isinstance(node, Node):
+        return _compile_constant(node)
+
+    compiler = _COMPILERS.get(type(node))
+    if compiler is None:
+        raise RuntimeError('Case not handled')
+    return compiler(node, limits)
+
+
+def compile_nodes(nodes, limits=None):
+    return tuple(compile_node(node, limits) for node in nodes)
+
+
+def _compile_constant(value):
+    def evaluate_constant(frame):
+        return value
+    return evaluate_constant
+
+
+def _compile_block(node, limits):
+    statements = compile_nodes(node.statements, limits)
+
+    def evaluate_block(frame):
+        for statement in statements:
+            statement(frame)
+    return evaluate_block
+
+
+def _compile_literal(node, limits):
+    return _compile_constant(node.value)
+
+
+def _compile_constant_node(node, limits):
+    if not node.mutable:
+        return _compile_constant(node.value)
+    value = node.value
+
+    def evaluate_mutable_constant(frame):
+        return copy_value(value)
+    return evaluate_mutable_constant
+
+
+def _operations(node):
+    # Operators whose operand types were proven valid skip the type checks
+    if node.checked:
+        return UNARY_OPERATIONS, BINARY_OPERATIONS
+    return UNCHECKED_UNARY_OPERATIONS, UNCHECKED_BINARY_OPERATIONS
+
+
+def _nests_deeper(node, depth):
+    # Whether operators nest deeper than depth in an expression or chain
+    work = [(node, 1)]
+    while work:
+        node, level = work.pop()
+        if level > depth:
+            return True
+        for operand in node.operands:
+            if type(operand) is ExpressionNode or type(operand) is ChainNode:
+                work.append((operand, level + 1))
+    return False
+
+
+def _operation(node, count, limits):
+    unary_operations, binary_operations = _operations(node)
+    op = node.operator.value
+    operations = unary_operations if count == 1 else binary_operations
+    if op not in operations:
+        raise RuntimeError('Case not handled')
+    if count == 2 and limits is not None:
+        return limit_operation(op, operations[op], limits)
+    return operations[op]
+
+
+def _compile_stacked(node, limits):
+    # Lowers the expressions and chains of a deep expression into steps run
+    # in order on a stack of values, each pushing the value of an operand or
+    # applying an operator to the values on top of the stack
+    steps = []
+    work = [(False, node)]
+    while work:
+        is_step, item = work.pop()
+        if is_step:
+            steps.append(item)
+        elif type(item) is ExpressionNode:
+            count = len(item.operands)
+            work.append((True, (None, _operation(item, count, limits), count)))
+            work.extend(
+                (False, operand) for operand in reversed(item.operands)
+            )
+        elif type(item) is ChainNode:
+            step = (None, _operation(item, 2, limits), 2)
+            for operand in reversed(item.operands[1:]):
+                work.append((True, step))
+                work.append((False, operand))
+            work.append((False, item.operands[0]))
+        else:
+            steps.append((compile_node(item, limits), None, 0))
+    steps = tuple(steps)
+
+    def evaluate_stacked(frame):
+        values = []
+        for operand, operation, count in steps:
+            if operation is None:
+                values.append(operand(frame))
+            elif count == 1:
+                values[-1] = operation(values[-1])
+            else:
+                right = values.pop()
+                values[-1] = operation(values[-1], right)
+        return values[0]
+    return evaluate_stacked
+
+
+def _compile_expression(node, limits):
+    if _nests_deeper(node, MAX_CLOSURE_DEPTH):
+        return _compile_stacked(node, limits)
+    op = node.operator.value
+    operands = compile_nodes(node.operands, limits)
+    unary_operations, binary_operations = _operations(node)
+    if len(operands) == 1 and op in unary_operations:
+        operation = unary_operations[op]
+        operand, = operands
+
+        def evaluate_unary(frame):
+            return operation(operand(frame))
+        return evaluate_unary
+
+    if len(operands) == 2 and op in binary_operations:
+        operation = binary_operations[op]
+        left, right = operands
+        if limits is not None and is_limited(limits, op) and \
+           op != Operator.EXPONENT.value:
+            return _compile_limited_binary(op, operation, left, right, limits)
+        if limits is not None:
+            operation = limit_operation(op, operation, limits)
+
+        def evaluate_binary(frame):
+            return operation(left(frame), right(frame))
+        return evaluate_binary
+
+    raise RuntimeError('Case not handled')
+
+
+def _compile_limited_binary(op, operation, left, right, limits):
+    # The checks of limit_operation, inlined in the closures of products and
+    # of the operators that build strings and lists
+    if op == Operator.TIMES.value:
+        min_integer = limits.min_integer
+        max_integer = limits.max_integer
+
+        def evaluate_limited_product(frame):
+            value = operation(left(frame), right(frame))
+            if value.__class__ is int and \
+               not min_integer <= value <= max_integer:
+                raise LimitError('integer bits')
+            return value
+        return evaluate_limited_product
+
+    max_length = limits.max_length
+
+    def evaluate_limited_concatenation(frame):
+        value = operation(left(frame), right(frame))
+        cls = value.__class__
+        if cls in SIZED_TYPES and \
+           (value.length if cls is SbmlString else len(value)) > max_length:
+            raise LimitError('length')
+        return value
+    return evaluate_limited_concatenation
+
+
+def _compile_chain(node, limits):
+    if _nests_deeper(node, MAX_CLOSURE_DEPTH):
+        return _compile_stacked(node, limits)
+    _, binary_operations = _operations(node)
+    op = node.operator.value
+    operation = binary_operations[op]
+    if limits is not None:
+        operation = limit_operation(op, operation, limits)
+    first, *rest = compile_nodes(node.operands, limits)
+
+    def evaluate_chain(frame):
+        value = first(frame)
+        for operand in rest:
+            value = operation(value, operand(frame))
+        return value
+    return evaluate_chain
+
+
+def _compile_condition(node, limits):
+    keyword = node.keyword
+    condition = compile_node(node.condition, limits)
+    body = compile_node(node.body, limits)
+
+    if keyword is Keyword.IF and node.orelse is None:
+        def evaluate_if(frame):
+            value = condition(frame)
+            if value is True:
+                body(frame)
+            elif value is not False:
+                raise SemanticError
+        return evaluate_if
+
+    elif keyword is Keyword.IF:
+        orelse = compile_node(node.orelse, limits)
+
+        def evaluate_if_else(frame):
+            value = condition(frame)
+            if value is True:
+                body(frame)
+            elif value is False:
+                orelse(frame)
+            else:
+                raise SemanticError
+        return evaluate_if_else
+
+    elif keyword is Keyword.WHILE and limits is not None and \
+            limits.max_steps is not None:
+        def evaluate_metered_while(frame):
+            budget = frame[-2]
+            while True:
+                value = condition(frame)
+                if value is True:
+                    budget.steps -= 1
+                    if budget.steps < 0:
+                        raise LimitError('steps')
+                    body(frame)
+                elif value is False:
+                    return
+                else:
+                    raise SemanticError
+        return evaluate_metered_while
+
+    elif keyword is Keyword.WHILE:
+        def evaluate_while(frame):
+            while True:
+                value = condition(frame)
+                if value is True:
+                    body(frame)
+                elif value is False:
+                    return
+                else:
+                    raise SemanticError
+        return evaluate_while
+
+    raise RuntimeError('Case not handled')
+
+
+def _compile_statement(node, limits):
+    keyword = node.keyword
+
+    if keyword is Keyword.PRINT:
+        expression = compile_node(node.value, limits)
+
+        def evaluate_print(frame):
+            frame[-1].print(expression(frame))
+        return evaluate_print
+
+    elif keyword is Operator.TAKES_VALUE and node.index is None:
+        slot = node.slot
+        value = compile_node(node.value, limits)
+
+        def evaluate_assignment(frame):
+            frame[slot] = value(frame)
+        return evaluate_assignment
+
+    elif keyword is Operator.TAKES_VALUE:
+        index = compile_node(node.index, limits)
+        value = compile_node(node.value, limits)
+
+        if node.slot is not None:
+            slot = node.slot
+
+            def evaluate_indexed_assignment(frame):
+                index_value = index(frame)
+                new_value = value(frame)
+                array = frame[slot]
+                if array is UNBOUND:
+                    raise SemanticError
+                array[index_value] = new_value
+            return evaluate_indexed_assignment
+
+        target = compile_node(node.target, limits)
+
+        def evaluate_target_assignment(frame):
+            target_value = target(frame)
+            index_value = index(frame)
+            target_value[index_value] = value(frame)
+        return evaluate_target_assignment
+
+    raise RuntimeError('Case not handled')
+
+
+def _compile_collection(node, limits):
+    collection_type = node.type
+    items = compile_nodes(node.items, limits)
+
+    if collection_type == tuple:
+        def evaluate_tuple(frame):
+            return tuple([item(frame) for item in items])
+        return evaluate_tuple
+
+    elif collection_type == SbmlList:
+        def evaluate_list(frame):
+            return SbmlList.wrap([item(frame) for item in items])
+        return evaluate_list
+
+    raise RuntimeError('Case not handled')
+
+
+def _compile_variable(node, limits):
+    slot = node.slot
+
+    def evaluate_variable(frame):
+        value = frame[slot]
+        if value is UNBOUND:
+            raise SemanticError
+        return value
+    return evaluate_variable
+
+
+def _compile_profiled(node, limits):
+    return node.profile.wrap(node.node, compile_node(node.node, limits))
+
+
+_COMPILERS = {
+    BlockNode: _compile_block,
+    LiteralNode: _compile_literal,
+    ConstantNode: _compile_constant_node,
+    ExpressionNode: _compile_expression,
+    ChainNode: _compile_chain,
+    ConditionNode: _compile_condition,
+    StatementNode: _compile_statement,
+    CollectionNode: _compile_collection,
+    VariableNode: _compile_variable,
+    ProfiledNode: _compile_profiled,
+}
@@ -1,12 +1,3 @@
-import os
-import sys
-
-
-MODULE_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
-if MODULE_DIR_NAME not in sys.path:
-    sys.path.insert(0, MODULE_DIR_NAME)
-
-
 import enum
 
 
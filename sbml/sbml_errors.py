@@ -1,12 +1,3 @@
-import os
-import sys
-
-
-MODULE_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
-if MODULE_DIR_NAME not in sys.path:
-    sys.path.insert(0, MODULE_DIR_NAME)
-
-
 class SemanticError(RuntimeError):
 
     def __init__(self):
@@ -17,3 +8,13 @@ class SyntaxError(SyntaxError):
 
     def __init__(self):
         super().__init__('SYNTAX ERROR')
+
+
+class LimitError(RuntimeError):
+
+    # A program went over one of the limits it was run with, see sbml_limits
+    MESSAGE = 'LIMIT EXCEEDED'
+
+    def __init__(self, limit):
+        super().__init__(f'{self.MESSAGE}: {limit}')
+        self.limit = limit
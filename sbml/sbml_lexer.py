@@ -1,14 +1,8 @@
-import os
-import sys
-
-
-MODULE_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
-if MODULE_DIR_NAME not in sys.path:
-    sys.path.insert(0, MODULE_DIR_NAME)
-
-
+import functools
 import ply.lex as lex
 import re
+import string
+import sys
 from sbml_enums import Keyword, Operator, Type
 from sbml_errors import SyntaxError
 from sbml_utils import is_identifier
@@ -92,6 +86,7 @@ def t_INTEGER(t):
 
 @lex.TOKEN(Type.STRING.value)
 def t_STRING(t):
+    t.value = t.value[1:-1]
     return t
 
 
@@ -122,5 +117,130 @@ def t_error(t):
     raise SyntaxError
 
 
+# A single pass scanner producing the same tokens as the PLY rules above.
+# The first character of a token decides which rule can match there, so
+# every token costs one dictionary lookup and at most one regex match instead
+# of trying each rule in turn.  Like the rules above, it gives literals their
+# values, strings without their quotes, so the token type alone tells a
+# string from an identifier.
+
+_LETTERS = frozenset(string.ascii_letters)
+_NUMBER_STARTS = frozenset(string.digits + '.')
+_QUOTES = frozenset('"\'')
+
+_match_word = re.compile(Type.IDENTIFIER.value).match
+_match_number = re.compile(
+    f'(?P<REAL>{Type.REAL.value})|(?P<INTEGER>{Type.INTEGER.value})'
+).match
+# The strings of Type.STRING, matched without trying both alternatives of
+# its group at every character
+STRING_PATTERN = r'"[^\\"]*(?:\\.[^\\"]*)*"|' r"'[^\\']*(?:\\.[^\\']*)*'"
+_match_string = re.compile(STRING_PATTERN).match
+
+_SYMBOL_TOKENS = {
+    op.value: op.name for op in Operator
+    if not is_identifier(op, is_token=True)
+}
+# Symbols are at most two characters long and a two character symbol wins
+# over its one character prefix, e.g. '**' is not scanned as two '*'
+assert all(len(symbol) <= 2 for symbol in _SYMBOL_TOKENS)
+
+_WORD_TOKENS = {
+    word: (token_type, word) for word, token_type in reserved_tokens.items()
+}
+_WORD_TOKENS['True'] = ('BOOLEAN', True)
+_WORD_TOKENS['False'] = ('BOOLEAN', False)
+
+
+class Token:
+
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, token_type, value, lineno, lexpos):
+        self.type = token_type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f'LexToken({self.type},{self.value!r},' \
+            f'{self.lineno},{self.lexpos})'
+
+
+def tokenize(data):
+    letters = _LETTERS
+    number_starts = _NUMBER_STARTS
+    quotes = _QUOTES
+    match_word = _match_word
+    match_number = _match_number
+    match_string = _match_string
+    word_tokens = _WORD_TOKENS
+    symbol_tokens = _SYMBOL_TOKENS
+    lineno = 1
+    position = 0
+    end = len(data)
+    while position < end:
+        char = data[position]
+        if char in letters:
+            token = match_word(data, position)
+            token_type, value = word_tokens.get(
+                token.group(), ('IDENTIFIER', token.group())
+            )
+            yield Token(token_type, value, lineno, position)
+            position = token.end()
+        elif char == ' ' or char == '\t':
+            position += 1
+        elif char == '\n':
+            lineno += 1
+            position += 1
+        elif char in number_starts:
+            token = match_number(data, position)
+            if token is None:
+                raise SyntaxError
+            if token.lastgroup == 'REAL':
+                yield Token('REAL', float(token.group()), lineno, position)
+            else:
+                yield Token('INTEGER', int(token.group()), lineno, position)
+            position = token.end()
+        elif char in quotes:
+            token = match_string(data, position)
+            if token is None:
+                raise SyntaxError
+            yield Token('STRING', token.group()[1:-1], lineno, position)
+            position = token.end()
+        else:
+            symbol = data[position:position + 2]
+            if symbol == '//':
+                position = data.find('\n', position)
+                if position < 0:
+                    position = end
+                continue
+            token_type = symbol_tokens.get(symbol)
+            if token_type is None:
+                symbol = char
+                token_type = symbol_tokens.get(symbol)
+                if token_type is None:
+                    raise SyntaxError
+            yield Token(token_type, symbol, lineno, position)
+            position += len(symbol)
+
+
+class Scanner:
+
+    # Drop-in replacement for a PLY lexer as far as the parser is concerned.
+    # Each instance scans its own input, so parsers do not share lexers.
+
+    def __init__(self):
+        self.token = functools.partial(next, iter(()), None)
+
+    def input(self, data):
+        self.token = functools.partial(next, tokenize(data), None)
+
+
 def analyze():
-    lex.lex()
+    # A new lexer, for a single parser to own
+    return Scanner()
+
+
+def build_ply_lexer():
+    return lex.lex(module=sys.modules[__name__])
@@ -0,0 +1,159 @@
+from sbml_enums import Operator
+from sbml_errors import LimitError
+from sbml_list import SbmlList
+from sbml_string import STRING_TYPES, SbmlString
+
+
+# Limits for programs that cannot be trusted to end or to stay small.  A
+# program compiled with limits can take at most max_steps steps, a step
+# being an iteration of a while loop, as the statements between two
+# iterations are bounded by the size of the program.  The integers that **
+# and * build can have at most max_integer_bits bits, and the strings and
+# lists that + and :: build at most max_length items.  Going over a limit
+# raises LimitError.  Values are checked once built, which takes at most
+# twice the memory of a value at the limit, except for powers, which are
+# checked before they are computed when they would have more than twice the
+# bits allowed.  Backends only check the limits that are set, so programs
+# compiled without limits run as before.
+
+
+SIZED_TYPES = frozenset((SbmlList, *STRING_TYPES))
+
+
+class Limits:
+
+    __slots__ = ('max_steps', 'max_integer_bits', 'max_length',
+                 'min_integer', 'max_integer')
+
+    def __init__(self, max_steps=None, max_integer_bits=None,
+                 max_length=None):
+        self.max_steps = max_steps
+        self.max_integer_bits = max_integer_bits
+        self.max_length = max_length
+        # The integers within the limit
+        self.max_integer = (1 << max_integer_bits) - 1 \
+            if max_integer_bits is not None else None
+        self.min_integer = -self.max_integer \
+            if max_integer_bits is not None else None
+
+    def __repr__(self):
+        return f'Limits({self.max_steps!r}, {self.max_integer_bits!r}, ' \
+            f'{self.max_length!r})'
+
+
+class Budget:
+
+    # What a run of a program has left of its limits.  The statements of a
+    # streamed program share one budget.
+    __slots__ = ('limits', 'steps')
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.steps = limits.max_steps if limits.max_steps is not None \
+            else float('inf')
+
+    def step(self):
+        self.steps -= 1
+        if self.steps < 0:
+            raise LimitError('steps')
+
+
+def new_budget(limits):
+    return Budget(limits) if limits is not None else None
+
+
+def check_power(limits, left, right):
+    # A power of an integer has at most as many bits as its base times its
+    # exponent, and more than half as many if its base is not -1, 0 or 1
+    if type(left) is int and type(right) is int and right > 1 and \
+       not -1 <= left <= 1 and \
+       left.bit_length() * right > 2 * limits.max_integer_bits:
+        raise LimitError('integer bits')
+
+
+def check_integer(limits, value):
+    if value.__class__ is int and \
+       not limits.min_integer <= value <= limits.max_integer:
+        raise LimitError('integer bits')
+
+
+def check_length(limits, value):
+    # The length of an SbmlString is read directly, as len calls a method
+    cls = value.__class__
+    if cls in SIZED_TYPES and \
+       (value.length if cls is SbmlString else len(value)) > \
+       limits.max_length:
+        raise LimitError('length')
+
+
+# The checks of the values built by operators, and the limit each needs
+RESULT_CHECKS = {
+    Operator.EXPONENT.value: (check_integer, 'max_integer_bits'),
+    Operator.TIMES.value: (check_integer, 'max_integer_bits'),
+    Operator.PLUS.value: (check_length, 'max_length'),
+    Operator.CONS.value: (check_length, 'max_length'),
+}
+
+
+def is_limited(limits, op):
+    entry = RESULT_CHECKS.get(op)
+    return entry is not None and getattr(limits, entry[1]) is not None
+
+
+def apply_limited(limits, apply, operator, args):
+    # Applies an operator with apply, checking what it builds, for the tree
+    # walker, which dispatches on the operator as it evaluates
+    op = operator.value
+    if len(args) != 2 or not is_limited(limits, op):
+        return apply(operator, args)
+    if op == Operator.EXPONENT.value:
+        check_power(limits, *args)
+    value = apply(operator, args)
+    RESULT_CHECKS[op][0](limits, value)
+    return value
+
+
+def limit_operation(op, operation, limits):
+    # The binary operation of an operator, checking what it builds if the
+    # operator builds values and its limit is set
+    if not is_limited(limits, op):
+        return operation
+
+    if op == Operator.EXPONENT.value:
+        def limited_power(left, right):
+            check_power(limits, left, right)
+            value = operation(left, right)
+            check_integer(limits, value)
+            return value
+        return limited_power
+
+    elif op == Operator.TIMES.value:
+        min_integer = limits.min_integer
+        max_integer = limits.max_integer
+
+        def limited_product(left, right):
+            value = operation(left, right)
+            if value.__class__ is int and \
+               not min_integer <= value <= max_integer:
+                raise LimitError('integer bits')
+            return value
+        return limited_product
+
+    max_length = limits.max_length
+
+    def limited_concatenation(left, right):
+        value = operation(left, right)
+        cls = value.__class__
+        if cls in SIZED_TYPES and \
+           (value.length if cls is SbmlString else len(value)) > max_length:
+            raise LimitError('length')
+        return value
+    return limited_concatenation
+
+
+def limit_operations(operations, limits):
+    # A copy of a table of binary operations, limited as above
+    return {
+        op: limit_operation(op, operation, limits)
+        for op, operation in operations.items()
+    }
@@ -0,0 +1,238 @@
+import itertools
+import operator
+from reprlib import recursive_repr
+from sbml_string import SbmlString
+
+
+# The list type of SBML programs.  Cons prepends to a list in place and + on
+# lists makes a new one, so building a list with either in a loop would be
+# quadratic with Python lists.  Here the items prepended are kept newest
+# first at the end of the front buffer and the rest at the start of the back
+# buffer, so that both grow at their end.  A list only uses the first
+# front_length and back_length items of its buffers, and + lets the new list
+# share the buffers of its left operand, appending to them when no other list
+# has items past its own.  A list sharing its buffers copies them before it
+# overwrites one of its items.
+#
+# A list that is searched with in again and again without changing in
+# between gets a set of its hashable items, which later searches look
+# values up in instead of comparing them with every item.  Cons and indexed
+# assignment drop the set.  Unhashable items, which are the only ones that
+# can change in place, are kept aside and still compared one by one.
+
+
+# Lists shorter than this, or searched fewer times since they last changed,
+# are searched item by item
+MIN_INDEXED_LENGTH = 32
+MIN_INDEXED_SEARCHES = 4
+
+
+class MembershipStats:
+
+    __slots__ = ('builds', 'hits', 'invalidations')
+
+    def __init__(self):
+        self.builds = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    def __repr__(self):
+        return f'builds {self.builds}, hits {self.hits}, ' \
+            f'invalidations {self.invalidations}'
+
+
+membership_stats = MembershipStats()
+
+
+class SbmlList:
+
+    __slots__ = (
+        'front', 'front_length', 'back', 'back_length', 'shared', 'members',
+        'searches'
+    )
+
+    def __init__(self, items=()):
+        self.front = []
+        self.front_length = 0
+        self.back = list(items)
+        self.back_length = len(self.back)
+        self.shared = False
+        self.members = None
+        self.searches = 0
+
+    @classmethod
+    def wrap(cls, items):
+        # A list of the items of a Python list that nothing else holds
+        sbml_list = cls.__new__(cls)
+        sbml_list.front = []
+        sbml_list.front_length = 0
+        sbml_list.back = items
+        sbml_list.back_length = len(items)
+        sbml_list.shared = False
+        sbml_list.members = None
+        sbml_list.searches = 0
+        return sbml_list
+
+    def __len__(self):
+        return self.front_length + self.back_length
+
+    def __iter__(self):
+        front = self.front
+        if self.front_length != len(front):
+            front = front[:self.front_length]
+        return itertools.chain(
+            reversed(front), itertools.islice(self.back, self.back_length)
+        )
+
+    def __contains__(self, value):
+        members = self.members
+        if members is None:
+            self.searches += 1
+            if self.searches < MIN_INDEXED_SEARCHES or \
+               len(self) < MIN_INDEXED_LENGTH:
+                return self._search(value)
+            members = self._index_members()
+        hashable, unhashable = members
+        try:
+            found = value in hashable
+        except TypeError:
+            return self._search(value)
+        membership_stats.hits += 1
+        return found or value in unhashable
+
+    def _search(self, value):
+        # Membership does not depend on order, so the buffers are searched
+        # directly when the list uses all of their items
+        front = self.front
+        if self.front_length != len(front):
+            front = itertools.islice(front, self.front_length)
+        back = self.back
+        if self.back_length != len(back):
+            back = itertools.islice(back, self.back_length)
+        return value in front or value in back
+
+    def __eq__(self, other):
+        if type(other) is not SbmlList and type(other) is not list:
+            return NotImplemented
+        return len(self) == len(other) and all(
+            item is other_item or item == other_item
+            for item, other_item in zip(self, other)
+        )
+
+    __hash__ = None
+
+    @recursive_repr('[...]')
+    def __repr__(self):
+        return '[' + ', '.join(map(repr, self)) + ']'
+
+    def _index_members(self):
+        hashable = set()
+        unhashable = []
+        for item in self:
+            try:
+                hashable.add(item)
+            except TypeError:
+                unhashable.append(item)
+        self.members = (hashable, unhashable)
+        membership_stats.builds += 1
+        return self.members
+
+    def _changed(self):
+        if self.members is not None:
+            self.members = None
+            membership_stats.invalidations += 1
+        self.searches = 0
+
+    def _position(self, index):
+        index = operator.index(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('list index out of range')
+        return index
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return SbmlList.wrap(self.to_list()[index])
+        index = self._position(index)
+        if index < self.front_length:
+            return self.front[self.front_length - 1 - index]
+        return self.back[index - self.front_length]
+
+    def __setitem__(self, index, value):
+        index = self._position(index)
+        self._changed()
+        if self.shared:
+            self.front = self.front[:self.front_length]
+            self.back = self.back[:self.back_length]
+            self.shared = False
+        if index < self.front_length:
+            self.front[self.front_length - 1 - index] = value
+        else:
+            self.back[index - self.front_length] = value
+
+    def prepend(self, value):
+        self._changed()
+        if self.front_length != len(self.front):
+            # Another list sharing the front buffer prepended to it
+            self.front = self.front[:self.front_length]
+        self.front.append(value)
+        self.front_length += 1
+
+    def __add__(self, other):
+        if type(other) is not SbmlList:
+            return NotImplemented
+        items = other.to_list()
+        if self.back_length == len(self.back):
+            back = self.back
+            back.extend(items)
+        else:
+            back = self.back[:self.back_length] + items
+        result = SbmlList.wrap(back)
+        result.front = self.front
+        result.front_length = self.front_length
+        if self.front_length or back is self.back and self.back_length:
+            self.shared = result.shared = True
+        return result
+
+    def to_list(self):
+        return list(self)
+
+
+def to_sbml(value, memo=None):
+    # Returns a value with the Python lists in it turned into SBML lists,
+    # keeping lists that are the same object the same object
+    value_type = type(value)
+    if value_type is not list and value_type is not tuple:
+        return value
+    if memo is None:
+        memo = {}
+    if id(value) in memo:
+        return memo[id(value)]
+    if value_type is tuple:
+        return tuple(to_sbml(item, memo) for item in value)
+    sbml_list = SbmlList()
+    memo[id(value)] = sbml_list
+    sbml_list.back = [to_sbml(item, memo) for item in value]
+    sbml_list.back_length = len(sbml_list.back)
+    return sbml_list
+
+
+def to_python(value, memo=None):
+    # Returns a value with the SBML lists and strings in it turned into
+    # Python ones
+    value_type = type(value)
+    if value_type is SbmlString:
+        return str(value)
+    if value_type is not SbmlList and value_type is not tuple:
+        return value
+    if memo is None:
+        memo = {}
+    if id(value) in memo:
+        return memo[id(value)]
+    if value_type is tuple:
+        return tuple(to_python(item, memo) for item in value)
+    python_list = []
+    memo[id(value)] = python_list
+    python_list.extend(to_python(item, memo) for item in value)
+    return python_list
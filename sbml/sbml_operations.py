@@ -0,0 +1,253 @@
+import operator
+from sbml_enums import Operator
+from sbml_errors import SemanticError
+from sbml_list import SbmlList
+from sbml_string import STRING_TYPES, concat, flatten
+
+
+# Binary and unary implementations of the operators with the same type rules
+# as ExpressionNode.evaluate, for backends that resolve the operator once
+# instead of dispatching on every evaluation.
+
+NUMBER_TYPES = (int, float)
+
+
+def _numbers(left, right):
+    return type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES
+
+
+def _comparable(left, right):
+    left_type = type(left)
+    right_type = type(right)
+    if left_type in NUMBER_TYPES:
+        return right_type in NUMBER_TYPES
+    return left_type in STRING_TYPES and right_type in STRING_TYPES
+
+
+def orelse(left, right):
+    if type(left) is bool and type(right) is bool:
+        return left or right
+    raise SemanticError
+
+
+def andalso(left, right):
+    if type(left) is bool and type(right) is bool:
+        return left and right
+    raise SemanticError
+
+
+def not_(operand):
+    if type(operand) is bool:
+        return not operand
+    raise SemanticError
+
+
+def less_than(left, right):
+    if _comparable(left, right):
+        return left < right
+    raise SemanticError
+
+
+def less_equal(left, right):
+    if _comparable(left, right):
+        return left <= right
+    raise SemanticError
+
+
+def greater_than(left, right):
+    if _comparable(left, right):
+        return left > right
+    raise SemanticError
+
+
+def greater_equal(left, right):
+    if _comparable(left, right):
+        return left >= right
+    raise SemanticError
+
+
+def equal(left, right):
+    if _comparable(left, right):
+        return left == right
+    raise SemanticError
+
+
+def not_equal(left, right):
+    if _comparable(left, right):
+        return left != right
+    raise SemanticError
+
+
+def cons(left, right):
+    if type(right) is SbmlList:
+        right.prepend(left)
+        return right
+    raise SemanticError
+
+
+def in_(left, right):
+    right_type = type(right)
+    if right_type is SbmlList or \
+            (right_type in STRING_TYPES and type(left) in STRING_TYPES):
+        return flatten(left) in right
+    raise SemanticError
+
+
+def plus(left, right):
+    left_type = type(left)
+    right_type = type(right)
+    if left_type in NUMBER_TYPES:
+        if right_type in NUMBER_TYPES:
+            return left + right
+    elif left_type in STRING_TYPES:
+        if right_type in STRING_TYPES:
+            return concat(left, right)
+    elif left_type is SbmlList and right_type is SbmlList:
+        return left + right
+    raise SemanticError
+
+
+def minus(left, right):
+    if _numbers(left, right):
+        return left - right
+    raise SemanticError
+
+
+def times(left, right):
+    if _numbers(left, right):
+        return left * right
+    raise SemanticError
+
+
+def divide(left, right):
+    if _numbers(left, right) and right != 0:
+        return left / right
+    raise SemanticError
+
+
+def div(left, right):
+    if type(left) is int and type(right) is int and right != 0:
+        return left // right
+    raise SemanticError
+
+
+def mod(left, right):
+    if type(left) is int and type(right) is int:
+        return left % right
+    raise SemanticError
+
+
+def exponent(left, right):
+    if _numbers(left, right):
+        return left ** right
+    raise SemanticError
+
+
+def index(left, right):
+    left_type = type(left)
+    if (left_type is SbmlList or left_type in STRING_TYPES) and \
+       type(right) is int and 0 <= right < len(left):
+        return left[right]
+    raise SemanticError
+
+
+def tuple_index(left, right):
+    if type(left) is int and type(right) is tuple and 0 < left <= len(right):
+        return right[left - 1]
+    raise SemanticError
+
+
+BINARY_OPERATIONS = {
+    Operator.ORELSE.value: orelse,
+    Operator.ANDALSO.value: andalso,
+    Operator.LESS_THAN.value: less_than,
+    Operator.LESS_EQUAL.value: less_equal,
+    Operator.GREATER_THAN.value: greater_than,
+    Operator.GREATER_EQUAL.value: greater_equal,
+    Operator.EQUAL.value: equal,
+    Operator.NOT_EQUAL.value: not_equal,
+    Operator.CONS.value: cons,
+    Operator.IN.value: in_,
+    Operator.PLUS.value: plus,
+    Operator.MINUS.value: minus,
+    Operator.TIMES.value: times,
+    Operator.DIVIDE.value: divide,
+    Operator.DIV.value: div,
+    Operator.MOD.value: mod,
+    Operator.EXPONENT.value: exponent,
+    Operator.LBRACKET.value: index,
+    Operator.TUPLE_INDEX.value: tuple_index,
+}
+
+UNARY_OPERATIONS = {
+    Operator.NOT.value: not_,
+}
+
+
+# Implementations for operands whose types are known to be valid, such as the
+# ones the type inference pass proves, which only check the values themselves.
+
+def unchecked_cons(left, right):
+    right.prepend(left)
+    return right
+
+
+def unchecked_in(left, right):
+    return flatten(left) in right
+
+
+def unchecked_plus(left, right):
+    if type(left) in STRING_TYPES:
+        return concat(left, right)
+    return left + right
+
+
+def unchecked_divide(left, right):
+    if right != 0:
+        return left / right
+    raise SemanticError
+
+
+def unchecked_div(left, right):
+    if right != 0:
+        return left // right
+    raise SemanticError
+
+
+def unchecked_index(left, right):
+    if 0 <= right < len(left):
+        return left[right]
+    raise SemanticError
+
+
+def unchecked_tuple_index(left, right):
+    if 0 < left <= len(right):
+        return right[left - 1]
+    raise SemanticError
+
+
+UNCHECKED_BINARY_OPERATIONS = {
+    Operator.ORELSE.value: operator.or_,
+    Operator.ANDALSO.value: operator.and_,
+    Operator.LESS_THAN.value: operator.lt,
+    Operator.LESS_EQUAL.value: operator.le,
+    Operator.GREATER_THAN.value: operator.gt,
+    Operator.GREATER_EQUAL.value: operator.ge,
+    Operator.EQUAL.value: operator.eq,
+    Operator.NOT_EQUAL.value: operator.ne,
+    Operator.CONS.value: unchecked_cons,
+    Operator.IN.value: unchecked_in,
+    Operator.PLUS.value: unchecked_plus,
+    Operator.MINUS.value: operator.sub,
+    Operator.TIMES.value: operator.mul,
+    Operator.DIVIDE.value: unchecked_divide,
+    Operator.DIV.value: unchecked_div,
+    Operator.MOD.value: operator.mod,
+    Operator.EXPONENT.value: operator.pow,
+    Operator.LBRACKET.value: unchecked_index,
+    Operator.TUPLE_INDEX.value: unchecked_tuple_index,
+}
+
+UNCHECKED_UNARY_OPERATIONS = {
+    Operator.NOT.value: operator.not_,
+}
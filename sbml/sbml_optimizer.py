@@ -0,0 +1,516 @@
+import itertools
+from sbml_ast_nodes import (
+    CHILD_FIELDS, Node, BlockNode, ChainNode, ConditionNode, ConstantNode,
+    ExpressionNode, StatementNode, CollectionNode, LiteralNode, VariableNode,
+    apply_operator
+)
+from sbml_enums import Keyword, Operator
+from sbml_limits import apply_limited
+from sbml_list import SbmlList
+from sbml_string import STRING_TYPES, SbmlString, flatten as flatten_string
+from sbml_utils import copy_value
+
+
+# Passes over a parsed AST that make it cheaper to run without changing what
+# it does.  Passes work with explicit stacks, as machine written programs can
+# nest far deeper than the recursion limit.
+
+# Left associative operators whose chains are folded into one ChainNode
+CHAIN_OPERATORS = (
+    Operator.PLUS, Operator.TIMES, Operator.ANDALSO, Operator.ORELSE
+)
+
+
+def flatten(ast):
+    # Replaces every left spine of binary nodes with the same chain operator,
+    # such as the ((a + b) + c) + d a parser builds for a + b + c + d, by a
+    # single ChainNode over all of its operands.
+    ast = _flatten_chain(ast)
+    work = [ast]
+    while work:
+        node = work.pop()
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                child[:] = [_flatten_chain(item) for item in child]
+                work.extend(child)
+            else:
+                child = _flatten_chain(child)
+                setattr(node, field, child)
+                work.append(child)
+    return ast
+
+
+def _flatten_chain(node):
+    if type(node) is not ExpressionNode or node.right is None or \
+       node.operator not in CHAIN_OPERATORS:
+        return node
+
+    chain = node
+    operands = []
+    while type(node) is ExpressionNode and node.right is not None and \
+            node.operator is chain.operator:
+        operands.append(node.right)
+        node = node.left
+    if len(operands) == 1:
+        # A single binary node is left alone
+        return chain
+    operands.append(node)
+    operands.reverse()
+    return ChainNode(chain.operator, operands, line=chain.line)
+
+
+def optimize(ast, passes=None, variables=None, limits=None):
+    # Runs the named passes, all of them by default, in the order of PASSES.
+    # Returns the new AST and how many nodes each pass eliminated.  Programs
+    # that start with variables bound are given their types, see
+    # infer_types, and programs run with limits are folded within them.
+    options = {'fold': {'limits': limits}, 'types': {'variables': variables}}
+    eliminated = {}
+    for name, optimization in PASSES.items():
+        if passes is not None and name not in passes:
+            continue
+        before = count_nodes(ast)
+        ast = optimization(ast, **options.get(name, {}))
+        eliminated[name] = before - count_nodes(ast)
+    return ast, eliminated
+
+
+def count_nodes(ast):
+    count = 0
+    work = [ast]
+    while work:
+        node = work.pop()
+        if not isinstance(node, Node):
+            continue
+        count += 1
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(child)
+            else:
+                work.append(child)
+    return count
+
+
+def _rewrite(ast, rewrite):
+    # Replaces every node, children first, by what rewrite returns for it.
+    # Each work item is a node's place, as its parent and the field or list
+    # index holding it, and whether its children have been rewritten.
+    root = [ast]
+    work = [(root, 0, False)]
+    while work:
+        parent, key, rewritten = work.pop()
+        node = parent[key] if type(parent) is list else getattr(parent, key)
+        if rewritten:
+            node = rewrite(node)
+            if type(parent) is list:
+                parent[key] = node
+            else:
+                setattr(parent, key, node)
+            continue
+
+        work.append((parent, key, True))
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(
+                    (child, index, False) for index in range(len(child))
+                )
+            else:
+                work.append((node, field, False))
+    return root[0]
+
+
+def _constant(node):
+    # Returns whether a node always evaluates to the same value, and the value
+    if isinstance(node, ConstantNode):
+        return True, node.value
+    elif isinstance(node, LiteralNode):
+        return True, node.value
+    elif not isinstance(node, Node):
+        return True, node
+    return False, None
+
+
+# Folding int ** int is skipped when the result would have more bits than
+# this, as computing it could take longer than the program would run.
+MAX_FOLDED_POWER_BITS = 4096
+
+
+def _fold(op, values, line, limits=None):
+    # Applies an operator to constant operands, returning None when it would
+    # fail at run time so that it still fails there, at the same point.
+    # Going over a limit is such a failure.
+    if op is Operator.EXPONENT and type(values[0]) is int and \
+       type(values[1]) is int and \
+       values[0].bit_length() * values[1] > MAX_FOLDED_POWER_BITS:
+        return None
+    try:
+        # Copied as cons changes the list it is given, and joined as a
+        # constant string is used as it is
+        values = [copy_value(value) for value in values]
+        if limits is not None:
+            value = apply_limited(limits, apply_operator, op, values)
+        else:
+            value = apply_operator(op, values)
+        return ConstantNode(flatten_string(value), line)
+    except (RuntimeError, ArithmeticError):
+        return None
+
+
+def _fold_node(node, limits):
+    if isinstance(node, LiteralNode):
+        return ConstantNode(node.value, node.line)
+
+    elif isinstance(node, CollectionNode):
+        values = []
+        for item in node.items:
+            is_constant, value = _constant(item)
+            if not is_constant:
+                return node
+            values.append(value)
+        return ConstantNode(node.type(values), node.line)
+
+    elif isinstance(node, ExpressionNode):
+        values = []
+        for operand in node.operands:
+            is_constant, value = _constant(operand)
+            if not is_constant:
+                return node
+            values.append(value)
+        return _fold(node.operator, values, node.line, limits) or node
+
+    elif isinstance(node, ChainNode):
+        # Only leading constants can be folded, as the chain is a left fold
+        is_constant, value = _constant(node.operands[0])
+        if not is_constant:
+            return node
+        folded = ConstantNode(value, node.line)
+        position = 1
+        while position < len(node.operands):
+            is_constant, value = _constant(node.operands[position])
+            if not is_constant:
+                break
+            constant = _fold(
+                node.operator, [folded.value, value], node.line, limits
+            )
+            if constant is None:
+                break
+            folded = constant
+            position += 1
+        if position == 1:
+            return node
+        elif position == len(node.operands):
+            return folded
+        node.operands[:position] = [folded]
+        if len(node.operands) == 2:
+            return ExpressionNode(
+                node.operator, *node.operands, line=node.line
+            )
+        return node
+
+    return node
+
+
+def fold_constants(ast, limits=None):
+    # Computes literals and operations on constants ahead of time, leaving
+    # alone any operation that raises an error, which then still raises it
+    # when the program runs, as do operations going over the limits given.
+    return _rewrite(ast, lambda node: _fold_node(node, limits))
+
+
+def _eliminate_node(node):
+    if not isinstance(node, BlockNode):
+        return node
+
+    statements = []
+    for statement in node.statements:
+        if not isinstance(statement, ConditionNode):
+            statements.append(statement)
+            continue
+        is_constant, value = _constant(statement.condition)
+        if not is_constant or type(value) is not bool:
+            statements.append(statement)
+        elif statement.keyword is Keyword.WHILE:
+            if value:
+                statements.append(statement)
+        elif value:
+            statements.extend(statement.body.statements)
+        elif statement.orelse is not None:
+            statements.extend(statement.orelse.statements)
+    node.statements = statements
+    return node
+
+
+def eliminate_dead_branches(ast):
+    # Replaces if statements on a constant condition by the branch taken and
+    # removes while loops that never run.  Conditions that are constant but
+    # not booleans are kept, to fail when the program runs.
+    return _rewrite(ast, _eliminate_node)
+
+
+# Types a value can have while a program runs.  Exponentiation can give
+# complex numbers and an indexed assignment inside an expression gives None.
+_ANY = frozenset((
+    bool, int, float, complex, str, SbmlString, SbmlList, tuple, type(None)
+))
+
+_BOOL = frozenset((bool,))
+_INT = frozenset((int,))
+_FLOAT = frozenset((float,))
+_NUMBER = frozenset((int, float))
+_STR = frozenset(STRING_TYPES)
+_LIST = frozenset((SbmlList,))
+_TUPLE = frozenset((tuple,))
+
+_ARITHMETIC_RULES = (
+    ((_INT, _INT), _INT),
+    ((_FLOAT, _NUMBER), _FLOAT),
+    ((_NUMBER, _FLOAT), _FLOAT),
+)
+
+_COMPARISON_RULES = (
+    ((_NUMBER, _NUMBER), _BOOL),
+    ((_STR, _STR), _BOOL),
+)
+
+# The operand types each operator accepts, as the types allowed for each of
+# its operands together with the types of the result
+_TYPE_RULES = {
+    Operator.ORELSE.value: (((_BOOL, _BOOL), _BOOL),),
+    Operator.ANDALSO.value: (((_BOOL, _BOOL), _BOOL),),
+    Operator.NOT.value: (((_BOOL,), _BOOL),),
+    Operator.LESS_THAN.value: _COMPARISON_RULES,
+    Operator.LESS_EQUAL.value: _COMPARISON_RULES,
+    Operator.GREATER_THAN.value: _COMPARISON_RULES,
+    Operator.GREATER_EQUAL.value: _COMPARISON_RULES,
+    Operator.EQUAL.value: _COMPARISON_RULES,
+    Operator.NOT_EQUAL.value: _COMPARISON_RULES,
+    Operator.CONS.value: (((_ANY, _LIST), _LIST),),
+    Operator.IN.value: (((_ANY, _LIST), _BOOL), ((_STR, _STR), _BOOL)),
+    Operator.PLUS.value: _ARITHMETIC_RULES + (
+        ((_STR, _STR), _STR),
+        ((_LIST, _LIST), _LIST),
+    ),
+    Operator.MINUS.value: _ARITHMETIC_RULES,
+    Operator.TIMES.value: _ARITHMETIC_RULES,
+    Operator.DIVIDE.value: (((_NUMBER, _NUMBER), _FLOAT),),
+    Operator.DIV.value: (((_INT, _INT), _INT),),
+    Operator.MOD.value: (((_INT, _INT), _INT),),
+    Operator.EXPONENT.value: (
+        ((_INT, _INT), _NUMBER),
+        ((_FLOAT, _NUMBER), frozenset((float, complex))),
+        ((_NUMBER, _FLOAT), frozenset((float, complex))),
+    ),
+    Operator.LBRACKET.value: (
+        ((_LIST, _INT), _ANY),
+        ((_STR, _INT), frozenset((str,))),
+    ),
+    Operator.TUPLE_INDEX.value: (((_INT, _TUPLE), _ANY),),
+}
+
+
+def _apply_rules(op, operand_types):
+    # Returns the types of the result of an operator and whether its check
+    # passes for every combination of the types its operands can have.
+    # Nothing is proven about operators an operand of which always fails.
+    rules = _TYPE_RULES[op.value]
+    result_types = frozenset()
+    proven = all(operand_types)
+    for types in itertools.product(*operand_types):
+        matched = False
+        for allowed, result in rules:
+            if all(t in a for t, a in zip(types, allowed)):
+                result_types |= result
+                matched = True
+        proven = proven and matched
+    return result_types, proven
+
+
+def _leaf_types(node, variable_types):
+    if isinstance(node, ConstantNode):
+        return frozenset((type(node.value),))
+    elif isinstance(node, LiteralNode):
+        return frozenset((type(node.value),))
+    elif isinstance(node, VariableNode):
+        return variable_types.get(node.name, _ANY)
+    elif not isinstance(node, Node):
+        return frozenset((type(node),))
+    return _ANY
+
+
+def _expression_children(node):
+    if isinstance(node, (ExpressionNode, ChainNode)):
+        return node.operands
+    elif isinstance(node, CollectionNode):
+        return node.items
+    elif isinstance(node, StatementNode):
+        return (node.target, node.index, node.value)
+    return None
+
+
+def _expression_types(node, variable_types, proven):
+    # Returns the types an expression can evaluate to, recording for each of
+    # its operators whether its check always passes
+    results = []
+    work = [(node, False)]
+    while work:
+        node, visited = work.pop()
+        children = _expression_children(node)
+        if children is None:
+            results.append(_leaf_types(node, variable_types))
+            continue
+        elif not visited:
+            work.append((node, True))
+            work.extend((child, False) for child in reversed(children))
+            continue
+
+        operand_types = results[len(results) - len(children):]
+        del results[len(results) - len(children):]
+        if isinstance(node, ExpressionNode):
+            types, is_proven = _apply_rules(node.operator, operand_types)
+            proven[id(node)] = (node, is_proven)
+        elif isinstance(node, ChainNode):
+            types = operand_types[0]
+            is_proven = True
+            for right_types in operand_types[1:]:
+                types, step_proven = _apply_rules(
+                    node.operator, (types, right_types)
+                )
+                is_proven = is_proven and step_proven
+            proven[id(node)] = (node, is_proven)
+        elif isinstance(node, CollectionNode):
+            types = frozenset((node.type,))
+        else:
+            types = frozenset((type(None),))
+        results.append(types)
+    return results[0]
+
+
+def _merge(types, other_types):
+    # Adds the types of the variables on another path, returning whether any
+    # changed.  A variable bound on one path only is unbound on the other,
+    # where reading it fails, so it keeps the types of the path binding it.
+    changed = False
+    for name, other in other_types.items():
+        merged = types.get(name, frozenset()) | other
+        if merged != types.get(name):
+            types[name] = merged
+            changed = True
+    return changed
+
+
+def _statement_types(node, variable_types, proven):
+    # Updates the types of the variables to the ones they have after the
+    # statement runs
+    if isinstance(node, BlockNode):
+        for statement in node.statements:
+            _statement_types(statement, variable_types, proven)
+
+    elif isinstance(node, ConditionNode) and node.keyword is Keyword.IF:
+        _expression_types(node.condition, variable_types, proven)
+        body_types = dict(variable_types)
+        _statement_types(node.body, body_types, proven)
+        if node.orelse is not None:
+            _statement_types(node.orelse, variable_types, proven)
+        _merge(variable_types, body_types)
+
+    elif isinstance(node, ConditionNode) and node.keyword is Keyword.WHILE:
+        # Runs the body until the types at the start of the loop stop
+        # changing; the last run records what holds on every iteration.
+        while True:
+            _expression_types(node.condition, variable_types, proven)
+            body_types = dict(variable_types)
+            _statement_types(node.body, body_types, proven)
+            if not _merge(variable_types, body_types):
+                break
+
+    elif isinstance(node, StatementNode) and \
+            node.keyword is Operator.TAKES_VALUE and node.index is None:
+        variable_types[node.target] = _expression_types(
+            node.value, variable_types, proven
+        )
+
+    else:
+        # Prints, indexed assignments, which change what a list holds but
+        # not the types of variables, and expressions used as statements
+        _expression_types(node, variable_types, proven)
+
+
+def unknown_variables(ast):
+    # The types of the variables of a program that can start with any of
+    # them bound to anything, such as one run on a symbol table it is given
+    variables = {}
+    work = [ast]
+    while work:
+        node = work.pop()
+        if isinstance(node, VariableNode):
+            variables[node.name] = _ANY
+        elif isinstance(node, StatementNode) and \
+                node.keyword is Operator.TAKES_VALUE and node.index is None:
+            variables[node.target] = _ANY
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(child)
+            else:
+                work.append(child)
+    return variables
+
+
+def bound_variables(symbol_table, names):
+    # The types of the variables of names bound in a symbol table
+    return {
+        name: frozenset((type(symbol_table[name]),))
+        for name in names if name in symbol_table
+    }
+
+
+def infer_types(ast, variables=None):
+    # Follows the types of variables through the program and marks the
+    # operators whose operand types are proven valid as not needing their
+    # checks.  Operators with any operand of unknown type keep them.  The
+    # program starts with the variables given bound to values of the types
+    # given, and the others unbound.
+    proven = {}
+    try:
+        _statement_types(ast, dict(variables or {}), proven)
+    except RecursionError:
+        # Blocks nested too deeply to follow keep all of their checks
+        return ast
+    for node, is_proven in proven.values():
+        node.checked = not is_proven
+    return ast
+
+
+def count_checks(ast):
+    # Returns how many operator checks were eliminated, out of how many
+    eliminated = 0
+    total = 0
+    work = [ast]
+    while work:
+        node = work.pop()
+        if isinstance(node, ExpressionNode):
+            checks = 1
+        elif isinstance(node, ChainNode):
+            checks = len(node.operands) - 1
+        else:
+            checks = 0
+        total += checks
+        if checks and not node.checked:
+            eliminated += checks
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(child)
+            else:
+                work.append(child)
+    return eliminated, total
+
+
+PASSES = {
+    'fold': fold_constants,
+    'branches': eliminate_dead_branches,
+    'types': infer_types,
+}
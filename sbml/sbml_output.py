@@ -0,0 +1,65 @@
+import sys
+
+
+# Where the print statements of a program write.  A program is run with an
+# output, which buffers the lines printed by default so that printing many
+# lines to a pipe or a file costs a few large writes instead of one per line.
+# Embedders can pass their own output to keep what a program prints or to
+# throw it away.  Every output has print, called with the value of each print
+# statement, and flush, called when the program ends.
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class BufferedOutput:
+
+    # Writes the lines printed to a stream, standard output when the output
+    # is made unless given, once at least buffer_size characters of them are
+    # waiting.  A buffer size of 0 writes every line as it is printed.
+    def __init__(self, stream=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.stream = stream if stream is not None else sys.stdout
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.size = 0
+
+    def print(self, value):
+        line = f'{value}\n'
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            lines = self.lines
+            self.lines = []
+            self.size = 0
+            self.stream.write(''.join(lines))
+        self.stream.flush()
+
+
+class CollectingOutput:
+
+    # Keeps the lines printed in memory
+    def __init__(self):
+        self.lines = []
+
+    def print(self, value):
+        self.lines.append(f'{value}\n')
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.lines)
+
+
+class NullOutput:
+
+    # Throws the lines printed away, for timing programs without their output
+    def print(self, value):
+        pass
+
+    def flush(self):
+        pass
@@ -1,28 +1,23 @@
+import copy
 import os
-import sys
-
-
-MODULE_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
-if MODULE_DIR_NAME not in sys.path:
-    sys.path.insert(0, MODULE_DIR_NAME)
-
-
 import ply.yacc as yacc
 import sbml_lexer
+import sys
+import threading
 from sbml_ast_nodes import (
-    Node, BlockNode, ConditionNode, ExpressionNode, StatementNode,
-    CollectionNode, VariableNode
+    BlockNode, ConditionNode, ExpressionNode, StatementNode,
+    CollectionNode, LiteralNode, VariableNode
 )
-from sbml_enums import Operator
+from sbml_enums import Keyword, Operator, Type
 from sbml_errors import SyntaxError
-from sbml_utils import is_identifier
+from sbml_list import SbmlList
 
 
-sbml_lexer.analyze()
 tokens = sbml_lexer.tokens
 
-
-SYMBOL_TABLE = {}
+PARSE_TABLE_PATH = os.path.join(
+    os.path.dirname(__file__), 'sbml_parsetab.pickle'
+)
 
 
 def p_start(p):
@@ -41,9 +36,10 @@ def p_block(p):
           | LBRACE STATEMENT_PLUS RBRACE
     '''
     if len(p) == 3:
-        p[0] = BlockNode()
+        p[0] = BlockNode(line=p.lineno(1))
     elif len(p) == 4:
         p[0] = p[2]
+        p[0].line = p.lineno(1)
     else:
         raise RuntimeError('Case not handled')
 
@@ -51,17 +47,16 @@ def p_block(p):
 def p_statement_plus(p):
     '''
     STATEMENT_PLUS : BLOCK
-                   | BLOCK STATEMENT_PLUS
                    | STATEMENT
-                   | STATEMENT STATEMENT_PLUS
+                   | STATEMENT_PLUS BLOCK
+                   | STATEMENT_PLUS STATEMENT
     '''
+    # Left recursive so that statements are appended as they are parsed
+    # and the parser stack does not grow with the length of the block
     if len(p) == 2:
-        p[0] = BlockNode(p[1])
+        p[0] = BlockNode([p[1]])
     elif len(p) == 3:
-        if type(p[2]) == BlockNode:
-            p[0] = p[2].prepend_statement(p[1])
-        else:
-            p[0] = BlockNode(p[2]).prepend_statement(p[1])
+        p[0] = p[1].append_statement(p[2])
     else:
         raise RuntimeError('Case not handled')
 
@@ -88,7 +83,9 @@ def p_ifelse(p):
     IFELSE_STATEMENT : IF LPAREN OR RPAREN BLOCK ELSE BLOCK
     '''
     if len(p) == 8:
-        p[0] = ConditionNode(p[3], p[5], p[7], keyword=p[1]+p[6])
+        p[0] = ConditionNode(
+            Keyword.IF, p[3], p[5], p[7], line=p.lineno(1)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -98,7 +95,7 @@ def p_if(p):
     IF_STATEMENT : IF LPAREN OR RPAREN BLOCK
     '''
     if len(p) == 6:
-        p[0] = ConditionNode(p[3], p[5], keyword=p[1])
+        p[0] = ConditionNode(Keyword.IF, p[3], p[5], line=p.lineno(1))
     else:
         raise RuntimeError('Case not handled')
 
@@ -108,7 +105,7 @@ def p_while(p):
     WHILE_STATEMENT : WHILE LPAREN OR RPAREN BLOCK
     '''
     if len(p) == 6:
-        p[0] = ConditionNode(p[3], p[5], keyword=p[1])
+        p[0] = ConditionNode(Keyword.WHILE, p[3], p[5], line=p.lineno(1))
     else:
         raise RuntimeError('Case not handled')
 
@@ -118,7 +115,7 @@ def p_print(p):
     PRINT_STATEMENT : PRINT LPAREN OR RPAREN SEMICOLON
     '''
     if len(p) == 6:
-        p[0] = StatementNode(p[3], keyword=p[1])
+        p[0] = StatementNode(Keyword.PRINT, p[3], line=p.lineno(1))
     else:
         raise RuntimeError('Case not handled')
 
@@ -131,13 +128,19 @@ def p_assignment(p):
     
     '''
     if len(p) == 5:
-        p[0] = StatementNode(p[1], p[3], keyword=p[2])
+        p[0] = StatementNode(
+            Operator.TAKES_VALUE, p[3], p[1], line=p.lineno(1)
+        )
     elif len(p) == 8:
-        p[0] = StatementNode(p[1], p[3], p[6], keyword=p[5])
+        p[0] = StatementNode(
+            Operator.TAKES_VALUE, p[6], p[1], p[3], line=p.lineno(1)
+        )
     elif len(p) == 9:
         raise SemanticError
     elif len(p) == 10:
-        p[0] = StatementNode(p[2], p[5], p[8], keyword=p[7])
+        p[0] = StatementNode(
+            Operator.TAKES_VALUE, p[8], p[2], p[5], line=p.lineno(1)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -150,7 +153,9 @@ def p_or(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -163,7 +168,9 @@ def p_and(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
         
@@ -176,7 +183,7 @@ def p_negation(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 3:
-        p[0] = ExpressionNode(p[2], operator=p[1])
+        p[0] = ExpressionNode(Operator.NOT, p[2], line=p.lineno(1))
     else:
         raise RuntimeError('Case not handled')
 
@@ -194,7 +201,9 @@ def p_comparison(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -207,7 +216,9 @@ def p_cons_list(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -220,7 +231,9 @@ def p_membership(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
         
@@ -234,7 +247,9 @@ def p_plus_minus(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -250,7 +265,9 @@ def p_mult_div(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -263,7 +280,7 @@ def p_urnary(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 3:
-        p[0] = ExpressionNode(0, p[2], operator=p[1])
+        p[0] = ExpressionNode(Operator.MINUS, 0, p[2], line=p.lineno(1))
     else:
         raise RuntimeError('Case not handled')
 
@@ -276,7 +293,9 @@ def p_exponentiation(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -290,9 +309,13 @@ def p_list_str_indexing(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 5:
-        p[0] = ExpressionNode(p[1], p[3], operator=p[2])
+        p[0] = ExpressionNode(
+            Operator(p[2]), p[1], p[3], line=p.lineno(2)
+        )
     elif len(p) == 7:
-        p[0] = StatementNode(p[1], p[3], p[6], keyword=p[5])
+        p[0] = StatementNode(
+            Operator.TAKES_VALUE, p[6], p[1], p[3], line=p.lineno(2)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -305,7 +328,9 @@ def p_tuple_indexing(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 4:
-        p[0] = ExpressionNode(p[2], p[3], operator=p[1])
+        p[0] = ExpressionNode(
+            Operator.TUPLE_INDEX, p[2], p[3], line=p.lineno(1)
+        )
     else:
         raise RuntimeError('Case not handled')
 
@@ -313,18 +338,15 @@ def p_tuple_indexing(p):
 def p_tuple_items(p):
     '''
     TUPLE_ITEMS : OR
-                | OR COMMA
-                | OR COMMA TUPLE_ITEMS
+                | TUPLE_ITEMS COMMA OR
     '''
+    # A plain list, as only TUPLE_LIST knows whether the items are a tuple
+    # or a single parenthesized expression
     if len(p) == 2:
-        p[0] = p[1]
-    elif len(p) == 3:
-        p[0] = CollectionNode(p[1], type=tuple)
+        p[0] = [p[1]]
     elif len(p) == 4:
-        if type(p[3]) == CollectionNode:
-            p[0] = p[3].prepend_item(p[1])
-        else:
-            p[0] = CollectionNode(p[3], type=tuple).prepend_item(p[1])
+        p[1].append(p[3])
+        p[0] = p[1]
     else:
         raise RuntimeError('Case not handled')
 
@@ -332,15 +354,12 @@ def p_tuple_items(p):
 def p_list_items(p):
     '''
     LIST_ITEMS : OR
-               | OR COMMA LIST_ITEMS
+               | LIST_ITEMS COMMA OR
     '''
     if len(p) == 2:
-        p[0] = CollectionNode(p[1], type=list)
+        p[0] = CollectionNode(SbmlList, [p[1]])
     elif len(p) == 4:
-        if type(p[3]) == CollectionNode:
-            p[0] = p[3].prepend_item(p[1])
-        else:
-            p[0] = CollectionNode(p[3], type=list).prepend(p[1])
+        p[0] = p[1].append_item(p[3])
     else:
         raise RuntimeError('Case not handled')
 
@@ -351,16 +370,25 @@ def p_tuple_list(p):
                | LPAREN RPAREN
                | LBRACKET RBRACKET
                | LPAREN TUPLE_ITEMS RPAREN
+               | LPAREN TUPLE_ITEMS COMMA RPAREN
                | LBRACKET LIST_ITEMS RBRACKET
     '''
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 3 and p[1] == Operator.LPAREN:
-        p[0] = CollectionNode(type=tuple)
+        p[0] = CollectionNode(tuple, line=p.lineno(1))
     elif len(p) == 3 and p[1] == Operator.LBRACKET:
-        p[0] = CollectionNode(type=list)
+        p[0] = CollectionNode(SbmlList, line=p.lineno(1))
+    elif len(p) == 4 and p[1] == Operator.LPAREN:
+        if len(p[2]) == 1:
+            p[0] = p[2][0]
+        else:
+            p[0] = CollectionNode(tuple, p[2], line=p.lineno(1))
     elif len(p) == 4:
         p[0] = p[2]
+        p[0].line = p.lineno(1)
+    elif len(p) == 5:
+        p[0] = CollectionNode(tuple, p[2], line=p.lineno(1))
     else:
         raise RuntimeError('Case not handled')
 
@@ -375,12 +403,11 @@ def p_primary(p):
             | LPAREN OR RPAREN
     '''
     if len(p) == 2:
-        if isinstance(p[1], Node):
-            p[0] = p[1]
-        elif is_identifier(p[1]):
-            p[0] = VariableNode(p[1])
+        # Tokens hold their values, so their type tells what they are
+        if p.slice[1].type == Type.IDENTIFIER.name:
+            p[0] = VariableNode(p[1], line=p.lineno(1))
         else:
-            p[0] = ExpressionNode(p[1])
+            p[0] = LiteralNode(p[1], line=p.lineno(1))
     elif len(p) == 4:
         p[0] = p[2]
     else:
@@ -391,5 +418,68 @@ def p_error(p):
     raise SyntaxError
 
 
+_tables = None
+_tables_lock = threading.Lock()
+_thread_parsers = threading.local()
+
+
+def get_tables():
+    # The parser tables are only loaded on first use, from the file shipped
+    # next to this module.  Nothing is written unless those tables
+    # are missing or out of date with the grammar above, in which case they
+    # are rebuilt next to this module rather than in the working directory.
+    # The result is never modified by parsing and is shared by every Parser.
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = yacc.yacc(
+                    module=sys.modules[__name__], debug=False,
+                    picklefile=PARSE_TABLE_PATH, errorlog=yacc.NullLogger()
+                )
+    return _tables
+
+
+class Parser:
+
+    # Owns a lexer and the parse stacks, which is all the state a parse
+    # changes, so that separate instances can parse at the same time in
+    # separate threads.  An instance itself parses one program at a time.
+
+    def __init__(self, tables=None):
+        if tables is None:
+            tables = get_tables()
+        self.tables = tables
+        self.lexer = sbml_lexer.analyze()
+        self.parser = copy.copy(tables)
+
+    def clone(self):
+        return Parser(self.tables)
+
+    def parse(self, source):
+        return self.parser.parse(source, lexer=self.lexer)
+
+
 def get_parser():
-    return yacc.yacc()
+    # A parser of the calling thread's own
+    parser = getattr(_thread_parsers, 'parser', None)
+    if parser is None:
+        parser = _thread_parsers.parser = Parser()
+    return parser
+
+
+def build_tables():
+    # Regenerates the shipped parser tables; run after changing the grammar.
+    global _tables
+    if os.path.exists(PARSE_TABLE_PATH):
+        os.remove(PARSE_TABLE_PATH)
+    with _tables_lock:
+        _tables = yacc.yacc(
+            module=sys.modules[__name__], debug=False,
+            picklefile=PARSE_TABLE_PATH
+        )
+    return _tables
+
+
+if '__main__' == __name__:
+    build_tables()
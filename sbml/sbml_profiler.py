@@ -0,0 +1,172 @@
+import json
+import time
+from sbml_ast_nodes import (
+    CHILD_FIELDS, ChainNode, CollectionNode, ConditionNode, ExpressionNode,
+    Node, ProfiledNode, StatementNode, VariableNode
+)
+
+
+# Times the evaluations of every node of a program, to find the lines it
+# spends its time on.  Programs are only profiled when instrument wraps their
+# nodes, so programs that are not profiled run exactly as before.  For each
+# line and kind of node a profile keeps how many times nodes were evaluated,
+# the time spent in them, cumulative, and the part of it not spent in the
+# nodes they evaluated, self.  It also keeps the self time of every path of
+# nodes evaluated one within another, for flame graphs.
+
+SORT_KEYS = ('self', 'cumulative', 'count', 'line')
+
+_COUNT, _CUMULATIVE, _SELF, _ACTIVE = range(4)
+
+
+def label(node):
+    # The kind of a node, e.g. 'ConditionNode while'
+    name = type(node).__name__
+    if isinstance(node, (ExpressionNode, ChainNode)):
+        return f'{name} {node.operator.value}'
+    if isinstance(node, (ConditionNode, StatementNode)):
+        return f'{name} {node.keyword.value}'
+    if isinstance(node, CollectionNode):
+        return f'{name} {"tuple" if node.type is tuple else "list"}'
+    if isinstance(node, VariableNode):
+        return f'{name} {node.name}'
+    return name
+
+
+class Profile:
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        # [count, cumulative, self, active] by (line, label)
+        self.stats = {}
+        # The paths of nodes evaluated, as a tree of [children, self] lists
+        # keyed by frame name, and the path being evaluated
+        self.root = [{}, 0.0]
+        self.path = self.root
+        # The time spent in the nodes evaluated by each node being evaluated
+        self.child_times = []
+
+    def wrap(self, node, evaluate):
+        # Returns evaluate, timed as the evaluation of node
+        key = (node.line, label(node))
+        stat = self.stats.setdefault(key, [0, 0.0, 0.0, 0])
+        frame_name = key[1] if node.line is None else \
+            f'{key[1]} (line {node.line})'
+        clock = self.clock
+        child_times = self.child_times
+
+        def profiled(frame):
+            parent = self.path
+            path = parent[0].get(frame_name)
+            if path is None:
+                path = parent[0][frame_name] = [{}, 0.0]
+            self.path = path
+            stat[_COUNT] += 1
+            stat[_ACTIVE] += 1
+            child_times.append(0.0)
+            start = clock()
+            try:
+                return evaluate(frame)
+            finally:
+                elapsed = clock() - start
+                self_time = elapsed - child_times.pop()
+                if child_times:
+                    child_times[-1] += elapsed
+                stat[_ACTIVE] -= 1
+                # Nodes of the same kind within one another on the same line
+                # count once towards its cumulative time
+                if not stat[_ACTIVE]:
+                    stat[_CUMULATIVE] += elapsed
+                stat[_SELF] += self_time
+                path[1] += self_time
+                self.path = parent
+        return profiled
+
+    def entries(self, sort='self'):
+        # The lines and kinds of nodes evaluated, as dicts, the most
+        # expensive first or in line order
+        entries = [
+            {
+                'line': line, 'node': node_label, 'count': stat[_COUNT],
+                'cumulative': stat[_CUMULATIVE], 'self': stat[_SELF],
+            }
+            for (line, node_label), stat in self.stats.items()
+            if stat[_COUNT]
+        ]
+        if sort == 'line':
+            entries.sort(key=lambda entry: (
+                entry['line'] is None, entry['line'] or 0, entry['node']
+            ))
+        elif sort in SORT_KEYS:
+            entries.sort(key=lambda entry: entry[sort], reverse=True)
+        else:
+            raise RuntimeError('Case not handled')
+        return entries
+
+    def format_text(self, sort='self', source=None):
+        # A table of the entries, with the text of their lines if given the
+        # source of the program
+        lines = source.splitlines() if source is not None else None
+        rows = [
+            f'{"line":>6} {"count":>10} {"cumulative":>12} {"self":>12}  node'
+        ]
+        for entry in self.entries(sort):
+            line = '' if entry['line'] is None else entry['line']
+            row = f'{line:>6} {entry["count"]:>10} ' \
+                f'{entry["cumulative"]:>12.6f} {entry["self"]:>12.6f}  ' \
+                f'{entry["node"]}'
+            if lines is not None and entry['line'] is not None and \
+               0 < entry['line'] <= len(lines):
+                row += f'  | {lines[entry["line"] - 1].strip()}'
+            rows.append(row)
+        return '\n'.join(rows) + '\n'
+
+    def format_json(self, sort='self'):
+        return json.dumps({'entries': self.entries(sort)}, indent=2) + '\n'
+
+    def format_collapsed(self):
+        # One line per path of nodes, its frames separated by semicolons,
+        # then its self time in whole microseconds, as flamegraph.pl and
+        # speedscope read them
+        rows = []
+        work = [((), self.root)]
+        while work:
+            frames, path = work.pop()
+            children, self_time = path
+            microseconds = round(self_time * 1e6)
+            if frames and microseconds:
+                rows.append(f'{";".join(frames)} {microseconds}')
+            for frame, child in children.items():
+                work.append((frames + (frame.replace(';', ','),), child))
+        rows.sort()
+        return ''.join(f'{row}\n' for row in rows)
+
+    def format(self, output_format='text', sort='self', source=None):
+        if output_format == 'text':
+            return self.format_text(sort, source)
+        elif output_format == 'json':
+            return self.format_json(sort)
+        elif output_format == 'collapsed':
+            return self.format_collapsed()
+        raise RuntimeError('Case not handled')
+
+
+def instrument(ast, profile):
+    # Wraps every node of a program so that profile times it, returning the
+    # wrapped program
+    work = [ast]
+    while work:
+        node = work.pop()
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(child)
+                child[:] = [_wrap(item, profile) for item in child]
+            elif isinstance(child, Node):
+                work.append(child)
+                setattr(node, field, _wrap(child, profile))
+    return ProfiledNode(ast, profile)
+
+
+def _wrap(node, profile):
+    return ProfiledNode(node, profile) if isinstance(node, Node) else node
@@ -0,0 +1,73 @@
+from sbml_ast_nodes import CHILD_FIELDS, StatementNode, VariableNode
+from sbml_enums import Operator
+from sbml_limits import new_budget
+from sbml_list import to_sbml
+from sbml_output import BufferedOutput
+from sbml_utils import UNBOUND, is_identifier
+
+
+# Gives every variable of a program an integer slot, so that backends keep
+# variables in a list, a frame, instead of in a dict keyed by their names.
+# Programs are still called with a symbol table dict, which bind copies into
+# a frame before the program runs and the frame back into after it ends.
+# Python lists in the variables the program reads become SBML lists.
+# The budget of the run, or None if the program has no limits, and the output
+# the program prints to are kept after the variables, as the last two items
+# of the frame.
+
+
+def resolve(ast):
+    # Sets the slot of every variable read and assigned, returning the names
+    # of the variables in the order of their slots
+    slots = {}
+    work = [ast]
+    while work:
+        node = work.pop()
+        if isinstance(node, VariableNode):
+            node.slot = slots.setdefault(node.name, len(slots))
+        elif isinstance(node, StatementNode) and \
+                node.keyword is Operator.TAKES_VALUE and \
+                is_identifier(node.target):
+            node.slot = slots.setdefault(node.target, len(slots))
+
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(child)
+            else:
+                work.append(child)
+    return tuple(slots)
+
+
+def new_frame(names, symbol_table, output=None, budget=None):
+    # Only the variables of the program are read, so that a run takes time
+    # in the size of the program, not of the symbol table
+    memo = {}
+    frame = [to_sbml(symbol_table.get(name, UNBOUND), memo) for name in names]
+    frame.append(budget)
+    frame.append(output if output is not None else BufferedOutput())
+    return frame
+
+
+def store_frame(names, frame, symbol_table):
+    # Also flushes the output, so that everything printed is written out by
+    # the time the program ends
+    for name, value in zip(names, frame):
+        if value is not UNBOUND:
+            symbol_table[name] = value
+    frame[-1].flush()
+
+
+def bind(run, names, limits=None):
+    # Turns a program run on a frame into one run on a symbol table, which
+    # holds the variables of the program once it ends, even if it fails.  A
+    # run has a budget of its own unless given one.
+    def run_with_symbol_table(symbol_table, output=None, budget=None):
+        if budget is None:
+            budget = new_budget(limits)
+        frame = new_frame(names, symbol_table, output, budget)
+        try:
+            return run(frame)
+        finally:
+            store_frame(names, frame, symbol_table)
+    return run_with_symbol_table
@@ -0,0 +1,210 @@
+import re
+import string
+from sbml_ast_nodes import CHILD_FIELDS, Node
+from sbml_enums import Keyword
+from sbml_errors import SyntaxError
+from sbml_lexer import STRING_PATTERN, tokenize
+
+
+# Reads a program from a stream a chunk at a time and hands out the source
+# of each statement of its outer block as soon as the statement is complete,
+# so that a program can run while it is still being read and only the
+# statement being read is ever held in memory.  A statement ends with a
+# semicolon, or with a closing brace that an else does not follow, outside
+# of any inner block, string or comment.  Each statement is parsed on its
+# own, so the statements before a syntax error have already run when it is
+# found.  Each statement comes with the line of the program it starts on.
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Characters that can start or end a statement, or hide one that does
+_SPECIAL = re.compile(r'[{};"\'/]')
+_SPACE = re.compile(r'[ \t\n]*')
+_match_string = re.compile(STRING_PATTERN).match
+
+_ELSE = Keyword.ELSE.value
+_WORD_CHARACTERS = frozenset(string.ascii_letters + string.digits + '_')
+
+
+class _Splitter:
+
+    def __init__(self):
+        self.text = ''
+        # Where the statement being read starts, the line it starts on and
+        # where scanning resumes
+        self.start = 0
+        self.line = 1
+        self.position = 0
+        self.depth = 0
+        # The end of an if statement that an else may still continue
+        self.block_end = None
+        self.ended = False
+        self.failed = False
+
+    def feed(self, chunk, final=False):
+        # Returns the statements completed by a chunk of the program
+        if self.start:
+            self.text = self.text[self.start:]
+            self.position -= self.start
+            if self.block_end is not None:
+                self.block_end -= self.start
+            self.start = 0
+        self.text += chunk
+        statements = []
+        while not self.ended and self.scan(statements, final):
+            pass
+        return statements
+
+    def scan(self, statements, final):
+        # Scans up to the next special character, returning False when the
+        # text read so far has nothing more to scan
+        text = self.text
+        if self.block_end is not None:
+            follows = self.follows_else(final)
+            if follows is None:
+                return False
+            if not follows:
+                self.advance(statements, self.block_end)
+            self.block_end = None
+
+        match = _SPECIAL.search(text, self.position)
+        if match is None:
+            self.position = len(text)
+            return False
+        position = match.start()
+        char = match.group()
+        if char == '{':
+            self.depth += 1
+            if self.depth == 1:
+                # Nothing but the outer block makes up a program
+                if _has_tokens(text[self.start:position]):
+                    return self.fail()
+                self.skip(position + 1)
+            self.position = position + 1
+        elif char == '}':
+            self.depth -= 1
+            if self.depth < 0:
+                return self.fail()
+            self.position = position + 1
+            if self.depth == 1:
+                self.block_end = self.position
+            elif self.depth == 0:
+                # What is left of the block is parsed as a statement, so
+                # that an unfinished one is a syntax error
+                if _has_tokens(text[self.start:position]):
+                    self.advance(statements, position)
+                self.skip(self.position)
+                self.ended = True
+        elif char == ';':
+            if self.depth == 0:
+                return self.fail()
+            self.position = position + 1
+            if self.depth == 1:
+                self.advance(statements, self.position)
+        elif char == '/':
+            if position + 1 == len(text) and not final:
+                return False
+            if text.startswith('//', position):
+                newline = text.find('\n', position)
+                if newline < 0:
+                    if not final:
+                        return False
+                    newline = len(text)
+                self.position = newline
+            else:
+                self.position = position + 1
+        else:
+            token = _match_string(text, position)
+            if token is None:
+                if final:
+                    return self.fail()
+                return False
+            self.position = token.end()
+        return True
+
+    def advance(self, statements, end):
+        # Hands out the statement read up to end
+        statements.append((self.line, self.text[self.start:end]))
+        self.skip(end)
+
+    def skip(self, start):
+        self.line += self.text.count('\n', self.start, start)
+        self.start = start
+
+    def fail(self):
+        self.failed = True
+        self.ended = True
+        return False
+
+    def follows_else(self, final):
+        # Whether an else comes next, or None when the text read so far does
+        # not tell
+        text = self.text
+        position = self.block_end
+        while True:
+            position = _SPACE.match(text, position).end()
+            if not text.startswith('//', position):
+                break
+            newline = text.find('\n', position)
+            if newline < 0:
+                return False if final else None
+            position = newline
+        word = text[position:position + len(_ELSE) + 1]
+        if len(word) <= len(_ELSE) and not final:
+            return None
+        return word.startswith(_ELSE) and \
+            word[len(_ELSE):] not in _WORD_CHARACTERS
+
+    def is_complete(self):
+        # Whether the program read is a block followed by nothing
+        return self.ended and not self.failed and \
+            not _has_tokens(self.text[self.start:])
+
+
+def _has_tokens(text):
+    try:
+        return any(True for _ in tokenize(text))
+    except SyntaxError:
+        return True
+
+
+def read_statements(stream, chunk_size=CHUNK_SIZE):
+    # Yields the line and the source of each statement of the program read
+    # from a stream, raising SyntaxError where the program stops being one
+    splitter = _Splitter()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield from splitter.feed(chunk)
+        if splitter.failed:
+            raise SyntaxError
+    yield from splitter.feed('', final=True)
+    if not splitter.is_complete():
+        raise SyntaxError
+
+
+def run_stream(stream, run_statement):
+    # Runs each statement as a program of its own, as soon as it is read,
+    # given the line of the program the statement starts on
+    for line, statement in read_statements(stream):
+        run_statement('{' + statement + '}', line)
+
+
+def shift_lines(ast, offset):
+    # Moves the nodes of a statement parsed on its own to the lines of the
+    # program it was read from
+    work = [ast]
+    while work:
+        node = work.pop()
+        if not isinstance(node, Node):
+            continue
+        if node.line is not None:
+            node.line += offset
+        for field in CHILD_FIELDS.get(type(node), ()):
+            child = getattr(node, field)
+            if type(child) is list:
+                work.extend(child)
+            else:
+                work.append(child)
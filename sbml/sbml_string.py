@@ -0,0 +1,129 @@
+import operator
+
+
+# Strings built by + in SBML programs.  Concatenating Python strings copies
+# both of them, so a loop like s = s + piece would be quadratic in the length
+# of s.  Instead a long concatenation is kept as the pieces it is made of and
+# only joined into a Python string when it is first used as one, by indexing,
+# comparing, testing membership or printing.  Like an SbmlList, a string
+# keeps the pieces prepended newest first at the end of the front buffer and
+# the rest at the start of the back buffer, uses only the first front_count
+# and back_count pieces of them, and + adds to the buffers it shares with
+# the string it was made from when no other string uses pieces past its own.
+
+
+# Shorter results of + are plain Python strings
+MIN_CONCATENATED_LENGTH = 256
+
+
+class SbmlString:
+
+    __slots__ = (
+        'front', 'front_count', 'back', 'back_count', 'length', 'flat'
+    )
+
+    def __init__(self, front, front_count, back, back_count, length):
+        self.front = front
+        self.front_count = front_count
+        self.back = back
+        self.back_count = back_count
+        self.length = length
+        self.flat = None
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = ''.join(
+                reversed(self.front[:self.front_count])
+            ) + ''.join(self.back[:self.back_count])
+            # Later concatenations start from the joined string
+            self.front = []
+            self.front_count = 0
+            self.back = [self.flat]
+            self.back_count = 1
+        return self.flat
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __len__(self):
+        return self.length
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __getitem__(self, index):
+        return str(self)[index]
+
+    def __contains__(self, value):
+        return flatten(value) in str(self)
+
+    def __add__(self, other):
+        if type(other) is not str and type(other) is not SbmlString:
+            return NotImplemented
+        return concat(self, other)
+
+    def __radd__(self, other):
+        if type(other) is not str:
+            return NotImplemented
+        return concat(other, self)
+
+    def append(self, piece):
+        back = self.back
+        if self.back_count != len(back):
+            # Another string sharing the back buffer appended to it
+            back = back[:self.back_count]
+        back.append(piece)
+        return SbmlString(
+            self.front, self.front_count, back, self.back_count + 1,
+            self.length + len(piece)
+        )
+
+    def prepend(self, piece):
+        front = self.front
+        if self.front_count != len(front):
+            # Another string sharing the front buffer prepended to it
+            front = front[:self.front_count]
+        front.append(piece)
+        return SbmlString(
+            front, self.front_count + 1, self.back, self.back_count,
+            self.length + len(piece)
+        )
+
+
+def _comparison(compare):
+    def compare_strings(self, other):
+        if type(other) is SbmlString:
+            other = str(other)
+        elif type(other) is not str:
+            return NotImplemented
+        return compare(str(self), other)
+    return compare_strings
+
+
+SbmlString.__eq__ = _comparison(operator.eq)
+SbmlString.__ne__ = _comparison(operator.ne)
+SbmlString.__lt__ = _comparison(operator.lt)
+SbmlString.__le__ = _comparison(operator.le)
+SbmlString.__gt__ = _comparison(operator.gt)
+SbmlString.__ge__ = _comparison(operator.ge)
+
+
+STRING_TYPES = (str, SbmlString)
+
+
+def concat(left, right):
+    # + on two strings, either of which can be an SbmlString
+    if type(left) is SbmlString:
+        return left.append(str(right))
+    if type(right) is SbmlString:
+        return right.prepend(left)
+    if len(left) + len(right) < MIN_CONCATENATED_LENGTH:
+        return left + right
+    return SbmlString([], 0, [left, right], 2, len(left) + len(right))
+
+
+def flatten(value):
+    # The Python string of an SbmlString, and any other value unchanged
+    if type(value) is SbmlString:
+        return str(value)
+    return value
@@ -0,0 +1,665 @@
+import hashlib
+import importlib.util
+import marshal
+import math
+import os
+import sys
+import tempfile
+import sbml_compiler
+from sbml_ast_nodes import (
+    Node, BlockNode, ChainNode, ConditionNode, ConstantNode, ExpressionNode,
+    StatementNode, CollectionNode, LiteralNode, VariableNode
+)
+from sbml_enums import Keyword, Operator
+from sbml_errors import LimitError, SemanticError
+from sbml_limits import SIZED_TYPES, Budget, Limits, check_power
+from sbml_list import SbmlList, to_sbml
+from sbml_operations import NUMBER_TYPES
+from sbml_output import BufferedOutput
+from sbml_string import STRING_TYPES, SbmlString, concat, flatten
+from sbml_utils import is_identifier, is_mutable
+
+
+# Translates an AST into the source of a Python function.  SBML variables
+# become fast locals of that function, while loops become Python while loops
+# and every operator becomes an inline type check followed by the native
+# Python operator.  Operand types that are known while translating, such as
+# the types of literals, are used to drop the parts of a check that always
+# hold.  Programs translated with limits, see sbml_limits, check them inline
+# in their loops and on the values operators build, and count their steps in
+# a local that goes back to their budget when they return.
+
+TRANSPILER_VERSION = 9
+
+CACHE_SUFFIX = 'c'
+
+PROGRAM_NAME = '_sbml_program'
+
+_RUNTIME = {
+    '_NUM': NUMBER_TYPES,
+    '_bool': bool,
+    '_int': int,
+    '_float': float,
+    '_str': str,
+    '_rope': SbmlString,
+    '_STRINGS': STRING_TYPES,
+    '_list': SbmlList,
+    '_wrap_list': SbmlList.wrap,
+    '_tuple': tuple,
+    '_len': len,
+    '_SemanticError': SemanticError,
+    '_UnboundLocalError': UnboundLocalError,
+    '_to_sbml': to_sbml,
+    '_BufferedOutput': BufferedOutput,
+    '_concat': concat,
+    '_flatten': flatten,
+    '_LimitError': LimitError,
+    '_Limits': Limits,
+    '_Budget': Budget,
+    '_check_power': check_power,
+    '_SIZED': SIZED_TYPES,
+}
+
+_TYPE_NAMES = {
+    bool: '_bool',
+    int: '_int',
+    float: '_float',
+    str: '_str',
+    SbmlString: '_rope',
+    SbmlList: '_list',
+    tuple: '_tuple',
+}
+
+
+class _Operand:
+
+    # An operand is trusted when the type inference pass proved it has a
+    # type its operator accepts, and every type test on it holds.
+    def __init__(self, code, static_type=None, kind='temporary',
+                 trusted=False):
+        self.code = code
+        self.static_type = static_type
+        self.kind = kind
+        self.trusted = trusted
+
+
+def _trust(node, *operands):
+    if node.checked:
+        return operands
+    return tuple(
+        _Operand(operand.code, operand.static_type, operand.kind, True)
+        for operand in operands
+    )
+
+
+def _is_a(operand, *types):
+    if operand.trusted:
+        return True
+    if operand.static_type is not None:
+        return operand.static_type in types
+    if len(types) == 1:
+        return f'{operand.code}.__class__ is {_TYPE_NAMES[types[0]]}'
+    if types == NUMBER_TYPES:
+        return f'{operand.code}.__class__ in _NUM'
+    if types == STRING_TYPES:
+        return f'{operand.code}.__class__ in _STRINGS'
+    return '(' + ' or '.join(
+        f'{operand.code}.__class__ is {_TYPE_NAMES[t]}' for t in types
+    ) + ')'
+
+
+def _all(*conditions):
+    if any(condition is False for condition in conditions):
+        return False
+    conditions = [c for c in conditions if c is not True]
+    if not conditions:
+        return True
+    if len(conditions) == 1:
+        return conditions[0]
+    return '(' + ' and '.join(conditions) + ')'
+
+
+def _any(*conditions):
+    if any(condition is True for condition in conditions):
+        return True
+    conditions = [c for c in conditions if c is not False]
+    if not conditions:
+        return False
+    if len(conditions) == 1:
+        return conditions[0]
+    return '(' + ' or '.join(conditions) + ')'
+
+
+def _numbers(left, right):
+    return _all(_is_a(left, *NUMBER_TYPES), _is_a(right, *NUMBER_TYPES))
+
+
+def _strings(left, right):
+    return _all(_is_a(left, *STRING_TYPES), _is_a(right, *STRING_TYPES))
+
+
+def _comparable(left, right):
+    return _any(_numbers(left, right), _strings(left, right))
+
+
+def _plus(left, right):
+    # Strings are concatenated by _concat, which keeps long results as
+    # SbmlStrings
+    if left.static_type in NUMBER_TYPES or left.static_type is SbmlList:
+        return f'{left.code} + {right.code}'
+    if left.static_type in STRING_TYPES:
+        return f'_concat({left.code}, {right.code})'
+    return (
+        f'(_concat({left.code}, {right.code}) '
+        f'if {left.code}.__class__ in _STRINGS '
+        f'else {left.code} + {right.code})'
+    )
+
+
+def _contains(left, right):
+    if left.static_type is None or left.static_type in STRING_TYPES:
+        return f'_flatten({left.code}) in {right.code}'
+    return f'{left.code} in {right.code}'
+
+
+def _is_int(operand):
+    # Trusted operands of arithmetic are numbers, not necessarily integers
+    if operand.static_type is not None:
+        return operand.static_type is int
+    return f'{operand.code}.__class__ is _int'
+
+
+def _result_type(left, right):
+    if left.static_type is int and right.static_type is int:
+        return int
+    if left.static_type in NUMBER_TYPES and right.static_type in NUMBER_TYPES:
+        return float
+    return None
+
+
+# Each entry maps an operator to a function returning the type check, the
+# native Python expression and the static type of the result.
+_BINARY_TEMPLATES = {
+    # | and & as both operands are read, like in every other backend, even
+    # when their checks are dropped
+    Operator.ORELSE.value: lambda a, b: (
+        _all(_is_a(a, bool), _is_a(b, bool)), f'{a.code} | {b.code}', bool
+    ),
+    Operator.ANDALSO.value: lambda a, b: (
+        _all(_is_a(a, bool), _is_a(b, bool)), f'{a.code} & {b.code}', bool
+    ),
+    Operator.LESS_THAN.value: lambda a, b: (
+        _comparable(a, b), f'{a.code} < {b.code}', bool
+    ),
+    Operator.LESS_EQUAL.value: lambda a, b: (
+        _comparable(a, b), f'{a.code} <= {b.code}', bool
+    ),
+    Operator.GREATER_THAN.value: lambda a, b: (
+        _comparable(a, b), f'{a.code} > {b.code}', bool
+    ),
+    Operator.GREATER_EQUAL.value: lambda a, b: (
+        _comparable(a, b), f'{a.code} >= {b.code}', bool
+    ),
+    Operator.EQUAL.value: lambda a, b: (
+        _comparable(a, b), f'{a.code} == {b.code}', bool
+    ),
+    Operator.NOT_EQUAL.value: lambda a, b: (
+        _comparable(a, b), f'{a.code} != {b.code}', bool
+    ),
+    Operator.IN.value: lambda a, b: (
+        _any(_is_a(b, SbmlList), _strings(a, b)), _contains(a, b), bool
+    ),
+    Operator.PLUS.value: lambda a, b: (
+        _any(
+            _numbers(a, b),
+            _strings(a, b),
+            _all(_is_a(a, SbmlList), _is_a(b, SbmlList)),
+        ),
+        _plus(a, b),
+        _result_type(a, b) or (a.static_type
+                               if a.static_type is b.static_type else None)
+    ),
+    Operator.MINUS.value: lambda a, b: (
+        _numbers(a, b), f'{a.code} - {b.code}', _result_type(a, b)
+    ),
+    Operator.TIMES.value: lambda a, b: (
+        _numbers(a, b), f'{a.code} * {b.code}', _result_type(a, b)
+    ),
+    Operator.DIVIDE.value: lambda a, b: (
+        _all(_numbers(a, b), f'{b.code} != 0'), f'{a.code} / {b.code}', float
+    ),
+    Operator.DIV.value: lambda a, b: (
+        _all(_is_a(a, int), _is_a(b, int), f'{b.code} != 0'),
+        f'{a.code} // {b.code}', int
+    ),
+    Operator.MOD.value: lambda a, b: (
+        _all(_is_a(a, int), _is_a(b, int)), f'{a.code} % {b.code}', int
+    ),
+    Operator.EXPONENT.value: lambda a, b: (
+        _numbers(a, b), f'{a.code} ** {b.code}', None
+    ),
+    Operator.LBRACKET.value: lambda a, b: (
+        _all(
+            _is_a(a, SbmlList, *STRING_TYPES), _is_a(b, int),
+            f'0 <= {b.code} < _len({a.code})'
+        ),
+        f'{a.code}[{b.code}]', None
+    ),
+    Operator.TUPLE_INDEX.value: lambda a, b: (
+        _all(
+            _is_a(a, int), _is_a(b, tuple),
+            f'0 < {a.code} <= _len({b.code})'
+        ),
+        f'{b.code}[{a.code} - 1]', None
+    ),
+}
+
+
+class _Transpiler:
+
+    def __init__(self, limits=None):
+        self.limits = limits
+        self.lines = []
+        self.depth = 2
+        self.temporaries = 0
+        self.symbols = {}
+
+    def line(self, code):
+        self.lines.append('    ' * self.depth + code)
+
+    def temporary(self):
+        self.temporaries += 1
+        return f't{self.temporaries}'
+
+    def local(self, symbol):
+        if symbol not in self.symbols:
+            self.symbols[symbol] = f'v_{symbol}'
+        return self.symbols[symbol]
+
+    def atom(self, operand):
+        if operand.kind != 'display':
+            return operand
+        temporary = self.temporary()
+        self.line(f'{temporary} = {operand.code}')
+        return _Operand(temporary, operand.static_type)
+
+    def body(self, node):
+        start = len(self.lines)
+        self.depth += 1
+        self.statement(node)
+        if len(self.lines) == start:
+            self.line('pass')
+        self.depth -= 1
+
+    def statement(self, node):
+        if isinstance(node, BlockNode):
+            for statement in node.statements:
+                self.statement(statement)
+        elif isinstance(node, ConditionNode):
+            self.condition(node)
+        elif isinstance(node, StatementNode):
+            self.assignment_or_print(node)
+        else:
+            # Reading a variable or building a collection can still fail
+            # on an unbound variable, so it has to be kept.
+            operand = self.expression(node)
+            if operand.kind in ('local', 'display'):
+                self.line(operand.code)
+
+    def condition(self, node):
+        keyword = node.keyword
+        if keyword is Keyword.WHILE:
+            self.line('while True:')
+            self.depth += 1
+            condition = self.condition_value(node.condition)
+            self.line(f'if {condition} is not True:')
+            self.line(f'    if {condition} is False:')
+            self.line('        break')
+            self.line('    raise _SemanticError')
+            if self.limits is not None and self.limits.max_steps is not None:
+                self.line('_steps -= 1')
+                self.line('if _steps < 0:')
+                self.line("    raise _LimitError('steps')")
+            self.statement(node.body)
+            self.depth -= 1
+            return
+
+        condition = self.condition_value(node.condition)
+        if keyword is Keyword.IF and node.orelse is None:
+            self.line(f'if {condition} is True:')
+            self.body(node.body)
+            self.line(f'elif {condition} is not False:')
+            self.line('    raise _SemanticError')
+        elif keyword is Keyword.IF:
+            self.line(f'if {condition} is True:')
+            self.body(node.body)
+            self.line(f'elif {condition} is False:')
+            self.body(node.orelse)
+            self.line('else:')
+            self.line('    raise _SemanticError')
+        else:
+            raise RuntimeError('Case not handled')
+
+    def condition_value(self, node):
+        operand = self.atom(self.expression(node))
+        if operand.static_type not in (None, bool):
+            self.line('raise _SemanticError')
+            return 'None'
+        return operand.code
+
+    def assignment_or_print(self, node):
+        keyword = node.keyword
+        if keyword is Keyword.PRINT:
+            self.line(f'_print({self.expression(node.value).code})')
+        elif keyword is Operator.TAKES_VALUE and node.index is None:
+            value = self.expression(node.value)
+            self.line(f'{self.local(node.target)} = {value.code}')
+        elif keyword is Operator.TAKES_VALUE:
+            if is_identifier(node.target):
+                target = _Operand(self.local(node.target), kind='local')
+                index, value = self.operands((node.index, node.value))
+            else:
+                target, index, value = self.operands(
+                    (node.target, node.index, node.value)
+                )
+            self.line(f'{target.code}[{index.code}] = {value.code}')
+        else:
+            raise RuntimeError('Case not handled')
+
+    def operands(self, nodes):
+        # Operands are evaluated left to right, so anything an operand reads
+        # is captured in a temporary before a later operand runs code that
+        # might have side effects.
+        operands = []
+        for node in nodes:
+            start = len(self.lines)
+            operand = self.expression(node)
+            if len(self.lines) != start:
+                operands = [self.pin(previous) for previous in operands]
+            operands.append(self.atom(operand))
+        return operands
+
+    def pin(self, operand):
+        if operand.kind != 'local':
+            return operand
+        temporary = self.temporary()
+        self.line(f'{temporary} = {operand.code}')
+        return _Operand(temporary, operand.static_type)
+
+    def expression(self, node):
+        if not isinstance(node, Node):
+            return self.constant(node)
+        elif isinstance(node, VariableNode):
+            return _Operand(self.local(node.name), kind='local')
+        elif isinstance(node, CollectionNode):
+            return self.collection(node)
+        elif isinstance(node, StatementNode):
+            self.assignment_or_print(node)
+            return self.constant(None)
+        elif isinstance(node, LiteralNode):
+            return self.constant(node.value)
+        elif isinstance(node, ConstantNode):
+            return self.constant(node.value)
+        elif isinstance(node, ChainNode):
+            return self.chain(node)
+        elif not isinstance(node, ExpressionNode):
+            raise RuntimeError('Case not handled')
+
+        op = node.operator.value
+        operands = node.operands
+        if len(operands) == 1 and op == Operator.NOT.value:
+            operand, = _trust(node, *self.operands(operands))
+            check = _is_a(operand, bool)
+            native = f'not {operand.code}'
+            result_type = bool
+        elif len(operands) == 2 and op == Operator.CONS.value:
+            left, right = _trust(node, *self.operands(operands))
+            if not self.check(_is_a(right, SbmlList)):
+                return self.constant(None)
+            self.line(f'{right.code}.prepend({left.code})')
+            value = _Operand(right.code, SbmlList, right.kind)
+            self.limit(op, left, right, value)
+            return value
+        elif len(operands) == 2 and op in _BINARY_TEMPLATES:
+            left, right = _trust(node, *self.operands(operands))
+            check, native, result_type = _BINARY_TEMPLATES[op](left, right)
+        else:
+            raise RuntimeError('Case not handled')
+
+        if not self.check(check):
+            return self.constant(None)
+        if len(operands) == 2:
+            self.limit_power(op, left, right)
+        result = self.temporary()
+        self.line(f'{result} = {native}')
+        value = _Operand(result, result_type)
+        if len(operands) == 2:
+            self.limit(op, left, right, value)
+        return value
+
+    def chain(self, node):
+        # Folds the operands in as they are evaluated, so the operator is
+        # checked at the same points as for nested binary nodes.  All partial
+        # results share one temporary so that they do not stay alive.
+        op = node.operator.value
+        value = self.atom(self.expression(node.operands[0]))
+        result = self.temporary()
+        for operand in node.operands[1:]:
+            start = len(self.lines)
+            right = self.expression(operand)
+            if len(self.lines) != start:
+                value = self.pin(value)
+            right = self.atom(right)
+            check, native, result_type = _BINARY_TEMPLATES[op](
+                *_trust(node, value, right)
+            )
+            if not self.check(check):
+                return self.constant(None)
+            self.limit_power(op, value, right)
+            self.line(f'{result} = {native}')
+            built = _Operand(result, result_type)
+            self.limit(op, value, right, built)
+            value = built
+        return value
+
+    def check(self, condition):
+        # Returns whether code after the check is reachable.
+        if condition is False:
+            self.line('raise _SemanticError')
+            return False
+        elif condition is not True:
+            self.line(f'if not {condition}:')
+            self.line('    raise _SemanticError')
+        return True
+
+    def limit_power(self, op, left, right):
+        # Powers too large to compute are caught before they are computed
+        limits = self.limits
+        if limits is not None and op == Operator.EXPONENT.value and \
+           limits.max_integer_bits is not None and \
+           _all(_is_int(left), _is_int(right)) is not False:
+            self.line(f'_check_power(_limits, {left.code}, {right.code})')
+
+    def limit(self, op, left, right, value):
+        # Checks the value an operator built from its operands, once built
+        limits = self.limits
+        if limits is None:
+            return
+        condition = False
+        if op in (Operator.EXPONENT.value, Operator.TIMES.value) and \
+           limits.max_integer_bits is not None:
+            condition = _all(
+                _is_int(value),
+                f'not _min_integer <= {value.code} <= _max_integer'
+            )
+            limit = 'integer bits'
+        elif op == Operator.PLUS.value and limits.max_length is not None:
+            # Valid operands of + are two numbers, two strings or two lists
+            if any(operand.static_type in NUMBER_TYPES
+                   for operand in (left, right, value)):
+                return
+            sized = any(operand.static_type is not None
+                        for operand in (left, right, value))
+            length = f'_len({value.code})'
+            if value.static_type is not SbmlList:
+                length = f'({value.code}.length ' \
+                    f'if {value.code}.__class__ is _rope else {length})'
+            condition = _all(
+                sized or f'{value.code}.__class__ in _SIZED',
+                f'{length} > {limits.max_length}'
+            )
+            limit = 'length'
+        elif op == Operator.CONS.value and limits.max_length is not None:
+            condition = f'_len({value.code}) > {limits.max_length}'
+            limit = 'length'
+        if condition is not False:
+            self.line(f'if {condition}:')
+            self.line(f'    raise _LimitError({limit!r})')
+
+    def constant(self, value):
+        # Code for a value holding lists builds new ones every time it runs
+        kind = 'display' if is_mutable(value) else 'constant'
+        return _Operand(_literal(value), type(value), kind)
+
+    def collection(self, node):
+        items = self.operands(node.items)
+        codes = ', '.join(item.code for item in items)
+        collection_type = node.type
+        if collection_type == tuple:
+            if len(items) == 1:
+                codes += ','
+            return _Operand(f'({codes})', tuple, 'display')
+        elif collection_type == SbmlList:
+            return _Operand(f'_wrap_list([{codes}])', SbmlList, 'display')
+        raise RuntimeError('Case not handled')
+
+
+def _literal(value):
+    value_type = type(value)
+    if value_type is float and not math.isfinite(value):
+        return f"_float('{value!r}')"
+    elif value_type is SbmlList:
+        codes = ', '.join(_literal(item) for item in value)
+        return f'_wrap_list([{codes}])'
+    elif value_type is tuple:
+        codes = ', '.join(_literal(item) for item in value)
+        return f'({codes},)' if len(value) == 1 else f'({codes})'
+    return repr(value)
+
+
+def transpile(ast, limits=None):
+    transpiler = _Transpiler(limits)
+    transpiler.statement(ast)
+    body = transpiler.lines or ['        pass']
+
+    parameters = ''.join(f', {name}={name}' for name in _RUNTIME)
+    symbols = sorted(transpiler.symbols.items())
+    lines = [
+        f'def {PROGRAM_NAME}(symbol_table, output=None, budget=None'
+        f'{parameters}):',
+        '    _memo = {}',
+        '    if output is None:',
+        '        output = _BufferedOutput()',
+        '    _print = output.print',
+    ]
+    if limits is not None:
+        lines += [
+            f'    _limits = _{limits!r}',
+            '    if budget is None:',
+            '        budget = _Budget(_limits)',
+            '    _min_integer = _limits.min_integer',
+            '    _max_integer = _limits.max_integer',
+            '    _steps = budget.steps',
+        ]
+    lines.append('    try:')
+    for symbol, local in symbols:
+        lines.append(f'        if {symbol!r} in symbol_table:')
+        lines.append(
+            f'            {local} = '
+            f'_to_sbml(symbol_table[{symbol!r}], _memo)'
+        )
+    lines += body
+    lines += [
+        '    except _UnboundLocalError:',
+        '        raise _SemanticError from None',
+        '    finally:',
+        '        bound = locals()',
+        f'        for symbol, local in {tuple(symbols)!r}:',
+        '            if local in bound:',
+        '                symbol_table[symbol] = bound[local]',
+        '        output.flush()',
+    ]
+    if limits is not None:
+        lines.append('        budget.steps = _steps')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_code(ast, filename='<sbml>', limits=None):
+    return compile(transpile(ast, limits), filename, 'exec')
+
+
+def load_code(code):
+    namespace = dict(_RUNTIME)
+    exec(code, namespace)
+    return namespace[PROGRAM_NAME]
+
+
+def compile_program(ast, limits=None):
+    try:
+        return load_code(compile_code(ast, limits=limits))
+    except (SyntaxError, RecursionError):
+        # Python limits how deeply loops can nest in one function, while the
+        # closure compiler has no such limit.
+        return sbml_compiler.compile_program(ast, limits)
+
+
+def cache_path(filename):
+    return filename + CACHE_SUFFIX
+
+
+def _cache_header(source, options):
+    return importlib.util.MAGIC_NUMBER + \
+        TRANSPILER_VERSION.to_bytes(4, 'little') + \
+        hashlib.sha256(f'{options}\n{source}'.encode()).digest()
+
+
+def load_cached_program(filename, source, parse, options=''):
+    # The compiled module is kept next to the source file, the same way
+    # Python keeps its bytecode, and is rebuilt whenever the source, the
+    # options parse compiles it with, a line describing them, or the
+    # transpiler changes.  Failing to read or write the cache is not an error.
+    path = cache_path(filename)
+    header = _cache_header(source, options)
+    try:
+        with open(path, 'rb') as file_handler:
+            data = file_handler.read()
+        if data.startswith(header):
+            return load_code(marshal.loads(data[len(header):]))
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+
+    ast = parse(source)
+    try:
+        code = compile_code(ast, filename)
+    except (SyntaxError, RecursionError):
+        return compile_program(ast)
+    if not sys.dont_write_bytecode:
+        _write_atomically(path, header + marshal.dumps(code))
+    return load_code(code)
+
+
+def _write_atomically(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+    except OSError:
+        return
+    try:
+        with os.fdopen(descriptor, 'wb') as file_handler:
+            file_handler.write(data)
+        os.replace(temporary_path, path)
+    except OSError:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
@@ -1,14 +1,6 @@
-import os
-import sys
-
-
-MODULE_DIR_NAME = os.path.dirname(os.path.realpath(__file__))
-if MODULE_DIR_NAME not in sys.path:
-    sys.path.insert(0, MODULE_DIR_NAME)
-
-
 import re
 from sbml_enums import Type
+from sbml_list import SbmlList
 
 
 class Switch:
@@ -38,7 +30,37 @@ def is_identifier(ident, is_token=False):
         return re.fullmatch(Type.IDENTIFIER.value, ident.value) is not None
     return type(ident) == str and not re.fullmatch(Type.STRING.value, ident)
 
-def is_string(ident, is_token=False):
-    if is_token:
-        return re.fullmatch(Type.STRING.value, ident.value) is not None
-    return type(ident) == str and re.fullmatch(Type.STRING.value, ident)
+
+def is_mutable(value):
+    # Whether a value is, or holds, a list that a program could change
+    value_type = type(value)
+    if value_type is SbmlList:
+        return True
+    elif value_type is tuple:
+        return any(is_mutable(item) for item in value)
+    return False
+
+
+def copy_value(value):
+    # Copies the lists in a value, sharing everything else
+    value_type = type(value)
+    if value_type is SbmlList:
+        return SbmlList.wrap([copy_value(item) for item in value])
+    elif value_type is tuple and is_mutable(value):
+        return tuple(copy_value(item) for item in value)
+    return value
+
+
+class _Unbound:
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'UNBOUND'
+
+    def __reduce__(self):
+        return 'UNBOUND'
+
+
+# The value of a variable in a frame before it is first assigned
+UNBOUND = _Unbound()
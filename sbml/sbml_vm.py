@@ -0,0 +1,468 @@
+import enum
+from sbml_ast_nodes import (
+    Node, BlockNode, ChainNode, ConditionNode, ConstantNode, ExpressionNode,
+    StatementNode, CollectionNode, LiteralNode, VariableNode
+)
+from sbml_enums import Keyword, Operator
+from sbml_errors import LimitError, SemanticError
+from sbml_limits import limit_operations, new_budget
+from sbml_list import SbmlList
+from sbml_operations import (
+    BINARY_OPERATIONS, UNARY_OPERATIONS, UNCHECKED_BINARY_OPERATIONS,
+    UNCHECKED_UNARY_OPERATIONS
+)
+from sbml_resolver import new_frame, store_frame
+from sbml_utils import UNBOUND, copy_value, is_identifier
+
+
+# A stack based virtual machine.  compile_program lowers an AST into a flat
+# array of (opcode, argument) pairs that run executes in a single loop, so
+# neither compiling nor running a program recurses on the depth of its AST.
+# Programs compiled with limits, see sbml_limits, test the conditions of their
+# loops with POP_JUMP_IF_FALSE_STEP, which also takes a step, if they have a
+# step limit, and run with the binary operations that check what they build.
+
+
+class Opcode(enum.IntEnum):
+
+    LOAD_CONST = 0
+    LOAD_FAST = 1
+    STORE_FAST = 2
+    BINARY_OP = 3
+    UNARY_OP = 4
+    POP_JUMP_IF_FALSE = 5
+    JUMP = 6
+    BUILD_LIST = 7
+    BUILD_TUPLE = 8
+    STORE_INDEX = 9
+    STORE_INDEX_FAST = 10
+    PRINT = 11
+    POP_TOP = 12
+    LOAD_CONST_COPY = 13
+    POP_JUMP_IF_FALSE_STEP = 14
+
+
+BINARY_OPERATORS = tuple(BINARY_OPERATIONS)
+UNARY_OPERATORS = tuple(UNARY_OPERATIONS)
+
+
+def _operation_index(operators, node):
+    # Operators whose operand types were proven valid are numbered after all
+    # the checked ones and run without type checks
+    index = operators.index(node.operator.value)
+    if node.checked:
+        return index
+    return index + len(operators)
+
+
+class CodeObject:
+
+    def __init__(self, instructions, constants, names, limits=None):
+        self.instructions = instructions
+        self.constants = constants
+        self.names = names
+        self.limits = limits
+
+    def __repr__(self):
+        return disassemble(self)
+
+    def __call__(self, symbol_table, output=None, budget=None):
+        if budget is None:
+            budget = new_budget(self.limits)
+        frame = new_frame(self.names, symbol_table, output, budget)
+        try:
+            run(self, frame)
+        finally:
+            store_frame(self.names, frame, symbol_table)
+
+
+class _Label:
+
+    def __init__(self):
+        self.position = None
+
+
+def _constant_key(value):
+    # Equal constants of different types, like True, 1 and 1.0, or 0.0 and
+    # -0.0, are not shared, within tuples too
+    cls = type(value)
+    if cls is tuple:
+        return (cls, tuple(_constant_key(item) for item in value))
+    if cls is float:
+        return (cls, repr(value))
+    return (cls, value)
+
+
+class _Assembler:
+
+    def __init__(self, limits=None):
+        self.limits = limits
+        self.instructions = []
+        self.constants = []
+        self.constant_indices = {}
+        self.names = []
+        self.name_indices = {}
+        self.jumps = []
+
+    def constant(self, value):
+        try:
+            key = _constant_key(value)
+            hash(key)
+        except TypeError:
+            # Values holding lists are never shared between instructions
+            key = (type(value), id(value))
+        if key not in self.constant_indices:
+            self.constant_indices[key] = len(self.constants)
+            self.constants.append(value)
+        return self.constant_indices[key]
+
+    def name(self, symbol):
+        if symbol not in self.name_indices:
+            self.name_indices[symbol] = len(self.names)
+            self.names.append(symbol)
+        return self.name_indices[symbol]
+
+    def emit(self, opcode, argument=0):
+        if isinstance(argument, _Label):
+            self.jumps.append((len(self.instructions) + 1, argument))
+        self.instructions.append(opcode)
+        self.instructions.append(argument)
+
+    def assemble(self):
+        for position, label in self.jumps:
+            self.instructions[position] = label.position
+        return CodeObject(
+            self.instructions, tuple(self.constants), tuple(self.names),
+            self.limits
+        )
+
+
+# Work items of the compiler.  Instead of recursing into children, lowering
+# a node pushes the items that produce its code onto a stack in reverse.
+_NODE = 0
+_EMIT = 1
+_LABEL = 2
+
+
+def compile_program(ast, limits=None):
+    assembler = _Assembler(limits)
+    work = [(_NODE, ast, False)]
+    while work:
+        item = work.pop()
+        if item[0] == _NODE:
+            items = _lower(assembler, item[1], item[2])
+            work.extend(reversed(items))
+        elif item[0] == _EMIT:
+            assembler.emit(item[1], item[2])
+        else:
+            item[1].position = len(assembler.instructions)
+    return assembler.assemble()
+
+
+def _emit(opcode, argument=0):
+    return (_EMIT, opcode, argument)
+
+
+def _value(node):
+    return (_NODE, node, True)
+
+
+def _statement(node):
+    return (_NODE, node, False)
+
+
+def _lower(assembler, node, keep_value):
+    if not isinstance(node, Node):
+        items = [_emit(Opcode.LOAD_CONST, assembler.constant(node))]
+    elif isinstance(node, BlockNode):
+        return [_statement(statement) for statement in node.statements]
+    elif isinstance(node, ConditionNode):
+        return _lower_condition(assembler, node)
+    elif isinstance(node, StatementNode):
+        items = _lower_statement(assembler, node)
+        if keep_value:
+            items.append(_emit(Opcode.LOAD_CONST, assembler.constant(None)))
+        return items
+    elif isinstance(node, LiteralNode):
+        items = [_lower_literal(assembler, node)]
+    elif isinstance(node, ConstantNode):
+        opcode = Opcode.LOAD_CONST_COPY if node.mutable else Opcode.LOAD_CONST
+        items = [_emit(opcode, assembler.constant(node.value))]
+    elif isinstance(node, ExpressionNode):
+        items = _lower_expression(assembler, node)
+    elif isinstance(node, ChainNode):
+        items = _lower_chain(node)
+    elif isinstance(node, CollectionNode):
+        items = _lower_collection(node)
+    elif isinstance(node, VariableNode):
+        items = [_emit(Opcode.LOAD_FAST, assembler.name(node.name))]
+    else:
+        raise RuntimeError('Case not handled')
+
+    if not keep_value:
+        items.append(_emit(Opcode.POP_TOP))
+    return items
+
+
+def _lower_literal(assembler, node):
+    return _emit(Opcode.LOAD_CONST, assembler.constant(node.value))
+
+
+def _lower_expression(assembler, node):
+    op = node.operator.value
+    operands = node.operands
+    if len(operands) == 1 and op in UNARY_OPERATIONS:
+        opcode = Opcode.UNARY_OP
+        argument = _operation_index(UNARY_OPERATORS, node)
+    elif len(operands) == 2 and op in BINARY_OPERATIONS:
+        opcode = Opcode.BINARY_OP
+        argument = _operation_index(BINARY_OPERATORS, node)
+    else:
+        raise RuntimeError('Case not handled')
+    return [_value(operand) for operand in operands] + \
+        [_emit(opcode, argument)]
+
+
+def _lower_chain(node):
+    # The operator is applied as soon as its right operand is on the stack,
+    # like it would be for the nested binary nodes the chain replaces
+    operation = _emit(
+        Opcode.BINARY_OP, _operation_index(BINARY_OPERATORS, node)
+    )
+    items = [_value(node.operands[0])]
+    for operand in node.operands[1:]:
+        items += [_value(operand), operation]
+    return items
+
+
+def _lower_condition(assembler, node):
+    keyword = node.keyword
+    if keyword is Keyword.IF and node.orelse is None:
+        end = _Label()
+        return [
+            _value(node.condition),
+            _emit(Opcode.POP_JUMP_IF_FALSE, end),
+            _statement(node.body),
+            (_LABEL, end),
+        ]
+    elif keyword is Keyword.IF:
+        orelse = _Label()
+        end = _Label()
+        return [
+            _value(node.condition),
+            _emit(Opcode.POP_JUMP_IF_FALSE, orelse),
+            _statement(node.body),
+            _emit(Opcode.JUMP, end),
+            (_LABEL, orelse),
+            _statement(node.orelse),
+            (_LABEL, end),
+        ]
+    elif keyword is Keyword.WHILE:
+        start = _Label()
+        end = _Label()
+        jump = Opcode.POP_JUMP_IF_FALSE
+        limits = assembler.limits
+        if limits is not None and limits.max_steps is not None:
+            jump = Opcode.POP_JUMP_IF_FALSE_STEP
+        return [
+            (_LABEL, start),
+            _value(node.condition),
+            _emit(jump, end),
+            _statement(node.body),
+            _emit(Opcode.JUMP, start),
+            (_LABEL, end),
+        ]
+    raise RuntimeError('Case not handled')
+
+
+def _lower_statement(assembler, node):
+    keyword = node.keyword
+    if keyword is Keyword.PRINT:
+        return [_value(node.value), _emit(Opcode.PRINT)]
+    elif keyword is Operator.TAKES_VALUE and node.index is None:
+        return [
+            _value(node.value),
+            _emit(Opcode.STORE_FAST, assembler.name(node.target)),
+        ]
+    elif keyword is Operator.TAKES_VALUE:
+        if is_identifier(node.target):
+            return [
+                _value(node.index),
+                _value(node.value),
+                _emit(Opcode.STORE_INDEX_FAST, assembler.name(node.target)),
+            ]
+        return [
+            _value(node.target),
+            _value(node.index),
+            _value(node.value),
+            _emit(Opcode.STORE_INDEX),
+        ]
+    raise RuntimeError('Case not handled')
+
+
+def _lower_collection(node):
+    collection_type = node.type
+    if collection_type == tuple:
+        opcode = Opcode.BUILD_TUPLE
+    elif collection_type == SbmlList:
+        opcode = Opcode.BUILD_LIST
+    else:
+        raise RuntimeError('Case not handled')
+    return [_value(item) for item in node.items] + \
+        [_emit(opcode, len(node.items))]
+
+
+def run(code, frame):
+    # Runs a program on a frame, holding the value of each of the names of
+    # the program at the same index followed by the budget and the output
+    LOAD_CONST = Opcode.LOAD_CONST.value
+    LOAD_FAST = Opcode.LOAD_FAST.value
+    STORE_FAST = Opcode.STORE_FAST.value
+    BINARY_OP = Opcode.BINARY_OP.value
+    UNARY_OP = Opcode.UNARY_OP.value
+    POP_JUMP_IF_FALSE = Opcode.POP_JUMP_IF_FALSE.value
+    JUMP = Opcode.JUMP.value
+    BUILD_LIST = Opcode.BUILD_LIST.value
+    BUILD_TUPLE = Opcode.BUILD_TUPLE.value
+    STORE_INDEX = Opcode.STORE_INDEX.value
+    STORE_INDEX_FAST = Opcode.STORE_INDEX_FAST.value
+    PRINT = Opcode.PRINT.value
+    POP_TOP = Opcode.POP_TOP.value
+    LOAD_CONST_COPY = Opcode.LOAD_CONST_COPY.value
+    POP_JUMP_IF_FALSE_STEP = Opcode.POP_JUMP_IF_FALSE_STEP.value
+
+    checked_operations = BINARY_OPERATIONS
+    unchecked_operations = UNCHECKED_BINARY_OPERATIONS
+    if code.limits is not None:
+        checked_operations = limit_operations(checked_operations, code.limits)
+        unchecked_operations = limit_operations(
+            unchecked_operations, code.limits
+        )
+    binary_operations = tuple(checked_operations.values()) + tuple(
+        unchecked_operations[op] for op in BINARY_OPERATORS
+    )
+    unary_operations = tuple(UNARY_OPERATIONS.values()) + tuple(
+        UNCHECKED_UNARY_OPERATIONS[op] for op in UNARY_OPERATORS
+    )
+    instructions = code.instructions
+    constants = code.constants
+    budget = frame[-2]
+    output = frame[-1]
+    stack = []
+    push = stack.append
+    pop = stack.pop
+
+    pc = 0
+    end = len(instructions)
+    while pc < end:
+        opcode = instructions[pc]
+        argument = instructions[pc + 1]
+        pc += 2
+
+        if opcode == LOAD_FAST:
+            value = frame[argument]
+            if value is UNBOUND:
+                raise SemanticError
+            push(value)
+        elif opcode == LOAD_CONST:
+            push(constants[argument])
+        elif opcode == BINARY_OP:
+            right = pop()
+            stack[-1] = binary_operations[argument](stack[-1], right)
+        elif opcode == STORE_FAST:
+            frame[argument] = pop()
+        elif opcode == POP_JUMP_IF_FALSE:
+            condition = pop()
+            if condition is False:
+                pc = argument
+            elif condition is not True:
+                raise SemanticError
+        elif opcode == JUMP:
+            pc = argument
+        elif opcode == POP_JUMP_IF_FALSE_STEP:
+            condition = pop()
+            if condition is False:
+                pc = argument
+            elif condition is not True:
+                raise SemanticError
+            else:
+                budget.steps -= 1
+                if budget.steps < 0:
+                    raise LimitError('steps')
+        elif opcode == UNARY_OP:
+            stack[-1] = unary_operations[argument](stack[-1])
+        elif opcode == STORE_INDEX_FAST:
+            value = pop()
+            index = pop()
+            array = frame[argument]
+            if array is UNBOUND:
+                raise SemanticError
+            array[index] = value
+        elif opcode == STORE_INDEX:
+            value = pop()
+            index = pop()
+            pop()[index] = value
+        elif opcode == BUILD_LIST:
+            if argument:
+                items = stack[-argument:]
+                del stack[-argument:]
+            else:
+                items = []
+            push(SbmlList.wrap(items))
+        elif opcode == BUILD_TUPLE:
+            if argument:
+                items = tuple(stack[-argument:])
+                del stack[-argument:]
+            else:
+                items = ()
+            push(items)
+        elif opcode == PRINT:
+            output.print(pop())
+        elif opcode == POP_TOP:
+            pop()
+        elif opcode == LOAD_CONST_COPY:
+            push(copy_value(constants[argument]))
+        else:
+            raise RuntimeError('Case not handled')
+
+
+def _operation_detail(operators, argument):
+    if argument < len(operators):
+        return operators[argument]
+    return operators[argument - len(operators)] + ', unchecked'
+
+
+_JUMPS = (
+    Opcode.JUMP, Opcode.POP_JUMP_IF_FALSE, Opcode.POP_JUMP_IF_FALSE_STEP
+)
+
+
+def disassemble(code):
+    lines = []
+    instructions = code.instructions
+    targets = {
+        instructions[pc + 1] for pc in range(0, len(instructions), 2)
+        if instructions[pc] in _JUMPS
+    }
+    for pc in range(0, len(instructions), 2):
+        opcode = Opcode(instructions[pc])
+        argument = instructions[pc + 1]
+        marker = '>>' if pc in targets else ''
+
+        if opcode in (Opcode.LOAD_CONST, Opcode.LOAD_CONST_COPY):
+            detail = repr(code.constants[argument])
+        elif opcode in (Opcode.LOAD_FAST, Opcode.STORE_FAST,
+                        Opcode.STORE_INDEX_FAST):
+            detail = code.names[argument]
+        elif opcode == Opcode.BINARY_OP:
+            detail = _operation_detail(BINARY_OPERATORS, argument)
+        elif opcode == Opcode.UNARY_OP:
+            detail = _operation_detail(UNARY_OPERATORS, argument)
+        else:
+            detail = ''
+
+        line = f'{marker:>3} {pc:>6} {opcode.name:<22} {argument:>4}'
+        if detail:
+            line += f' ({detail})'
+        lines.append(line.rstrip())
+    return '\n'.join(lines)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+
+SBML_DIR_NAME = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, 'sbml'
+)
+if SBML_DIR_NAME not in sys.path:
+    sys.path.insert(0, SBML_DIR_NAME)
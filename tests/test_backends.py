@@ -0,0 +1,69 @@
+import pytest
+
+import sbml
+import sbml_output
+from sbml_errors import SemanticError, SyntaxError
+
+
+# Every backend, with and without the optimizer, has to print what the tree
+# walker prints for these programs, and fail where it fails
+PROGRAMS = [
+    '{ print(1 + 2 * 3 - 4 div 3 mod 2); print(7 / 2); print(2 ** 10); }',
+    '{ print("ab" + "cd"); print("b" in "abc"); print("ab" < "b"); }',
+    '{ l = [1, 2]; l = 0 :: l; l[1] = 5; print(l + [3]); print(2 in l); }',
+    '{ t = (1, "a", [2]); print(#2 t); print((#3 t)[0]); print(t); }',
+    '{ i = 0; s = 0; while (i < 10) { s = s + i; i = i + 1; } print(s); }',
+    '{ if (1 < 2 andalso not False) { print(True); } else { print(1); } }',
+    '{ x = 1; if (x > 0) { x = "s"; } print(x + "t"); }',
+    '{ print(1 + "a"); }',
+    '{ print(1 div 0); }',
+    '{ print([1][2]); }',
+    '{ print(x); }',
+    # Both operands of orelse and andalso are read, even once the value of
+    # the left one decides the result
+    '{ c = False; if (c) { y = True; } print(True orelse y); }',
+    '{ c = False; if (c) { y = True; } print(False andalso y); }',
+    '{ print(True orelse 1); }',
+    # Equal constants of different types are kept apart
+    '{ print((True, 2)); print((1.0, 2)); print((1, 2)); }',
+    '{ print(0.0 * -1.0); print(0.0); print(((1, True), 1.0, (True, 1))); }',
+    '{ s = "%s" + "%s"; print(s + "c"); print("ab" in s); }' % (
+        'a' * 200, 'b' * 100
+    ),
+]
+
+
+def deep_expression(terms, operators, last='x'):
+    # x, then each term joined with the next operator, cycling through them,
+    # which nests operators as deep as there are terms when they differ
+    expression = 'x'
+    for index in range(1, terms):
+        term = last if index == terms - 1 else 'x'
+        expression += f' {operators[index % len(operators)]} {term}'
+    return expression
+
+
+# Expressions too deep to evaluate by recursion
+PROGRAMS += [
+    '{ x = 1; print(%s); }' % deep_expression(1500, ['-']),
+    '{ x = 1; print(%s); }' % deep_expression(1500, ['-', '+']),
+    '{ x = 1; print(%s); }' % deep_expression(1500, ['-', '+', '+']),
+    '{ x = 1; print(%s); }' % deep_expression(1500, ['-', '+', '+'], '"a"'),
+    '{ x = True; print(%s); }' % ('not ' * 1500 + 'x'),
+]
+
+
+def run(source, backend='tree', optimize=False):
+    output = sbml_output.CollectingOutput()
+    try:
+        sbml.compile(source, backend, optimize=optimize).run({}, output)
+    except (SyntaxError, SemanticError) as e:
+        output.print(e)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+@pytest.mark.parametrize('optimize', [False, True])
+def test_backend_matches_tree_walker(source, backend, optimize):
+    assert run(source, backend, optimize) == run(source)
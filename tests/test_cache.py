@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import sbml
+import sbml_transpiler
+
+
+SBML_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, 'sbml', 'sbml.py'
+)
+
+SOURCE = '{ x = 1 + 2; if (True) { print(x); } }'
+
+
+def test_cached_programs_are_keyed_by_options(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    filename = str(tmp_path / 'program.sbml')
+    parsed = []
+
+    def parse(source):
+        parsed.append(source)
+        return sbml.parse(source)
+
+    # A program compiled with other options is compiled again
+    for options in ['', 'optimize fold', '', 'optimize fold', 'optimize fold']:
+        sbml_transpiler.load_cached_program(filename, SOURCE, parse, options)
+    assert len(parsed) == 4
+
+
+def test_optimizer_stats_of_a_cached_program(tmp_path):
+    path = tmp_path / 'program.sbml'
+    path.write_text(SOURCE)
+    environment = dict(os.environ)
+    environment.pop('PYTHONDONTWRITEBYTECODE', None)
+    command = [sys.executable, SBML_PATH, '--backend', 'python', '-O']
+    for _ in range(2):
+        result = subprocess.run(
+            [*command, str(path)], capture_output=True, text=True,
+            env=environment
+        )
+        assert result.stdout == '3\n'
+    result = subprocess.run(
+        [*command, '--optimizer-stats', str(path)], capture_output=True,
+        text=True, env=environment
+    )
+    assert result.stdout == '3\n'
+    assert 'nodes eliminated' in result.stderr
+
+
+def test_ast_cache_stats(tmp_path):
+    path = tmp_path / 'program.sbml'
+    path.write_text(SOURCE)
+    command = [
+        sys.executable, SBML_PATH, '--ast-cache', str(tmp_path / 'cache'),
+        '--ast-cache-stats', str(path)
+    ]
+    results = [
+        subprocess.run(command, capture_output=True, text=True)
+        for _ in range(2)
+    ]
+    assert [result.stdout for result in results] == ['3\n', '3\n']
+    assert 'ast cache: hits 0, misses 1, stores 1' in results[0].stderr
+    assert 'ast cache: hits 1, misses 0, stores 0' in results[1].stderr
@@ -0,0 +1,55 @@
+import pytest
+
+import sbml
+import sbml_output
+from sbml_errors import LimitError
+from sbml_limits import Limits
+
+
+def run(source, backend, optimize, limits):
+    output = sbml_output.CollectingOutput()
+    program = sbml.compile(source, backend, optimize=optimize, limits=limits)
+    program.run({}, output)
+    return output.getvalue()
+
+
+BACKENDS = pytest.mark.parametrize('backend', sbml.BACKENDS)
+OPTIMIZE = pytest.mark.parametrize('optimize', [False, True])
+
+
+@BACKENDS
+@OPTIMIZE
+@pytest.mark.parametrize('source, limits', [
+    ('{ x = 0; while (True) { x = x + 1; } }', Limits(max_steps=100)),
+    ('{ x = 2 ** 2000; print(x > 0); }', Limits(max_integer_bits=64)),
+    ('{ x = 3; i = 0; while (i < 10) { x = x * x; i = i + 1; } }',
+     Limits(max_integer_bits=64)),
+    ('{ l = [1, 2, 3, 4, 5, 6] + [7]; print(l); }', Limits(max_length=5)),
+    ('{ s = "abc" + "def"; print(s); }', Limits(max_length=5)),
+    ('{ l = 1 :: [2, 3, 4, 5]; print(l); }', Limits(max_length=4)),
+    # Too deep to evaluate by recursion
+    ('{ x = 3; print(%sx%s); }' % ('(' * 1000, ' * x - x)' * 1000),
+     Limits(max_integer_bits=64)),
+])
+def test_going_over_a_limit(backend, optimize, source, limits):
+    # Operations on constants that the optimizer folds are limited too
+    with pytest.raises(LimitError):
+        run(source, backend, optimize, limits)
+
+
+@BACKENDS
+@OPTIMIZE
+@pytest.mark.parametrize('source, limits, expected', [
+    ('{ i = 0; while (i < 10) { i = i + 1; } print(i); }',
+     Limits(max_steps=10), '10\n'),
+    ('{ x = (2 ** 62 - 1) * 2 + 1; print(x); print(0 - x * 1); }',
+     Limits(max_integer_bits=63), '9223372036854775807\n'
+     '-9223372036854775807\n'),
+    ('{ print(3 ** 5); }', Limits(max_integer_bits=8), '243\n'),
+    ('{ print([1, 2] + [3, 4, 5]); }', Limits(max_length=5),
+     '[1, 2, 3, 4, 5]\n'),
+    ('{ print(1.5 ** 2 * 1000.0); }', Limits(max_integer_bits=8),
+     '2250.0\n'),
+])
+def test_staying_within_limits(backend, optimize, source, limits, expected):
+    assert run(source, backend, optimize, limits) == expected
@@ -0,0 +1,11 @@
+import sbml
+import sbml_optimizer
+
+
+def test_folded_strings_are_flattened():
+    # Strings this long are joined lazily, as SbmlString
+    source = '{ print("%s" + "%s"); }' % ('a' * 200, 'b' * 100)
+    ast = sbml_optimizer.fold_constants(sbml.parse(source))
+    value = ast.statements[0].value.value
+    assert type(value) is str
+    assert value == 'a' * 200 + 'b' * 100
@@ -0,0 +1,61 @@
+import pytest
+
+import sbml
+import sbml_output
+from sbml_errors import SemanticError
+
+
+def run(program, symbol_table=None):
+    output = sbml_output.CollectingOutput()
+    program.run(symbol_table, output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+@pytest.mark.parametrize('optimize', [False, True])
+def test_run_on_bound_variables(backend, optimize):
+    program = sbml.compile('{ print(x + 1); }', backend, optimize=optimize)
+    assert run(program, {'x': 1}) == '2\n'
+    assert run(program, {'x': 1.5}) == '2.5\n'
+    with pytest.raises(SemanticError):
+        run(program, {'x': 'one'})
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+@pytest.mark.parametrize('optimize', [False, True])
+def test_variable_bound_on_one_path_only(backend, optimize):
+    # The variable is not assigned on the path taken, so it keeps the value
+    # the run started with
+    program = sbml.compile(
+        '{ if (c) { x = 1; } print(x - 1); }', backend, optimize=optimize
+    )
+    assert run(program, {'c': True}) == '0\n'
+    assert run(program, {'c': False, 'x': 3}) == '2\n'
+    with pytest.raises(SemanticError):
+        run(program, {'c': False, 'x': 'str'})
+    with pytest.raises(SemanticError):
+        run(program, {'c': False})
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+def test_run_reads_only_its_variables(backend):
+    # Variables the program does not use are left as they are
+    program = sbml.compile('{ print(x); }', backend)
+    symbol_table = {'x': 1, 'y': [1, 2]}
+    assert run(program, symbol_table) == '1\n'
+    assert type(symbol_table['y']) is list
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+def test_run_returns_python_values(backend):
+    program = sbml.compile(
+        '{ l = 0 :: l; m = l; i = 0; s = "";'
+        ' while (i < 300) { s = s + "a"; i = i + 1; } }', backend
+    )
+    symbol_table = {'l': [1, [2]]}
+    result = program.run(symbol_table, sbml_output.CollectingOutput())
+    assert symbol_table == {'l': [1, [2]]}
+    assert type(result['l']) is list and type(result['l'][2]) is list
+    assert result['l'] == [0, 1, [2]]
+    assert result['m'] is result['l']
+    assert type(result['s']) is str and result['s'] == 'a' * 300
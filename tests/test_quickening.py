@@ -0,0 +1,84 @@
+import sys
+import threading
+
+import pytest
+
+import sbml
+import sbml_ast_nodes
+import sbml_output
+from sbml_enums import Operator
+from sbml_errors import SemanticError
+
+
+LOOP = '{ i = 0; z = 0; while (i < 100) { z = x + y; i = i + 1; } print(z); }'
+
+
+def run(program, symbol_table):
+    output = sbml_output.CollectingOutput()
+    program.run(symbol_table, output)
+    return output.getvalue()
+
+
+def test_expressions_specialize_and_keep_their_checks():
+    stats = sbml_ast_nodes.quickening_stats
+    program = sbml.compile(LOOP)
+    hits = stats.hits
+    assert run(program, {'x': 1, 'y': 2}) == '3\n'
+    assert stats.hits > hits
+
+    # Operands of other types miss, and invalid ones still fail
+    misses = stats.misses
+    assert run(program, {'x': 'a', 'y': 'b'}) == 'ab\n'
+    assert stats.misses > misses
+    with pytest.raises(SemanticError):
+        run(program, {'x': 1, 'y': 'b'})
+
+
+def test_specialized_expression_run_while_another_thread_deoptimizes():
+    # Another thread can deoptimize the node and start warming it up again
+    # between the reads of its specialization
+    node = sbml_ast_nodes.ExpressionNode(Operator.PLUS, 1, 2)
+    for _ in range(sbml_ast_nodes.QUICKENING_WARMUP):
+        assert node.apply(Operator.PLUS, (1, 2)) == 3
+    assert node.specialized is not None
+    node.types = None
+    assert node.apply(Operator.PLUS, (1, 2)) == 3
+    node.types = (str, str)
+    assert node.apply(Operator.PLUS, ('a', 'b')) == 'ab'
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+def test_program_run_from_several_threads(backend):
+    # Runs with operands of different types make the expressions of the
+    # tree walker specialize and deoptimize while other threads run them
+    program = sbml.compile(LOOP, backend)
+    cases = [
+        ({'x': 1, 'y': 2}, '3\n'),
+        ({'x': 'a', 'y': 'b'}, 'ab\n'),
+        ({'x': 1.5, 'y': 2}, '3.5\n'),
+        ({'x': [1], 'y': [2]}, '[1, 2]\n'),
+    ]
+    failures = []
+
+    def work(index):
+        try:
+            for repetition in range(50):
+                symbol_table, expected = cases[(index + repetition) % 4]
+                if run(program, dict(symbol_table)) != expected:
+                    failures.append((symbol_table, expected))
+        except Exception as e:
+            failures.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(target=work, args=(index,)) for index in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert failures == []
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import sbml
+
+
+SBML_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, 'sbml', 'sbml.py'
+)
+
+
+def run_stream(source, tmp_path, *options):
+    path = tmp_path / 'program.sbml'
+    path.write_text(source)
+    result = subprocess.run(
+        [sys.executable, SBML_PATH, '--stream', *options, str(path)],
+        capture_output=True, text=True
+    )
+    return result.stdout + result.stderr
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+@pytest.mark.parametrize('optimize', [[], ['-O']])
+def test_statements_see_variables_bound_before(backend, optimize, tmp_path):
+    # The inner if leaves x as the string an earlier statement bound
+    source = '{\n x = "s";\n c = False;\n' \
+        ' if (True) { if (c) { x = 1; } print(x - 1); }\n}\n'
+    assert run_stream(
+        source, tmp_path, '--backend', backend, *optimize
+    ) == 'SEMANTIC ERROR\n'
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+@pytest.mark.parametrize('optimize', [[], ['-O']])
+def test_statements_share_variables(backend, optimize, tmp_path):
+    source = '{\n x = 1;\n y = x + 1.5;\n' \
+        ' if (True) { z = [x]; print(y * 2); print(z); }\n}\n'
+    assert run_stream(
+        source, tmp_path, '--backend', backend, *optimize
+    ) == '5.0\n[1]\n'
+
+
+@pytest.mark.parametrize('backend', sbml.BACKENDS)
+@pytest.mark.parametrize('optimize', [[], ['-O']])
+def test_statements_binding_many_variables(backend, optimize, tmp_path):
+    # Statements only read the variables they use, so each takes the same
+    # time however many variables the statements before them bound
+    lines = [f' x{index} = {index};' for index in range(2000)]
+    source = '{\n' + '\n'.join(lines) + '\n print(x0 + x1999);\n}\n'
+    assert run_stream(
+        source, tmp_path, '--backend', backend, *optimize
+    ) == '1999\n'